@@ -0,0 +1,28 @@
+"""
+Proteção dos comandos de benchmark (bench_*)
+
+Os benchmarks gravam dados sintéticos — às vezes milhões de linhas — direto
+no banco de DATABASES['default'] e só os removem no final. Para não rodarem
+por engano contra o banco de produção, exigem --confirmar: sem a opção o
+comando para antes de tocar no banco e diz qual banco seria usado.
+"""
+
+from django.core.management.base import CommandError
+from django.db import connections
+
+
+def adicionar_confirmacao(parser):
+    parser.add_argument(
+        '--confirmar', action='store_true',
+        help='Confirma que o banco configurado é de desenvolvimento e pode receber os dados sintéticos',
+    )
+
+
+def exigir_confirmacao(options, using='default'):
+    if options['confirmar']:
+        return
+    banco = connections[using].settings_dict
+    raise CommandError(
+        f'Este benchmark grava dados sintéticos no banco "{banco["NAME"]}" '
+        f'({banco["HOST"] or "localhost"}). Use um banco de desenvolvimento e rode com --confirmar.'
+    )
@@ -0,0 +1,68 @@
+"""
+Busca por trecho de texto nas listas do painel
+
+As listas filtram com __icontains, que o Django traduz para
+UPPER(coluna::text) LIKE UPPER('%termo%'). Os índices GIN de trigramas
+(pg_trgm) criados por indice_trigram() são sobre essa mesma expressão, então
+o Postgres usa o índice em vez de ler a tabela inteira.
+
+Um OR entre colunas de tabelas diferentes (nome OR proprietario__username)
+não usa índice nenhum: vira JOIN + leitura completa. buscar() separa os
+campos por tabela — um OR por tabela (BitmapOr dos índices dela) — e junta
+os resultados por pk com UNION.
+
+Termos com menos de 3 letras não formam trigramas e continuam lentos.
+"""
+
+from functools import reduce
+import operator
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+
+def indice_trigram(campo, nome):
+    """Índice GIN de trigramas para buscas __icontains em `campo`"""
+    return GinIndex(OpClass(Upper(campo), name='gin_trgm_ops'), name=nome)
+
+
+def _contem(colunas, termo):
+    return reduce(operator.or_, (Q(**{f'{coluna}__icontains': termo}) for coluna in colunas))
+
+
+def _modelo_da_relacao(modelo, relacao):
+    for parte in relacao.split('__'):
+        modelo = modelo._meta.get_field(parte).related_model
+    return modelo
+
+
+def buscar(queryset, termo, campos):
+    """
+    Filtra o queryset pelos objetos em que algum dos `campos` (caminhos do
+    ORM, ex.: 'nome', 'proprietario__email') contém `termo`, sem diferenciar
+    maiúsculas e minúsculas.
+    """
+    termo = (termo or '').strip()
+    if not termo:
+        return queryset
+
+    por_relacao = {}
+    for campo in campos:
+        relacao, _, coluna = campo.rpartition('__')
+        por_relacao.setdefault(relacao, []).append(coluna)
+
+    modelo = queryset.model
+    filtros = []
+    for relacao, colunas in por_relacao.items():
+        if relacao:
+            # busca na tabela relacionada e filtra pela chave estrangeira
+            relacionados = _modelo_da_relacao(modelo, relacao)._base_manager.filter(_contem(colunas, termo))
+            filtros.append(Q(**{f'{relacao}__in': relacionados.values('pk')}))
+        else:
+            filtros.append(_contem(colunas, termo))
+
+    if len(filtros) == 1:
+        return queryset.filter(filtros[0])
+    ramos = [modelo._base_manager.filter(filtro).order_by().values('pk') for filtro in filtros]
+    return queryset.filter(pk__in=ramos[0].union(*ramos[1:]))
@@ -0,0 +1,227 @@
+"""
+Exportação das listas do painel em CSV e XLSX
+
+As views de exportação reaproveitam o get_queryset() da lista (mesma busca e
+filtros da tela) e mandam o arquivo em streaming: as linhas saem do banco
+com values_list (tuplas, sem criar objetos do model) por um cursor no
+servidor (.iterator(chunk_size=LOTE)) e vão para a resposta em pedaços, lote
+a lote. A memória fica constante, seja a lista de 20 ou de 1 milhão de
+linhas.
+
+O XLSX é montado aqui mesmo (zip com os XMLs mínimos de uma planilha), sem
+dependência nova, e também sai em streaming: o zipfile grava em um buffer
+que é esvaziado a cada lote. O Excel abre no máximo 1.048.576 linhas por
+planilha.
+"""
+
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+
+LOTE = 2000
+
+TIPOS_CONTEUDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _campo(modelo, caminho):
+    """Field do model no fim de `caminho` (ex.: 'proprietario__email'); None para anotações"""
+    partes = caminho.split('__')
+    try:
+        for parte in partes[:-1]:
+            modelo = modelo._meta.get_field(parte).related_model
+        return modelo._meta.get_field(partes[-1])
+    except FieldDoesNotExist:
+        return None
+
+
+def _formatador(campo):
+    """Converte o valor do banco para o que aparece na planilha"""
+    if campo is None:
+        return None
+    if campo.choices:
+        rotulos = dict(campo.flatchoices)
+        return lambda valor: rotulos.get(valor, valor)
+    if isinstance(campo, models.BooleanField):
+        return lambda valor: 'Sim' if valor else 'Não'
+    if isinstance(campo, models.DateTimeField):
+        return lambda valor: timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else None
+    if isinstance(campo, models.DateField):
+        return lambda valor: valor.strftime('%d/%m/%Y') if valor else None
+    return None
+
+
+def linhas_exportacao(queryset, campos):
+    """Tuplas já formatadas com os `campos` do queryset, lidas do banco em lotes"""
+    formatadores = [(indice, formatar) for indice, formatar in enumerate(
+        _formatador(_campo(queryset.model, campo)) for campo in campos
+    ) if formatar]
+    linhas = queryset.prefetch_related(None).values_list(*campos).iterator(chunk_size=LOTE)
+    if not formatadores:
+        yield from linhas
+        return
+    for linha in linhas:
+        linha = list(linha)
+        for indice, formatar in formatadores:
+            linha[indice] = formatar(linha[indice])
+        yield linha
+
+
+def _lotes(linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# texto começando com estes caracteres vira fórmula ao abrir o CSV na planilha
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _sem_formula(valor):
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def gerar_csv(titulos, linhas):
+    """CSV em UTF-8 com BOM (o Excel reconhece os acentos), um pedaço por lote"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(titulos)
+    for lote in _lotes(linhas):
+        escritor.writerows([_sem_formula(valor) for valor in linha] for linha in lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+# caracteres de controle não são permitidos em XML
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_NS_PLANILHA = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_RELACOES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_PACOTE = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_CABECALHO_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_ARQUIVOS_XLSX = {
+    '[Content_Types].xml': (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        f'<Relationships xmlns="{_NS_PACOTE}">'
+        f'<Relationship Id="rId1" Type="{_NS_RELACOES}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        f'<workbook xmlns="{_NS_PLANILHA}" xmlns:r="{_NS_RELACOES}">'
+        '<sheets><sheet name="Planilha1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        f'<Relationships xmlns="{_NS_PACOTE}">'
+        f'<Relationship Id="rId1" Type="{_NS_RELACOES}/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celula(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return '<row>' + ''.join(_celula(valor) for valor in valores) + '</row>'
+
+
+class _Saida(io.RawIOBase):
+    """Destino do zipfile sem seek: guarda os bytes até o próximo pedaço da resposta"""
+
+    def __init__(self):
+        self.pedaco = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self.pedaco += dados
+        return len(dados)
+
+    def esvaziar(self):
+        dados = bytes(self.pedaco)
+        self.pedaco.clear()
+        return dados
+
+
+def gerar_xlsx(titulos, linhas):
+    """Planilha XLSX (uma aba, textos inline), um pedaço do zip por lote"""
+    saida = _Saida()
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        for nome, conteudo in _ARQUIVOS_XLSX.items():
+            arquivo.writestr(nome, _CABECALHO_XML + conteudo)
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                (_CABECALHO_XML + f'<worksheet xmlns="{_NS_PLANILHA}"><sheetData>' + _linha_xlsx(titulos)).encode()
+            )
+            for lote in _lotes(linhas):
+                planilha.write(''.join(_linha_xlsx(linha) for linha in lote).encode())
+                yield saida.esvaziar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.esvaziar()
+
+
+GERADORES = {'csv': gerar_csv, 'xlsx': gerar_xlsx}
+
+
+class ExportacaoMixin:
+    """
+    Para ListViews: responde o get() com o arquivo da lista (todas as linhas
+    do get_queryset(), sem paginação) em vez da página HTML. A view define
+    `colunas_exportacao` [(caminho do ORM, título), ...] e `nome_exportacao`;
+    o formato ('csv' ou 'xlsx') vem do kwarg `formato` da URL.
+    """
+    colunas_exportacao = []
+    nome_exportacao = 'exportacao'
+
+    def get(self, request, *args, **kwargs):
+        formato = kwargs.get('formato')
+        if formato not in GERADORES:
+            raise Http404
+        campos = [campo for campo, _ in self.colunas_exportacao]
+        titulos = [titulo for _, titulo in self.colunas_exportacao]
+
+        # o gerador só consulta o banco quando a resposta começa a ser enviada
+        resposta = StreamingHttpResponse(
+            GERADORES[formato](titulos, linhas_exportacao(self.get_queryset(), campos)),
+            content_type=TIPOS_CONTEUDO[formato],
+        )
+        nome = f'{self.nome_exportacao}-{timezone.localdate():%Y%m%d}.{formato}'
+        resposta['Content-Disposition'] = f'attachment; filename="{nome}"'
+        return resposta
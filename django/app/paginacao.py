@@ -0,0 +1,137 @@
+"""
+Paginação das listas sem o COUNT(*) exato a cada página
+
+O Paginator do Django conta o queryset inteiro (COUNT(*)) em toda página
+para saber quantas páginas existem. Com milhões de linhas essa contagem
+custa mais que a própria página. PaginatorEstimado troca a contagem por:
+
+- lista sem filtros do usuário: a estimativa do Postgres — reltuples de
+  pg_class quando o queryset é a tabela inteira, ou as linhas previstas pelo
+  EXPLAIN quando a view já filtra (ex.: só clientes). Só acima de
+  PAGINACAO_ESTIMATIVA_A_PARTIR linhas; abaixo disso conta de verdade;
+- lista filtrada (busca, status...): a contagem exata, guardada no cache por
+  PAGINACAO_CONTAGEM_CACHE_SEGUNDOS com chave pelo SQL da consulta (os
+  filtros e seus valores), para não recontar ao passar de página.
+
+Com a estimativa (ou uma contagem do cache que ficou velha) o total pode
+errar para os dois lados. Por isso, nesses casos, qualquer página a partir
+da 1 é aceita enquanto tiver linhas, e a página busca per_page + 1 linhas
+para saber se há próxima — em vez de comparar com num_pages. Os templates
+mostram "~" no total e escondem o link "Última" quando paginator.estimado.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimar_total(queryset):
+    """Número de linhas do queryset segundo as estatísticas do Postgres (sem ler a tabela)"""
+    with connections[queryset.db].cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            reltuples = cursor.fetchone()[0]
+            # -1: a tabela nunca passou por ANALYZE
+            if reltuples >= 0:
+                return reltuples
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+def contar(queryset):
+    """
+    (total, estimado): a estimativa do Postgres quando passa de
+    PAGINACAO_ESTIMATIVA_A_PARTIR linhas, senão o COUNT exato
+    """
+    estimativa = estimar_total(queryset)
+    if estimativa >= settings.PAGINACAO_ESTIMATIVA_A_PARTIR:
+        return estimativa, True
+    return queryset.count(), False
+
+
+def _chave_contagem(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return 'paginacao:contagem:' + hashlib.md5(repr((sql, params)).encode()).hexdigest()
+
+
+class PaginaAproximada(Page):
+    """Página de um total aproximado: sabe se há próxima pela linha a mais que buscou"""
+
+    def __init__(self, object_list, number, paginator, tem_proxima):
+        super().__init__(object_list, number, paginator)
+        self.tem_proxima = tem_proxima
+
+    def has_next(self):
+        return self.tem_proxima
+
+    def end_index(self):
+        return self.start_index() + len(self) - 1
+
+
+class PaginatorEstimado(Paginator):
+    """Paginator com contagem estimada (listas grandes sem filtro) ou em cache (filtradas)"""
+
+    def __init__(self, *args, filtrada=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.filtrada = filtrada
+        self.estimado = False
+        # False quando o total veio da estimativa ou do cache
+        self.exato = True
+
+    @cached_property
+    def count(self):
+        if self.filtrada:
+            chave = _chave_contagem(self.object_list)
+            total = cache.get(chave)
+            if total is None:
+                total = self.object_list.count()
+                cache.set(chave, total, settings.PAGINACAO_CONTAGEM_CACHE_SEGUNDOS)
+            else:
+                self.exato = False
+            return total
+
+        total, self.estimado = contar(self.object_list)
+        self.exato = not self.estimado
+        return total
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # além do total aproximado ainda pode haver linhas: page() confere
+            if self.exato or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.exato:
+            return super().page(number)
+        inicio = (number - 1) * self.per_page
+        linhas = list(self.object_list[inicio:inicio + self.per_page + 1])
+        if not linhas and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return PaginaAproximada(linhas[:self.per_page], number, self, tem_proxima=len(linhas) > self.per_page)
+
+
+class PaginacaoEstimadaMixin:
+    """
+    Para ListViews com paginate_by: usa o PaginatorEstimado. A lista conta como
+    filtrada quando a URL tem algum parâmetro preenchido além da página.
+    """
+    paginator_class = PaginatorEstimado
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        kwargs.setdefault('filtrada', any(
+            valor for chave, valor in self.request.GET.items() if chave != self.page_kwarg
+        ))
+        return super().get_paginator(queryset, per_page, orphans, allow_empty_first_page, **kwargs)
@@ -0,0 +1,24 @@
+"""
+Prefetch dos primeiros N relacionados de cada objeto ("os 5 primeiros pets
+de cada cliente") em uma única consulta
+
+Em vez de um filter(...)[:n] por objeto da página (N+1), o prefetch_related
+busca todos de uma vez com ROW_NUMBER() OVER (PARTITION BY <chave
+estrangeira> ORDER BY ...) e fica só com as linhas de posição <= n (o Django
+gera a janela quando o queryset do Prefetch é fatiado).
+"""
+
+from django.db.models import Prefetch
+
+
+def prefetch_primeiros(relacao, n, queryset, to_attr, ordem=None):
+    """
+    Prefetch com os `n` primeiros objetos de `relacao` em cada objeto,
+    guardados como lista em `to_attr`. `ordem` (padrão: Meta.ordering do
+    model, depois a pk) decide quais são os primeiros e precisa ser
+    determinística para a página não mudar entre requisições.
+    """
+    ordem = list(ordem or queryset.model._meta.ordering)
+    if 'pk' not in ordem and '-pk' not in ordem:
+        ordem.append('pk')
+    return Prefetch(relacao, queryset=queryset.order_by(*ordem)[:n], to_attr=to_attr)
@@ -81,6 +81,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
 
 ]
 
@@ -127,6 +128,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "app.middleware.CSRFRefreshMiddleware",  # Middleware customizado para CSRF
     "django.contrib.messages.middleware.MessageMiddleware",
+    "consultas.auditoria.HistoricoConsultaMiddleware",  # Histórico das consultas gravado em lote
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -142,6 +144,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "produtos.context_processors.carrinho",
             ],
         },
     },
@@ -163,6 +166,25 @@ DATABASES = {
     }
 }
 
+# Cache
+# Com REDIS_URL definido o cache é compartilhado entre processos (necessário
+# para a invalidação funcionar com vários workers); sem ele, cache em memória
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "petshop",
+        # a disponibilidade guarda uma entrada por (veterinário, dia)
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    }
+}
+if os.getenv('REDIS_URL'):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv('REDIS_URL'),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -200,6 +222,63 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Tempo (em minutos) que o estoque fica reservado para um item do carrinho
+RESERVA_CARRINHO_MINUTOS = 30
+
+# Dias que o carrinho de visitantes (cache + cookie) é mantido sem uso
+CARRINHO_ANONIMO_DIAS = 7
+
+# Duração (minutos) reservada na agenda para cada tipo de consulta
+CONSULTA_DURACAO_POR_TIPO = {
+    'CONSULTA': 30,
+    'RETORNO': 20,
+    'EMERGENCIA': 30,
+    'CIRURGIA': 120,
+    'VACINACAO': 15,
+    'EXAME': 30,
+}
+
+# Janelas de atendimento (dia da semana: [(início, fim)]) dos veterinários
+# sem HorarioAtendimento cadastrado; 0 = segunda-feira
+HORARIO_ATENDIMENTO_PADRAO = {
+    0: [('08:00', '12:00'), ('13:00', '18:00')],
+    1: [('08:00', '12:00'), ('13:00', '18:00')],
+    2: [('08:00', '12:00'), ('13:00', '18:00')],
+    3: [('08:00', '12:00'), ('13:00', '18:00')],
+    4: [('08:00', '12:00'), ('13:00', '18:00')],
+    5: [('08:00', '12:00')],
+}
+
+# Validade máxima do índice de categorias em cache (produtos.categorias)
+CATEGORIAS_CACHE_SEGUNDOS = 300
+
+# Validade dos contadores do dashboard do veterinário (consultas.estatisticas)
+DASHBOARD_VET_CACHE_SEGUNDOS = 60
+
+# Validade do retrato de estatísticas dos dashboards do painel (panel.estatisticas)
+PAINEL_ESTATISTICAS_SEGUNDOS = 300
+
+# Paginação das listas (app.paginacao): listas sem filtro acima deste número de
+# linhas mostram a estimativa do Postgres; contagens de listas filtradas ficam
+# no cache por alguns segundos
+PAGINACAO_ESTIMATIVA_A_PARTIR = 100_000
+PAGINACAO_CONTAGEM_CACHE_SEGUNDOS = 30
+
+# Grava o histórico das consultas (consultas.auditoria) em uma thread, fora do tempo de resposta.
+# A fila é gravada quando o processo encerra normalmente (atexit); um kill -9 perde o que estiver nela
+HISTORICO_EM_SEGUNDO_PLANO = os.getenv('HISTORICO_EM_SEGUNDO_PLANO', 'False') == 'True'
+
+# Meses de histórico mantidos no banco; o resto vai para arquivos (arquivar_historico)
+HISTORICO_RETENCAO_MESES = 24
+HISTORICO_ARQUIVO_DIR = BASE_DIR / 'arquivo' / 'historico'
+
+# Agendador de consultas (agendador_consultas): consultas pendentes viram
+# FALTOU este tempo depois do horário; lembretes saem com esta antecedência
+CONSULTA_FALTA_APOS_MINUTOS = 60
+LEMBRETE_ANTECEDENCIA_HORAS = 24
+# Quem entrega as mensagens da caixa de saída (consultas.MensagemSaida)
+MENSAGENS_ENVIADOR = os.getenv('MENSAGENS_ENVIADOR', 'consultas.agendador.EnviadorLocal')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
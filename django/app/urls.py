@@ -16,11 +16,12 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from users.views import home
 from django.conf import settings
 from django.conf.urls.static import static
 from panel.views import DashboardFuncView
+from produtos.views import miniatura
 
 urlpatterns = [
     path("", home, name="home"),
@@ -33,6 +34,11 @@ urlpatterns = [
     path("produtos/", include("produtos.urls")),
 ]
  # servir arquivos de mídia em modo de desenvolvimento
+ # (em produção o MEDIA_ROOT é servido pelo servidor web ou pelo storage)
 if settings.DEBUG:
 
+    urlpatterns += [
+        # miniaturas imutáveis dos produtos, com os mesmos cabeçalhos de cache da produção
+        re_path(r"^media/(?P<path>imagens/\d+/derivados/[\w.-]+)$", miniatura, name="miniatura"),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
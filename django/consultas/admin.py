@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import HorarioAtendimento, MensagemSaida, SerieConsulta
+
+
+@admin.register(HorarioAtendimento)
+class HorarioAtendimentoAdmin(admin.ModelAdmin):
+    list_display = ['veterinario', 'dia_semana', 'inicio', 'fim']
+    list_filter = ['dia_semana']
+
+
+@admin.register(SerieConsulta)
+class SerieConsultaAdmin(admin.ModelAdmin):
+    list_display = ['veterinario', 'intervalo_semanas', 'ocorrencias', 'criado_em']
+
+
+@admin.register(MensagemSaida)
+class MensagemSaidaAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'destinatario', 'consulta', 'criado_em', 'enviado_em', 'tentativas']
+    list_filter = ['tipo', 'enviado_em']
+    raw_id_fields = ['consulta']
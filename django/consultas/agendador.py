@@ -0,0 +1,137 @@
+"""
+Agendador de consultas: faltas automáticas e lembretes
+
+Executado periodicamente pelo comando agendador_consultas (cron ou --loop).
+Cada passo trabalha em lotes e trava as linhas com FOR UPDATE SKIP LOCKED,
+então vários workers podem rodar ao mesmo tempo sem processar a mesma
+consulta (ou mensagem) duas vezes:
+
+- marcar_faltas: consultas AGENDADA/CONFIRMADA cujo horário passou há mais
+  de CONSULTA_FALTA_APOS_MINUTOS viram FALTOU (consultas.transicoes, um
+  UPDATE por lote);
+- gerar_lembretes: consultas pendentes das próximas LEMBRETE_ANTECEDENCIA_HORAS
+  ganham uma MensagemSaida (outbox), uma por consulta;
+- drenar_saida: entrega as mensagens pendentes pelo enviador configurado em
+  MENSAGENS_ENVIADOR.
+
+As duas primeiras buscas usam o índice consulta_status_data_idx.
+"""
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .auditoria import historico_em_lote
+from .models import Consulta, MensagemSaida
+from .transicoes import transicionar
+
+logger = logging.getLogger(__name__)
+
+LOTE_PADRAO = 500
+
+# depois disso a mensagem fica na caixa de saída só para consulta (campo erro)
+MAX_TENTATIVAS = 5
+
+STATUS_PENDENTES = Consulta.TRANSICOES['FALTOU']
+
+
+class EnviadorLocal:
+    """
+    Enviador de desenvolvimento: só registra a mensagem no log. Um enviador
+    real (e-mail, SMS, WhatsApp) implementa o mesmo enviar(mensagem) e
+    levanta exceção quando a entrega falha.
+    """
+
+    def enviar(self, mensagem):
+        logger.info('Mensagem %s para %s: %s', mensagem.pk, mensagem.destinatario or '-', mensagem.assunto)
+
+
+def obter_enviador():
+    return import_string(settings.MENSAGENS_ENVIADOR)()
+
+
+def _pendentes_travadas(queryset, lote):
+    return queryset.order_by('data_hora').select_for_update(skip_locked=True, of=('self',))[:lote]
+
+
+def marcar_faltas(lote=LOTE_PADRAO, agora=None):
+    """Marca FALTOU em até `lote` consultas vencidas. Retorna os ids alterados."""
+    agora = agora or timezone.now()
+    limite = agora - timedelta(minutes=settings.CONSULTA_FALTA_APOS_MINUTOS)
+    # o lote de histórico por fora da transação: grava tudo depois do commit
+    with historico_em_lote(), transaction.atomic():
+        ids = list(_pendentes_travadas(
+            Consulta.objects.filter(status__in=STATUS_PENDENTES, data_hora__lte=limite).values_list('pk', flat=True),
+            lote,
+        ))
+        if not ids:
+            return []
+        return transicionar(
+            ids, 'FALTOU', None, agora=agora,
+            descricao='Status alterado automaticamente para: Paciente Faltou',
+        )
+
+
+def _lembrete(consulta):
+    animal = consulta.animal
+    horario = timezone.localtime(consulta.data_hora)
+    return MensagemSaida(
+        consulta=consulta,
+        tipo='LEMBRETE',
+        destinatario=animal.proprietario.email,
+        assunto=f"Lembrete: consulta de {animal.nome} em {horario:%d/%m/%Y às %H:%M}",
+        corpo=(
+            f"Olá, {animal.proprietario.get_full_name() or animal.proprietario.username}!\n\n"
+            f"{animal.nome} tem {consulta.get_tipo_display().lower()} marcada para "
+            f"{horario:%d/%m/%Y às %H:%M} com {consulta.veterinario.get_full_name() or consulta.veterinario.username}.\n"
+            "Se não puder comparecer, avise a clínica para liberar o horário."
+        ),
+    )
+
+
+def gerar_lembretes(lote=LOTE_PADRAO, agora=None):
+    """Coloca na caixa de saída o lembrete de até `lote` consultas próximas. Retorna quantos."""
+    agora = agora or timezone.now()
+    limite = agora + timedelta(hours=settings.LEMBRETE_ANTECEDENCIA_HORAS)
+    with transaction.atomic():
+        consultas = list(_pendentes_travadas(
+            Consulta.objects.filter(status__in=STATUS_PENDENTES, data_hora__gt=agora, data_hora__lte=limite)
+            .exclude(Exists(MensagemSaida.objects.filter(consulta=OuterRef('pk'), tipo='LEMBRETE')))
+            .select_related('animal__proprietario', 'veterinario'),
+            lote,
+        ))
+        # ignore_conflicts: a constraint única segura um lembrete já gerado por outro worker
+        MensagemSaida.objects.bulk_create([_lembrete(consulta) for consulta in consultas], ignore_conflicts=True)
+    return len(consultas)
+
+
+def drenar_saida(lote=LOTE_PADRAO, enviador=None):
+    """
+    Entrega até `lote` mensagens pendentes. As que falham ficam na fila
+    (até MAX_TENTATIVAS) com o erro registrado. Retorna (enviadas, falhas).
+    """
+    enviador = enviador or obter_enviador()
+    with transaction.atomic():
+        mensagens = list(
+            MensagemSaida.objects.filter(enviado_em__isnull=True, tentativas__lt=MAX_TENTATIVAS)
+            .order_by('criado_em')
+            .select_for_update(skip_locked=True)[:lote]
+        )
+        falhas = 0
+        for mensagem in mensagens:
+            mensagem.tentativas += 1
+            try:
+                enviador.enviar(mensagem)
+            except Exception as erro:
+                falhas += 1
+                mensagem.erro = str(erro) or erro.__class__.__name__
+                logger.warning('Falha ao enviar a mensagem %s: %s', mensagem.pk, mensagem.erro)
+            else:
+                mensagem.enviado_em = timezone.now()
+                mensagem.erro = ''
+        MensagemSaida.objects.bulk_update(mensagens, ['tentativas', 'enviado_em', 'erro'])
+    return len(mensagens) - falhas, falhas
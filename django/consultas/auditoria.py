@@ -0,0 +1,120 @@
+"""
+Gravação do histórico das consultas (HistoricoConsulta) em lote
+
+As views não gravam o histórico na hora: registrar_historico() monta o
+evento e o entrega ao buffer do request só depois do commit da transação
+em que a mudança aconteceu (se ela for desfeita, o evento some junto).
+HistoricoConsultaMiddleware abre o buffer no início do request e, no fim,
+grava tudo com um único bulk_create.
+
+Com HISTORICO_EM_SEGUNDO_PLANO = True o bulk_create roda em uma thread
+separada (um único worker, então a ordem é mantida) e sai do tempo de
+resposta; a página seguinte pode não mostrar o evento por alguns
+milissegundos. Ao encerrar o processo (reciclagem do worker, deploy) a
+fila é esvaziada antes de sair; só um kill -9 perde o que estava na fila.
+
+Todo o histórico passa por aqui: registrar_historico() para um evento,
+registrar_historicos() para vários de uma vez (séries, agendador).
+
+criado_em é preenchido no registro, não na gravação: a ordem do histórico
+é a mesma de quando cada create() era feito dentro da view.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import HistoricoConsulta
+
+logger = logging.getLogger(__name__)
+
+_buffer = ContextVar('historico_consulta_buffer', default=None)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='historico')
+# grava o que ainda está na fila antes de o processo sair
+atexit.register(_executor.shutdown, wait=True)
+
+
+def _gravar(eventos):
+    HistoricoConsulta.objects.bulk_create(eventos)
+
+
+def _gravar_em_segundo_plano(eventos):
+    try:
+        _gravar(eventos)
+    except Exception:
+        logger.exception('Falha ao gravar %d eventos do histórico de consultas', len(eventos))
+    finally:
+        connection.close()
+
+
+def _descarregar(eventos):
+    if not eventos:
+        return
+    if settings.HISTORICO_EM_SEGUNDO_PLANO:
+        _executor.submit(_gravar_em_segundo_plano, eventos)
+    else:
+        _gravar(eventos)
+
+
+def _entregar(eventos):
+    buffer = _buffer.get()
+    if buffer is None:
+        # fora de um lote (comandos, shell): grava na hora
+        _descarregar(eventos)
+    else:
+        buffer.extend(eventos)
+
+
+def registrar_historico(consulta, acao, descricao, usuario):
+    """Registra uma ação no histórico da consulta (gravada após o commit)"""
+    evento = HistoricoConsulta(
+        consulta=consulta, acao=acao, descricao=descricao, usuario=usuario, criado_em=timezone.now()
+    )
+    transaction.on_commit(lambda: _entregar([evento]))
+    return evento
+
+
+def registrar_historicos(eventos):
+    """
+    Versão em lote de registrar_historico: recebe HistoricoConsulta ainda
+    não salvos, entregues juntos após o commit
+    """
+    eventos = list(eventos)
+    if eventos:
+        transaction.on_commit(lambda: _entregar(eventos))
+    return eventos
+
+
+@contextmanager
+def historico_em_lote():
+    """
+    Acumula os eventos registrados dentro do bloco e grava todos ao sair.
+    Blocos aninhados usam o lote de fora.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    eventos = []
+    token = _buffer.set(eventos)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        _descarregar(eventos)
+
+
+class HistoricoConsultaMiddleware:
+    """Um lote de histórico por request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with historico_em_lote():
+            return self.get_response(request)
@@ -0,0 +1,120 @@
+"""
+Agenda do veterinário em iCalendar (RFC 5545)
+
+O feed é lido periodicamente por aplicativos de calendário. Para quase não
+custar nada quando a agenda não mudou, a versão da agenda (md5 dos campos
+que aparecem no arquivo, consulta a consulta, e do nome do veterinário)
+vira a ETag em um único aggregate; o arquivo só é gerado quando o cliente
+não tem a versão atual, e sai em streaming, consulta a consulta.
+
+Não há Last-Modified: uma consulta excluída (ou que saiu da janela) não
+muda nenhum atualizado_em, só o conteúdo, que a ETag cobre.
+"""
+
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Concat, MD5
+from django.utils import timezone
+from .models import Consulta
+from .periodos import periodo_dias
+
+# janela publicada, em dias a partir de hoje
+DIAS_ANTES = 30
+DIAS_DEPOIS = 180
+
+STATUS_ICS = {
+    'AGENDADA': 'TENTATIVE',
+    'CANCELADA': 'CANCELLED',
+}
+
+# tudo o que _evento escreve no arquivo; a alteração de qualquer um muda a ETag
+_CAMPOS_DO_EVENTO = ('pk', 'atualizado_em', 'data_hora', 'data_fim', 'tipo', 'status', 'motivo', 'animal__nome')
+
+# linhas do iCalendar têm no máximo 75 octetos (continuação começa com espaço)
+_MAX_OCTETOS = 75
+
+
+def consultas_da_agenda(veterinario, hoje=None):
+    """Consultas do veterinário dentro da janela publicada"""
+    hoje = hoje or timezone.localdate()
+    periodo = periodo_dias(hoje - timedelta(days=DIAS_ANTES), hoje + timedelta(days=DIAS_DEPOIS))
+    return Consulta.objects.filter(periodo.q(), veterinario=veterinario)
+
+
+def versao_da_agenda(veterinario, consultas, hoje=None):
+    """
+    ETag da agenda: md5 (calculado no banco) dos campos exibidos de cada
+    consulta, inclusive o nome do animal, mais o nome do veterinário, que
+    vai no título do calendário; a janela muda a cada dia e entra na ETag
+    """
+    hoje = hoje or timezone.localdate()
+    linha = Concat(
+        *[parte for campo in _CAMPOS_DO_EVENTO for parte in (F(campo), Value('\x1f'))], output_field=TextField(),
+    )
+    resumo = consultas.aggregate(resumo=MD5(StringAgg(linha, delimiter='\x1e', ordering='pk')))['resumo']
+    nome = veterinario.get_full_name() or veterinario.username
+    versao = hashlib.md5(f'{nome}\x1e{resumo or ""}'.encode()).hexdigest()
+    return f'"{hoje:%Y%m%d}-{versao}"'
+
+
+def _texto(valor):
+    return (
+        str(valor).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _data(valor):
+    return valor.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _dobrar(linha):
+    """Quebra a linha em pedaços de até 75 octetos sem partir caracteres UTF-8"""
+    partes, atual, tamanho = [], '', 0
+    for caractere in linha:
+        octetos = len(caractere.encode())
+        if tamanho + octetos > _MAX_OCTETOS:
+            partes.append(atual)
+            atual, tamanho = ' ', 1
+        atual += caractere
+        tamanho += octetos
+    partes.append(atual)
+    return '\r\n'.join(partes) + '\r\n'
+
+
+def _evento(consulta, dominio):
+    resumo = f"{consulta.animal.nome} - {consulta.get_tipo_display()}"
+    if consulta.status not in ('AGENDADA', 'CONFIRMADA'):
+        resumo += f" ({consulta.get_status_display()})"
+    linhas = [
+        'BEGIN:VEVENT',
+        f'UID:consulta-{consulta.pk}@{dominio}',
+        f'DTSTAMP:{_data(consulta.atualizado_em)}',
+        f'LAST-MODIFIED:{_data(consulta.atualizado_em)}',
+        f'DTSTART:{_data(consulta.data_hora)}',
+        f'DTEND:{_data(consulta.data_fim)}',
+        f'SUMMARY:{_texto(resumo)}',
+        f'DESCRIPTION:{_texto(consulta.motivo)}',
+        f'STATUS:{STATUS_ICS.get(consulta.status, "CONFIRMED")}',
+        'END:VEVENT',
+    ]
+    return ''.join(_dobrar(linha) for linha in linhas)
+
+
+def gerar_ics(veterinario, consultas, dominio):
+    """Gera o calendário em pedaços (um por consulta), lendo o banco em lotes"""
+    nome = veterinario.get_full_name() or veterinario.username
+    yield ''.join(_dobrar(linha) for linha in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Petshop//Agenda Veterinaria//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_texto(f"Agenda - {nome}")}',
+    ])
+    for consulta in consultas.select_related('animal').order_by('data_hora').iterator(chunk_size=500):
+        yield _evento(consulta, dominio)
+    yield 'END:VCALENDAR\r\n'
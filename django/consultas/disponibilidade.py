@@ -0,0 +1,226 @@
+"""
+Disponibilidade de horários dos veterinários
+
+Os horários livres de um dia são as janelas de atendimento do veterinário
+(HorarioAtendimento, ou HORARIO_ATENDIMENTO_PADRAO) menos as consultas não
+canceladas. Para cada veterinário é feita uma única consulta por intervalo
+(sobreposição de tstzrange, resolvida pelo índice GiST da constraint
+consulta_sem_sobreposicao) e a subtração é uma varredura em memória.
+
+Os intervalos livres ficam em cache por (veterinário, dia), independentes
+do tipo de atendimento. Consulta.save()/delete() apagam os dias afetados e
+mudanças em HorarioAtendimento trocam a versão do cache do veterinário.
+"""
+
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.contrib.postgres.fields import RangeBoundary
+from django.utils import timezone
+from .models import Consulta, HorarioAtendimento, TsTzRange
+from .periodos import periodo_dias
+
+# início dos horários oferecidos: 08:00, 08:15, 08:30...
+GRADE_MINUTOS = 15
+
+# horários oferecidos precisam desta antecedência (mesma margem do ConsultaForm)
+ANTECEDENCIA_MINIMA = timedelta(minutes=5)
+
+CACHE_SEGUNDOS = 60 * 60
+
+
+def duracao_do_tipo(tipo):
+    """Duração (minutos) reservada para um tipo de atendimento"""
+    return settings.CONSULTA_DURACAO_POR_TIPO.get(tipo, 30)
+
+
+def _fuso():
+    return timezone.get_default_timezone()
+
+
+def _chave_versao(veterinario_id):
+    return f'consultas:agenda_versao:{veterinario_id}'
+
+
+def _chave_dia(veterinario_id, versao, dia):
+    return f'consultas:livres:{veterinario_id}:{versao}:{dia.isoformat()}'
+
+
+def _versoes(veterinario_ids):
+    chaves = {veterinario_id: _chave_versao(veterinario_id) for veterinario_id in veterinario_ids}
+    encontradas = cache.get_many(chaves.values())
+    versoes, novas = {}, {}
+    for veterinario_id, chave in chaves.items():
+        if chave not in encontradas:
+            novas[chave] = encontradas[chave] = uuid.uuid4().hex
+        versoes[veterinario_id] = encontradas[chave]
+    if novas:
+        cache.set_many(novas, None)
+    return versoes
+
+
+def invalidar_veterinario(veterinario_id):
+    """Descarta todos os dias em cache do veterinário (horário de atendimento mudou)"""
+    transaction.on_commit(lambda: cache.set(_chave_versao(veterinario_id), uuid.uuid4().hex, None))
+
+
+def invalidar_periodo(veterinario_id, inicio, fim):
+    """Descarta do cache os dias (no fuso local) tocados pelo intervalo [inicio, fim)"""
+    if not veterinario_id or not inicio:
+        return
+    fim = fim or inicio
+    primeiro = timezone.localtime(inicio, _fuso()).date()
+    ultimo = timezone.localtime(max(fim - timedelta(microseconds=1), inicio), _fuso()).date()
+
+    def apagar():
+        versao = _versoes([veterinario_id])[veterinario_id]
+        dias = [primeiro + timedelta(days=n) for n in range((ultimo - primeiro).days + 1)]
+        cache.delete_many([_chave_dia(veterinario_id, versao, dia) for dia in dias])
+
+    # só depois do commit, para outro request não recolocar no cache o dia antigo
+    transaction.on_commit(apagar)
+
+
+def _janelas(veterinario_ids):
+    """{veterinario_id: {dia_semana: [(inicio, fim), ...]}} em uma consulta"""
+    janelas = {veterinario_id: {} for veterinario_id in veterinario_ids}
+    horarios = HorarioAtendimento.objects.filter(veterinario_id__in=veterinario_ids).order_by('inicio')
+    for horario in horarios:
+        janelas[horario.veterinario_id].setdefault(horario.dia_semana, []).append((horario.inicio, horario.fim))
+
+    padrao = {
+        dia_semana: [(time.fromisoformat(inicio), time.fromisoformat(fim)) for inicio, fim in faixas]
+        for dia_semana, faixas in settings.HORARIO_ATENDIMENTO_PADRAO.items()
+    }
+    return {veterinario_id: semana or padrao for veterinario_id, semana in janelas.items()}
+
+
+def _subtrair(janelas, ocupados):
+    """
+    Varredura: janelas do dia (ordenadas) menos os intervalos ocupados
+    (ordenados pelo início). Devolve os intervalos livres [(inicio, fim)].
+    """
+    livres = []
+    for inicio, fim in janelas:
+        cursor = inicio
+        for ocupado_inicio, ocupado_fim in ocupados:
+            if ocupado_fim <= cursor:
+                continue
+            if ocupado_inicio >= fim:
+                break
+            if ocupado_inicio > cursor:
+                livres.append((cursor, ocupado_inicio))
+            cursor = max(cursor, ocupado_fim)
+            if cursor >= fim:
+                break
+        if cursor < fim:
+            livres.append((cursor, fim))
+    return livres
+
+
+def _calcular_dias(veterinario_id, dias, semana):
+    """Intervalos livres de cada dia da lista, com uma consulta ao banco"""
+    fuso = _fuso()
+    intervalo = periodo_dias(dias[0], dias[-1])
+
+    ocupados_por_dia = {}
+    consultas = (
+        Consulta.objects.filter(veterinario_id=veterinario_id)
+        .exclude(status='CANCELADA')
+        .annotate(periodo=TsTzRange('data_hora', 'data_fim', RangeBoundary()))
+        .filter(periodo__overlap=DateTimeTZRange(*intervalo))
+        .order_by('data_hora')
+        .values_list('data_hora', 'data_fim')
+    )
+    for ocupado_inicio, ocupado_fim in consultas:
+        # uma consulta que atravessa a meia-noite ocupa os dois dias
+        dia = ocupado_inicio.astimezone(fuso).date()
+        ultimo = (ocupado_fim - timedelta(microseconds=1)).astimezone(fuso).date()
+        while dia <= ultimo:
+            ocupados_por_dia.setdefault(dia, []).append((ocupado_inicio, ocupado_fim))
+            dia += timedelta(days=1)
+
+    resultado = {}
+    for dia in dias:
+        janelas = [
+            (datetime.combine(dia, janela_inicio, tzinfo=fuso), datetime.combine(dia, janela_fim, tzinfo=fuso))
+            for janela_inicio, janela_fim in semana.get(dia.weekday(), [])
+        ]
+        resultado[dia] = _subtrair(janelas, ocupados_por_dia.get(dia, []))
+    return resultado
+
+
+def intervalos_livres(veterinario_ids, data_inicio, data_fim):
+    """
+    {veterinario_id: {dia: [(inicio, fim), ...]}} para os dias de data_inicio
+    a data_fim (inclusive), lendo do cache o que já foi calculado
+    """
+    dias = [data_inicio + timedelta(days=n) for n in range((data_fim - data_inicio).days + 1)]
+    versoes = _versoes(veterinario_ids)
+    chaves = {
+        (veterinario_id, dia): _chave_dia(veterinario_id, versoes[veterinario_id], dia)
+        for veterinario_id in veterinario_ids for dia in dias
+    }
+    em_cache = cache.get_many(chaves.values())
+
+    faltando = {}
+    for (veterinario_id, dia), chave in chaves.items():
+        if chave not in em_cache:
+            faltando.setdefault(veterinario_id, []).append(dia)
+
+    novos = {}
+    if faltando:
+        janelas = _janelas(list(faltando))
+        for veterinario_id, dias_faltando in faltando.items():
+            calculados = _calcular_dias(veterinario_id, dias_faltando, janelas[veterinario_id])
+            for dia, livres in calculados.items():
+                novos[chaves[(veterinario_id, dia)]] = livres
+        cache.set_many(novos, CACHE_SEGUNDOS)
+
+    return {
+        veterinario_id: {
+            dia: em_cache.get(chaves[(veterinario_id, dia)], novos.get(chaves[(veterinario_id, dia)]))
+            for dia in dias
+        }
+        for veterinario_id in veterinario_ids
+    }
+
+
+def _horarios_no_intervalo(inicio, fim, duracao, a_partir_de):
+    # primeiro início na grade (minutos múltiplos de GRADE_MINUTOS)
+    inicio = max(inicio, a_partir_de)
+    fora_da_grade = inicio.minute % GRADE_MINUTOS
+    if fora_da_grade or inicio.second or inicio.microsecond:
+        inicio = inicio.replace(second=0, microsecond=0) + timedelta(minutes=GRADE_MINUTOS - fora_da_grade)
+    while inicio + duracao <= fim:
+        yield inicio
+        inicio += timedelta(minutes=GRADE_MINUTOS)
+
+
+def horarios_livres(veterinarios, data_inicio, data_fim, tipo='CONSULTA', agora=None):
+    """
+    Horários em que cada veterinário pode receber uma consulta do tipo dado:
+    [{'veterinario': User, 'duracao': min, 'dias': [{'data': date, 'horarios': [datetime, ...]}]}]
+    Dias sem horário livre ficam de fora.
+    """
+    duracao = timedelta(minutes=duracao_do_tipo(tipo))
+    a_partir_de = (agora or timezone.now()) + ANTECEDENCIA_MINIMA
+    livres = intervalos_livres([veterinario.pk for veterinario in veterinarios], data_inicio, data_fim)
+
+    resultado = []
+    for veterinario in veterinarios:
+        dias = []
+        for dia, intervalos in livres[veterinario.pk].items():
+            horarios = [
+                horario
+                for inicio, fim in intervalos
+                for horario in _horarios_no_intervalo(inicio, fim, duracao, a_partir_de)
+            ]
+            if horarios:
+                dias.append({'data': dia, 'horarios': horarios})
+        resultado.append({'veterinario': veterinario, 'duracao': int(duracao.total_seconds() // 60), 'dias': dias})
+    return resultado
@@ -0,0 +1,53 @@
+"""
+Contadores do dashboard do veterinário
+
+Todos os números do topo do painel (total, hoje, semana, por status e
+prontuários) saem de um único aggregate() com Count(filter=Q(...)) e ficam
+no cache por veterinário e dia durante DASHBOARD_VET_CACHE_SEGUNDOS.
+Os sinais em consultas.signals apagam a entrada quando uma consulta ou um
+prontuário do veterinário é salvo ou excluído.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Consulta
+from .periodos import periodo_dia, periodo_semana
+
+
+def _chave(veterinario_id, hoje):
+    return f'consultas:dashboard_vet:{veterinario_id}:{hoje.isoformat()}'
+
+
+def _calcular(veterinario_id, hoje):
+    return Consulta.objects.filter(veterinario_id=veterinario_id).aggregate(
+        total_consultas=Count('id'),
+        consultas_hoje=Count('id', filter=periodo_dia(hoje).q()),
+        consultas_semana=Count('id', filter=periodo_semana(hoje).q()),
+        consultas_agendadas=Count('id', filter=Q(status='AGENDADA')),
+        consultas_confirmadas=Count('id', filter=Q(status='CONFIRMADA')),
+        consultas_realizadas=Count('id', filter=Q(status='REALIZADA')),
+        # prontuário é 1:1 com a consulta: o LEFT JOIN não duplica linhas
+        total_prontuarios=Count('prontuario'),
+    )
+
+
+def estatisticas_veterinario(veterinario_id):
+    """
+    {'total_consultas', 'consultas_hoje', 'consultas_semana',
+    'consultas_agendadas', 'consultas_confirmadas', 'consultas_realizadas',
+    'total_prontuarios'} do veterinário, lidos do cache quando possível
+    """
+    hoje = timezone.localdate()
+    chave = _chave(veterinario_id, hoje)
+    estatisticas = cache.get(chave)
+    if estatisticas is None:
+        estatisticas = _calcular(veterinario_id, hoje)
+        cache.set(chave, estatisticas, settings.DASHBOARD_VET_CACHE_SEGUNDOS)
+    return estatisticas
+
+
+def invalidar_estatisticas(veterinario_id):
+    if veterinario_id:
+        cache.delete(_chave(veterinario_id, timezone.localdate()))
@@ -4,7 +4,9 @@ Formulários customizados para o app de consultas
 
 from django import forms
 from django.utils import timezone
+from consultas.disponibilidade import duracao_do_tipo
 from consultas.models import Consulta
+from consultas.series import MAX_OCORRENCIAS
 from pets.models import Animal
 
 
@@ -39,6 +41,16 @@ class ConsultaForm(forms.ModelForm):
         help_text='Selecione o animal que será atendido'
     )
     
+    # em branco: a duração do tipo de atendimento (CONSULTA_DURACAO_POR_TIPO), preenchida no clean()
+    duracao = forms.IntegerField(
+        label='Duração (minutos)',
+        required=False,
+        min_value=5,
+        max_value=480,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 5, 'placeholder': 'Padrão do tipo'}),
+        help_text='Tempo reservado na agenda do veterinário; em branco, o padrão do tipo de atendimento'
+    )
+    
     tipo = forms.ChoiceField(
         choices=Consulta.TIPO_CHOICES,
         label='Tipo de Atendimento',
@@ -64,9 +76,28 @@ class ConsultaForm(forms.ModelForm):
         })
     )
     
+    # Recorrência (opcional): cria uma SerieConsulta em vez de uma consulta única
+    repetir_semanas = forms.IntegerField(
+        label='Repetir a cada (semanas)',
+        required=False,
+        min_value=1,
+        max_value=52,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='Para vacinações e retornos; deixe em branco para uma consulta única'
+    )
+    
+    ocorrencias = forms.IntegerField(
+        label='Número de consultas',
+        required=False,
+        min_value=2,
+        max_value=MAX_OCORRENCIAS,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='Total de consultas da série, incluindo a primeira'
+    )
+    
     class Meta:
         model = Consulta
-        fields = ['animal', 'data_hora', 'tipo', 'motivo', 'observacoes']
+        fields = ['animal', 'data_hora', 'duracao', 'tipo', 'motivo', 'observacoes']
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -109,6 +140,16 @@ class ConsultaForm(forms.ModelForm):
                 return data_hora
         
         return data_hora
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('duracao') is None and cleaned_data.get('tipo'):
+            cleaned_data['duracao'] = duracao_do_tipo(cleaned_data['tipo'])
+        if bool(cleaned_data.get('repetir_semanas')) != bool(cleaned_data.get('ocorrencias')):
+            self.add_error(
+                'ocorrencias', 'Para agendar uma série, informe o intervalo em semanas e o número de consultas.'
+            )
+        return cleaned_data
 
 
 class ConsultaUpdateForm(ConsultaForm):
@@ -116,6 +157,9 @@ class ConsultaUpdateForm(ConsultaForm):
     Formulário para atualizar consultas (inclui campo de status)
     """
     
+    repetir_semanas = None
+    ocorrencias = None
+    
     status = forms.ChoiceField(
         choices=Consulta.STATUS_CHOICES,
         label='Status',
@@ -124,4 +168,49 @@ class ConsultaUpdateForm(ConsultaForm):
     
     class Meta:
         model = Consulta
-        fields = ['animal', 'data_hora', 'tipo', 'status', 'motivo', 'observacoes']
+        fields = ['animal', 'data_hora', 'duracao', 'tipo', 'status', 'motivo', 'observacoes']
+
+
+class SerieForm(forms.Form):
+    """
+    Alteração em lote das ocorrências pendentes de uma série;
+    campos em branco ficam como estão
+    """
+    
+    horario = forms.TimeField(
+        label='Novo horário',
+        required=False,
+        widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+        help_text='Move todas as consultas pendentes para este horário, no mesmo dia'
+    )
+    
+    duracao = forms.IntegerField(
+        label='Duração (minutos)',
+        required=False,
+        min_value=5,
+        max_value=480,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 5}),
+    )
+    
+    tipo = forms.ChoiceField(
+        choices=[('', '---------')] + Consulta.TIPO_CHOICES,
+        label='Tipo de Atendimento',
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    
+    motivo = forms.CharField(
+        label='Motivo da Consulta',
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+    )
+    
+    observacoes = forms.CharField(
+        label='Observações',
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+    )
+    
+    def alteracoes(self):
+        """Somente os campos preenchidos, no formato de series.editar_serie"""
+        return {campo: valor for campo, valor in self.cleaned_data.items() if valor not in (None, '')}
@@ -0,0 +1,61 @@
+"""
+Management command do agendador de consultas (consultas.agendador)
+Marca as faltas, gera os lembretes e drena a caixa de saída. Sem --loop roda
+uma vez (para o cron); com --loop repete a cada --intervalo segundos. Vários
+processos podem rodar ao mesmo tempo: as linhas são travadas com SKIP LOCKED.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from consultas.agendador import LOTE_PADRAO, drenar_saida, gerar_lembretes, marcar_faltas, obter_enviador
+
+
+class Command(BaseCommand):
+    help = 'Marca faltas, gera lembretes e envia as mensagens pendentes das consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Continua rodando até ser interrompido')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre as execuções com --loop')
+        parser.add_argument('--lote', type=int, default=LOTE_PADRAO, help='Linhas travadas por transação')
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        self.enviador = obter_enviador()
+        if not options['loop']:
+            self.executar()
+            return
+
+        self.stdout.write(self.style.WARNING(f'⏰ Agendador rodando a cada {options["intervalo"]}s (Ctrl+C para parar)'))
+        try:
+            while True:
+                close_old_connections()
+                self.executar()
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('👋 Agendador encerrado'))
+
+    def executar(self):
+        # cada passo repete enquanto encontrar lotes cheios
+        faltas = lembretes = enviadas = falhas = 0
+        while (alteradas := len(marcar_faltas(self.lote))):
+            faltas += alteradas
+            if alteradas < self.lote:
+                break
+        while (geradas := gerar_lembretes(self.lote)):
+            lembretes += geradas
+            if geradas < self.lote:
+                break
+        while True:
+            ok, erros = drenar_saida(self.lote, self.enviador)
+            enviadas, falhas = enviadas + ok, falhas + erros
+            # com falhas, a nova tentativa fica para a próxima execução
+            if erros or ok < self.lote:
+                break
+
+        self.stdout.write(f'  🚫 Faltas marcadas: {faltas}')
+        self.stdout.write(f'  🔔 Lembretes gerados: {lembretes}')
+        if falhas:
+            self.stdout.write(self.style.ERROR(f'  ⚠️  Falhas de envio: {falhas}'))
+        self.stdout.write(self.style.SUCCESS(f'✅ {enviadas} mensagens enviadas'))
@@ -0,0 +1,49 @@
+"""
+Management command para arquivar o histórico de consultas antigo
+Partições mensais inteiras mais antigas que a retenção viram arquivos JSONL
+compactados (gzip) no diretório de arquivo e são removidas do banco.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from consultas.particoes import arquivar_particao, nome_particao, particoes_mensais, somar_meses
+
+
+class Command(BaseCommand):
+    help = 'Move para arquivos .jsonl.gz as partições do histórico de consultas além da retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=settings.HISTORICO_RETENCAO_MESES,
+            help='Meses completos mantidos no banco (padrão: HISTORICO_RETENCAO_MESES)',
+        )
+        parser.add_argument(
+            '--destino', default=str(settings.HISTORICO_ARQUIVO_DIR),
+            help='Diretório dos arquivos (padrão: HISTORICO_ARQUIVO_DIR)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista as partições que seriam arquivadas')
+
+    def handle(self, *args, **options):
+        # mantém o mês atual e os `meses` anteriores completos
+        limite = somar_meses(timezone.now().date().replace(day=1), -options['meses'])
+        antigas = [mes for mes in particoes_mensais() if mes < limite]
+
+        self.stdout.write(self.style.WARNING(f'📦 Arquivando histórico anterior a {limite:%m/%Y}...'))
+        if not antigas:
+            self.stdout.write(self.style.SUCCESS('✅ Nenhuma partição para arquivar.'))
+            return
+
+        total = 0
+        for mes in antigas:
+            if options['dry_run']:
+                self.stdout.write(f'  🔍 {nome_particao(mes)}')
+                continue
+            caminho, linhas = arquivar_particao(mes, options['destino'])
+            total += linhas
+            self.stdout.write(f'  🗄️  {nome_particao(mes)}: {linhas} linhas -> {caminho}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(antigas)} partições seriam arquivadas.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(antigas)} partições arquivadas ({total} linhas)!'))
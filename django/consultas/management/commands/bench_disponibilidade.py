@@ -0,0 +1,98 @@
+"""
+Management command para medir o cálculo de horários livres
+Cria veterinários sintéticos (padrão: 20) com a agenda cheia de consultas
+nos próximos 30 dias e mede horarios_livres() para todos eles: a primeira
+chamada (cache vazio, uma consulta por veterinário) e as seguintes (cache).
+Tudo o que foi criado é removido no final.
+Só roda com --confirmar (app.benchmark): use um banco de desenvolvimento.
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from app.benchmark import adicionar_confirmacao, exigir_confirmacao
+from consultas.disponibilidade import horarios_livres
+from consultas.models import Consulta
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Mede o tempo de horarios_livres() para vários veterinários e dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--veterinarios', type=int, default=20)
+        parser.add_argument('--dias', type=int, default=30)
+        parser.add_argument('--ocupacao', type=float, default=0.6, help='Fração dos horários já agendada')
+        parser.add_argument('--rodadas', type=int, default=20, help='Repetições com o cache aquecido')
+        adicionar_confirmacao(parser)
+
+    def handle(self, *args, **options):
+        exigir_confirmacao(options)
+        aleatorio = random.Random(42)
+        sufixo = aleatorio.randrange(10**6)
+        tutor = User.objects.create(username=f'bench_tutor_{sufixo}', email=f'bench_tutor_{sufixo}@teste.com')
+        veterinarios = User.objects.bulk_create([
+            User(username=f'bench_vet_{sufixo}_{n}', email=f'bench_vet_{sufixo}_{n}@teste.com', user_type=User.VETERINARIO)
+            for n in range(options['veterinarios'])
+        ])
+        tipo = TipoAnimal.objects.create(nome=f'Bench {sufixo}')
+        raca = Raca.objects.create(nome='SRD', tipo_animal=tipo)
+        animal = Animal.objects.create(proprietario=tutor, nome='Rex', tipo_animal=tipo, raca=raca)
+
+        try:
+            hoje = timezone.localdate()
+            fim = hoje + timedelta(days=options['dias'] - 1)
+            consultas = self.popular(aleatorio, veterinarios, animal, tutor, hoje, options)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE consultas_consulta')
+            self.stdout.write(self.style.WARNING(
+                f'🩺 {len(veterinarios)} veterinários, {options["dias"]} dias, {consultas} consultas agendadas'
+            ))
+
+            cache.clear()
+            inicio = time.perf_counter()
+            resultado = horarios_livres(veterinarios, hoje, fim)
+            frio = (time.perf_counter() - inicio) * 1000
+            horarios = sum(len(dia['horarios']) for item in resultado for dia in item['dias'])
+
+            tempos = []
+            for _ in range(options['rodadas']):
+                inicio = time.perf_counter()
+                horarios_livres(veterinarios, hoje, fim)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+
+            self.stdout.write(f'  📊 {horarios} horários livres')
+            self.stdout.write(f'  ❄️  Cache vazio: {frio:.1f} ms')
+            self.stdout.write(f'  🔥 Cache aquecido: mediana {statistics.median(tempos):.1f} ms | máx {max(tempos):.1f} ms')
+            self.stdout.write(self.style.SUCCESS('✅ Benchmark concluído!'))
+        finally:
+            Consulta.objects.filter(animal=animal).delete()
+            animal.delete()
+            raca.delete()
+            tipo.delete()
+            User.objects.filter(pk__in=[veterinario.pk for veterinario in veterinarios] + [tutor.pk]).delete()
+
+    def popular(self, aleatorio, veterinarios, animal, tutor, hoje, options):
+        """Consultas de 30 minutos sem sobreposição, das 08h às 18h"""
+        fuso = timezone.get_current_timezone()
+        consultas = []
+        for veterinario in veterinarios:
+            for n in range(options['dias']):
+                dia = hoje + timedelta(days=n)
+                for meia_hora in range(20):
+                    if aleatorio.random() >= options['ocupacao']:
+                        continue
+                    data_hora = datetime(dia.year, dia.month, dia.day, 8, tzinfo=fuso) + timedelta(minutes=30 * meia_hora)
+                    consultas.append(Consulta(
+                        animal=animal, veterinario=veterinario, criado_por=tutor, data_hora=data_hora,
+                        duracao=30, data_fim=data_hora + timedelta(minutes=30), motivo='Benchmark',
+                    ))
+        Consulta.objects.bulk_create(consultas, batch_size=5000)
+        return len(consultas)
@@ -0,0 +1,34 @@
+"""
+Management command para manter as partições mensais do histórico de consultas
+Cria as partições do mês atual e dos próximos meses (rodar mensalmente, via
+cron, antes de o mês virar) e tira da partição padrão as linhas de meses que
+ainda não tinham partição própria.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from consultas.particoes import PADRAO, criar_particao, meses_na_particao_padrao, nome_particao, somar_meses
+
+
+class Command(BaseCommand):
+    help = 'Cria as partições mensais do histórico de consultas e esvazia a partição padrão'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses-a-frente', type=int, default=3, help='Meses futuros com partição criada')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🗂️  Mantendo partições do histórico de consultas...'))
+        atual = timezone.now().date().replace(day=1)
+        meses = set(meses_na_particao_padrao())
+        meses.update(somar_meses(atual, n) for n in range(options['meses_a_frente'] + 1))
+
+        criadas = 0
+        for mes in sorted(meses):
+            movidas = criar_particao(mes)
+            if movidas is None:
+                continue
+            criadas += 1
+            detalhe = f' ({movidas} linhas movidas de {PADRAO})' if movidas else ''
+            self.stdout.write(f'  ➕ {nome_particao(mes)}{detalhe}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {criadas} partições criadas!'))
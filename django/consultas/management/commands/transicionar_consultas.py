@@ -0,0 +1,37 @@
+"""
+Management command para mudar o status de várias consultas de uma vez
+Aplica a transição (com as regras de Consulta.TRANSICOES) em um único UPDATE
+e grava o histórico em lote. As consultas que não permitem a transição são
+listadas e ficam como estão.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from consultas.models import Consulta
+from consultas.transicoes import transicionar
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Confirma, cancela, inicia ou marca falta em várias consultas (por id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('status', choices=sorted(Consulta.TRANSICOES), help='Novo status')
+        parser.add_argument('ids', nargs='+', type=int, help='Ids das consultas')
+        parser.add_argument('--usuario', required=True, help='Username registrado no histórico')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+
+        ids = set(options['ids'])
+        self.stdout.write(self.style.WARNING(f'🔄 Alterando {len(ids)} consultas para {options["status"]}...'))
+        alteradas = transicionar(ids, options['status'], usuario)
+
+        ignoradas = sorted(ids - set(alteradas))
+        if ignoradas:
+            self.stdout.write(self.style.ERROR(
+                f'  ⚠️  Não permitem a transição (ou não existem): {", ".join(map(str, ignoradas))}'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(alteradas)} consultas alteradas!'))
@@ -0,0 +1,49 @@
+import consultas.models
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0001_initial'),
+    ]
+
+    operations = [
+        # permite usar "=" (veterinario_id) em um índice GiST junto com o range
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='consulta',
+            name='duracao',
+            field=models.PositiveSmallIntegerField(default=30, help_text='Tempo reservado na agenda do veterinário', verbose_name='Duração (minutos)'),
+        ),
+        migrations.AddField(
+            model_name='consulta',
+            name='data_fim',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Término'),
+        ),
+        migrations.RunSQL(
+            "UPDATE consultas_consulta SET data_fim = data_hora + duracao * interval '1 minute'",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='consulta',
+            name='data_fim',
+            field=models.DateTimeField(editable=False, verbose_name='Término'),
+        ),
+        # Falha se já houver consultas sobrepostas do mesmo veterinário:
+        # cancele ou remarque as duplicadas antes de migrar
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(('status', 'CANCELADA'), _negated=True),
+                expressions=[
+                    ('veterinario', '='),
+                    (consultas.models.TsTzRange('data_hora', 'data_fim', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&'),
+                ],
+                name='consulta_sem_sobreposicao',
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0002_consulta_duracao_sem_sobreposicao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioAtendimento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da Semana')),
+                ('inicio', models.TimeField(verbose_name='Início')),
+                ('fim', models.TimeField(verbose_name='Fim')),
+                ('veterinario', models.ForeignKey(limit_choices_to={'user_type': 'VETERINARIO'}, on_delete=django.db.models.deletion.CASCADE, related_name='horarios_atendimento', to=settings.AUTH_USER_MODEL, verbose_name='Veterinário')),
+            ],
+            options={
+                'verbose_name': 'Horário de Atendimento',
+                'verbose_name_plural': 'Horários de Atendimento',
+                'ordering': ['veterinario', 'dia_semana', 'inicio'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('inicio__lt', models.F('fim'))), name='horario_atendimento_inicio_antes_do_fim')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0003_horario_atendimento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieConsulta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intervalo_semanas', models.PositiveSmallIntegerField(verbose_name='Repetir a cada (semanas)')),
+                ('ocorrencias', models.PositiveSmallIntegerField(verbose_name='Ocorrências')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('criado_por', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='series_consultas_criadas', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+                ('veterinario', models.ForeignKey(limit_choices_to={'user_type': 'VETERINARIO'}, on_delete=django.db.models.deletion.PROTECT, related_name='series_consultas', to=settings.AUTH_USER_MODEL, verbose_name='Veterinário')),
+            ],
+            options={
+                'verbose_name': 'Série de Consultas',
+                'verbose_name_plural': 'Séries de Consultas',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AddField(
+            model_name='consulta',
+            name='serie',
+            field=models.ForeignKey(blank=True, help_text='Agendamento recorrente do qual a consulta faz parte', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consultas', to='consultas.serieconsulta', verbose_name='Série'),
+        ),
+        migrations.AddConstraint(
+            model_name='serieconsulta',
+            constraint=models.CheckConstraint(condition=models.Q(('intervalo_semanas__gte', 1), ('ocorrencias__gte', 2)), name='serie_consulta_recorrencia_valida'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0004_serie_consulta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicoconsulta',
+            name='criado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
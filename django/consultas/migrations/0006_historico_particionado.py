@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A tabela é recriada particionada por intervalo de criado_em (uma partição
+# por mês, em UTC). A chave primária de uma tabela particionada precisa
+# incluir a coluna de partição: passa a ser (id, criado_em); o id continua
+# vindo de uma sequence e é único na prática. A partição padrão recebe o que
+# cair fora dos meses criados (ver consultas.particoes).
+PARTICIONAR_SQL = """
+ALTER TABLE consultas_historicoconsulta RENAME TO consultas_historicoconsulta_antiga;
+ALTER TABLE consultas_historicoconsulta_antiga ALTER COLUMN id DROP IDENTITY;
+DROP INDEX consultas_historicoconsulta_consulta_id_7e999bd8;
+DROP INDEX consultas_historicoconsulta_usuario_id_0de2a9d2;
+
+CREATE SEQUENCE consultas_historicoconsulta_id_seq;
+CREATE TABLE consultas_historicoconsulta (
+    id bigint NOT NULL DEFAULT nextval('consultas_historicoconsulta_id_seq'),
+    acao varchar(30) NOT NULL,
+    descricao text NOT NULL,
+    criado_em timestamp with time zone NOT NULL,
+    consulta_id bigint NOT NULL
+        CONSTRAINT consultas_historicoc_consulta_id_7e999bd8_fk_consultas
+        REFERENCES consultas_consulta (id) DEFERRABLE INITIALLY DEFERRED,
+    usuario_id bigint NOT NULL
+        CONSTRAINT consultas_historicoc_usuario_id_0de2a9d2_fk_users_use
+        REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, criado_em)
+) PARTITION BY RANGE (criado_em);
+ALTER SEQUENCE consultas_historicoconsulta_id_seq OWNED BY consultas_historicoconsulta.id;
+
+CREATE TABLE consultas_historicoconsulta_padrao PARTITION OF consultas_historicoconsulta DEFAULT;
+CREATE INDEX historico_consulta_criado_idx ON consultas_historicoconsulta (consulta_id, criado_em);
+CREATE INDEX consultas_historicoconsulta_usuario_id_0de2a9d2 ON consultas_historicoconsulta (usuario_id);
+"""
+
+COPIAR_SQL = """
+INSERT INTO consultas_historicoconsulta (id, acao, descricao, criado_em, consulta_id, usuario_id)
+    SELECT id, acao, descricao, criado_em, consulta_id, usuario_id FROM consultas_historicoconsulta_antiga;
+SELECT setval('consultas_historicoconsulta_id_seq', coalesce(max(id), 0) + 1, false) FROM consultas_historicoconsulta;
+DROP TABLE consultas_historicoconsulta_antiga;
+"""
+
+DESPARTICIONAR_SQL = """
+CREATE TABLE consultas_historicoconsulta_antiga (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    acao varchar(30) NOT NULL,
+    descricao text NOT NULL,
+    criado_em timestamp with time zone NOT NULL,
+    consulta_id bigint NOT NULL,
+    usuario_id bigint NOT NULL
+);
+INSERT INTO consultas_historicoconsulta_antiga (id, acao, descricao, criado_em, consulta_id, usuario_id)
+    SELECT id, acao, descricao, criado_em, consulta_id, usuario_id FROM consultas_historicoconsulta;
+DROP TABLE consultas_historicoconsulta;
+ALTER TABLE consultas_historicoconsulta_antiga RENAME TO consultas_historicoconsulta;
+SELECT setval(pg_get_serial_sequence('consultas_historicoconsulta', 'id'), coalesce(max(id), 0) + 1, false)
+    FROM consultas_historicoconsulta;
+ALTER TABLE consultas_historicoconsulta
+    ADD CONSTRAINT consultas_historicoc_consulta_id_7e999bd8_fk_consultas
+    FOREIGN KEY (consulta_id) REFERENCES consultas_consulta (id) DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE consultas_historicoconsulta
+    ADD CONSTRAINT consultas_historicoc_usuario_id_0de2a9d2_fk_users_use
+    FOREIGN KEY (usuario_id) REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX consultas_historicoconsulta_consulta_id_7e999bd8 ON consultas_historicoconsulta (consulta_id);
+CREATE INDEX consultas_historicoconsulta_usuario_id_0de2a9d2 ON consultas_historicoconsulta (usuario_id);
+"""
+
+# meses criados além do atual; depois disso o comando manter_particoes_historico
+MESES_A_FRENTE = 3
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def criar_particoes_mensais(apps, schema_editor):
+    """Uma partição por mês, do histórico mais antigo até MESES_A_FRENTE meses à frente"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(criado_em) FROM consultas_historicoconsulta_antiga")
+        mais_antigo = cursor.fetchone()[0]
+        hoje = datetime.now(timezone.utc).date().replace(day=1)
+        mes = (mais_antigo.astimezone(timezone.utc).date().replace(day=1) if mais_antigo else hoje)
+        ultimo = hoje
+        for _ in range(MESES_A_FRENTE):
+            ultimo = _mes_seguinte(ultimo)
+        while mes <= ultimo:
+            proximo = _mes_seguinte(mes)
+            cursor.execute(
+                f"CREATE TABLE consultas_historicoconsulta_p{mes:%Y%m} PARTITION OF consultas_historicoconsulta "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [datetime(mes.year, mes.month, 1, tzinfo=timezone.utc), datetime(proximo.year, proximo.month, 1, tzinfo=timezone.utc)],
+            )
+            mes = proximo
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0005_historico_criado_em_default'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='historicoconsulta',
+                    name='consulta',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historico', to='consultas.consulta', verbose_name='Consulta'),
+                ),
+                migrations.AddIndex(
+                    model_name='historicoconsulta',
+                    index=models.Index(fields=['consulta', 'criado_em'], name='historico_consulta_criado_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(PARTICIONAR_SQL, migrations.RunSQL.noop),
+                migrations.RunPython(criar_particoes_mensais, migrations.RunPython.noop),
+                migrations.RunSQL(COPIAR_SQL, DESPARTICIONAR_SQL),
+            ],
+        ),
+    ]
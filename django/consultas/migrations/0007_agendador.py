@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0006_historico_particionado'),
+        ('pets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensagemSaida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('LEMBRETE', 'Lembrete de Consulta')], max_length=20, verbose_name='Tipo')),
+                ('destinatario', models.EmailField(blank=True, max_length=254, verbose_name='Destinatário')),
+                ('assunto', models.CharField(max_length=200, verbose_name='Assunto')),
+                ('corpo', models.TextField(verbose_name='Corpo')),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Último erro')),
+            ],
+            options={
+                'verbose_name': 'Mensagem de Saída',
+                'verbose_name_plural': 'Mensagens de Saída',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['status', 'data_hora'], name='consulta_status_data_idx'),
+        ),
+        migrations.AddField(
+            model_name='mensagemsaida',
+            name='consulta',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mensagens', to='consultas.consulta', verbose_name='Consulta'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemsaida',
+            index=models.Index(condition=models.Q(('enviado_em__isnull', True)), fields=['criado_em'], name='mensagem_saida_pendente_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mensagemsaida',
+            constraint=models.UniqueConstraint(fields=('consulta', 'tipo'), name='mensagem_saida_unica_por_consulta'),
+        ),
+    ]
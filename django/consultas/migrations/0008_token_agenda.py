@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0007_agendador'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(editable=False, max_length=64, unique=True)),
+                ('criado_em', models.DateTimeField(auto_now=True)),
+                ('veterinario', models.OneToOneField(limit_choices_to={'user_type': 'VETERINARIO'}, on_delete=django.db.models.deletion.CASCADE, related_name='token_agenda', to=settings.AUTH_USER_MODEL, verbose_name='Veterinário')),
+            ],
+            options={
+                'verbose_name': 'Token da Agenda',
+                'verbose_name_plural': 'Tokens da Agenda',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:19
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultas', '0008_token_agenda'),
+        ('pets', '0002_busca_trigram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consulta',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('motivo'), name='gin_trgm_ops'), name='consulta_motivo_trgm'),
+        ),
+    ]
@@ -12,15 +12,30 @@ Relacionamentos:
 - Um Prontuario pertence a UMA consulta
 - Uma Receita pertence a UM prontuário
 - HistoricoConsulta registra todas as ações realizadas
+- Uma Consulta pode fazer parte de UMA SerieConsulta (agendamento recorrente)
+- MensagemSaida guarda os lembretes a enviar (outbox do consultas.agendador)
+- TokenAgenda dá acesso ao feed iCalendar da agenda de UM veterinário
 """
 
+from datetime import timedelta
+import secrets
+
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from app.busca import indice_trigram
 from pets.models import Animal
 
 
+class TsTzRange(models.Func):
+    """tstzrange(inicio, fim, '[)') do PostgreSQL"""
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
 class Consulta(models.Model):
     """
     Representa uma consulta veterinária agendada ou realizada
@@ -67,6 +82,15 @@ class Consulta(models.Model):
         help_text='Data e hora da consulta'
     )
     
+    duracao = models.PositiveSmallIntegerField(
+        default=30,
+        verbose_name='Duração (minutos)',
+        help_text='Tempo reservado na agenda do veterinário'
+    )
+    
+    # data_hora + duracao, calculado no save(); usado pela constraint de conflito
+    data_fim = models.DateTimeField(editable=False, verbose_name='Término')
+    
     tipo = models.CharField(
         max_length=20,
         choices=TIPO_CHOICES,
@@ -92,6 +116,16 @@ class Consulta(models.Model):
         help_text='Observações adicionais sobre o agendamento'
     )
     
+    serie = models.ForeignKey(
+        'SerieConsulta',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='consultas',
+        verbose_name='Série',
+        help_text='Agendamento recorrente do qual a consulta faz parte'
+    )
+    
     # Controle
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
@@ -109,11 +143,71 @@ class Consulta(models.Model):
         indexes = [
             models.Index(fields=['data_hora', 'veterinario']),
             models.Index(fields=['animal', 'data_hora']),
+            # consultas pendentes vencidas ou próximas (consultas.agendador)
+            models.Index(fields=['status', 'data_hora'], name='consulta_status_data_idx'),
+            # busca da lista de consultas (app.busca)
+            indice_trigram('motivo', 'consulta_motivo_trgm'),
+        ]
+        constraints = [
+            # Um veterinário não pode ter duas consultas no mesmo horário.
+            # Verificado pelo próprio banco (índice GiST), sem corrida entre
+            # agendamentos simultâneos; consultas canceladas liberam o horário.
+            ExclusionConstraint(
+                name='consulta_sem_sobreposicao',
+                expressions=[
+                    ('veterinario', RangeOperators.EQUAL),
+                    (TsTzRange('data_hora', 'data_fim', RangeBoundary()), RangeOperators.OVERLAPS),
+                ],
+                condition=~models.Q(status='CANCELADA'),
+            ),
         ]
     
+    CONSTRAINT_SOBREPOSICAO = 'consulta_sem_sobreposicao'
+    
     def __str__(self):
         return f"{self.animal.nome} - {self.get_tipo_display()} - {self.data_hora.strftime('%d/%m/%Y %H:%M')}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # guarda o horário lido do banco para invalidar também o dia antigo
+        # no cache de disponibilidade quando a consulta é remarcada
+        instance._agenda_carregada = (
+            instance.__dict__.get('veterinario_id'),
+            instance.__dict__.get('data_hora'),
+            instance.__dict__.get('data_fim'),
+        )
+        return instance
+    
+    def calcular_fim(self):
+        """Atualiza data_fim a partir de data_hora e duracao"""
+        if self.data_hora and self.duracao:
+            self.data_fim = self.data_hora + timedelta(minutes=self.duracao)
+        return self.data_fim
+    
+    def save(self, *args, **kwargs):
+        self.calcular_fim()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'data_hora', 'duracao'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'data_fim'}
+        super().save(*args, **kwargs)
+        self._invalidar_disponibilidade()
+        self._agenda_carregada = (self.veterinario_id, self.data_hora, self.data_fim)
+    
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self._invalidar_disponibilidade()
+        return resultado
+    
+    def _invalidar_disponibilidade(self):
+        """Apaga do cache os dias afetados (horário atual e o anterior)"""
+        from .disponibilidade import invalidar_periodo
+        
+        anterior = getattr(self, '_agenda_carregada', None)
+        if anterior and anterior[1]:
+            invalidar_periodo(*anterior)
+        invalidar_periodo(self.veterinario_id, self.data_hora, self.data_fim)
+    
     def clean(self):
         """Validações customizadas"""
         # Verifica veterinario apenas se já foi setado (pode ser None durante criação via form)
@@ -128,20 +222,137 @@ class Consulta(models.Model):
         if not self.pk and self.data_hora and self.data_hora < timezone.now():
             raise ValidationError({'data_hora': 'Não é possível agendar consultas no passado.'})
     
+    # Transições de status: novo status -> status de origem permitidos.
+    # Os pode_*() abaixo e as transições em lote (consultas.transicoes) usam este mapa.
+    TRANSICOES = {
+        'CONFIRMADA': ['AGENDADA'],
+        'EM_ATENDIMENTO': ['AGENDADA', 'CONFIRMADA'],
+        'CANCELADA': ['AGENDADA', 'CONFIRMADA'],
+        # FALTOU só depois do horário marcado
+        'FALTOU': ['AGENDADA', 'CONFIRMADA'],
+    }
+    
+    def pode_transicionar(self, status, agora=None):
+        if self.status not in self.TRANSICOES.get(status, []):
+            return False
+        if status == 'FALTOU':
+            return self.data_hora <= (agora or timezone.now())
+        return True
+    
     def pode_editar(self):
         return self.status in ['AGENDADA', 'CONFIRMADA']
     
     def pode_cancelar(self):
-        return self.status in ['AGENDADA', 'CONFIRMADA']
+        return self.pode_transicionar('CANCELADA')
     
     def pode_iniciar_atendimento(self):
-        return self.status in ['AGENDADA', 'CONFIRMADA']
+        return self.pode_transicionar('EM_ATENDIMENTO')
+    
+    def pode_confirmar(self):
+        return self.pode_transicionar('CONFIRMADA')
+    
+    def pode_marcar_falta(self):
+        return self.pode_transicionar('FALTOU')
     
     @property
     def tem_prontuario(self):
         return hasattr(self, 'prontuario')
 
 
+class HorarioAtendimento(models.Model):
+    """
+    Janela de atendimento semanal de um veterinário (ex.: segunda, 08:00-12:00).
+    Um dia pode ter várias janelas; veterinários sem nenhuma usam
+    HORARIO_ATENDIMENTO_PADRAO das settings. Usado por consultas.disponibilidade.
+    """
+    DIA_SEMANA_CHOICES = [
+        (0, 'Segunda-feira'),
+        (1, 'Terça-feira'),
+        (2, 'Quarta-feira'),
+        (3, 'Quinta-feira'),
+        (4, 'Sexta-feira'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+    
+    veterinario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='horarios_atendimento',
+        limit_choices_to={'user_type': 'VETERINARIO'},
+        verbose_name='Veterinário'
+    )
+    dia_semana = models.PositiveSmallIntegerField(choices=DIA_SEMANA_CHOICES, verbose_name='Dia da Semana')
+    inicio = models.TimeField(verbose_name='Início')
+    fim = models.TimeField(verbose_name='Fim')
+    
+    class Meta:
+        verbose_name = 'Horário de Atendimento'
+        verbose_name_plural = 'Horários de Atendimento'
+        ordering = ['veterinario', 'dia_semana', 'inicio']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(inicio__lt=models.F('fim')), name='horario_atendimento_inicio_antes_do_fim'),
+        ]
+    
+    def __str__(self):
+        return f"{self.veterinario} - {self.get_dia_semana_display()} {self.inicio:%H:%M}-{self.fim:%H:%M}"
+    
+    def save(self, *args, **kwargs):
+        from .disponibilidade import invalidar_veterinario
+        super().save(*args, **kwargs)
+        invalidar_veterinario(self.veterinario_id)
+    
+    def delete(self, *args, **kwargs):
+        from .disponibilidade import invalidar_veterinario
+        resultado = super().delete(*args, **kwargs)
+        invalidar_veterinario(self.veterinario_id)
+        return resultado
+
+
+class SerieConsulta(models.Model):
+    """
+    Agendamento recorrente: a mesma consulta a cada N semanas, M vezes
+    (esquemas de vacinação, retornos). As ocorrências são Consultas comuns
+    ligadas à série, criadas de uma vez por consultas.series.criar_serie.
+    """
+    veterinario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name='series_consultas',
+        limit_choices_to={'user_type': 'VETERINARIO'},
+        verbose_name='Veterinário'
+    )
+    intervalo_semanas = models.PositiveSmallIntegerField(verbose_name='Repetir a cada (semanas)')
+    ocorrencias = models.PositiveSmallIntegerField(verbose_name='Ocorrências')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    criado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        related_name='series_consultas_criadas',
+        verbose_name='Criado por'
+    )
+    
+    class Meta:
+        verbose_name = 'Série de Consultas'
+        verbose_name_plural = 'Séries de Consultas'
+        ordering = ['-criado_em']
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(intervalo_semanas__gte=1, ocorrencias__gte=2),
+                name='serie_consulta_recorrencia_valida',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.ocorrencias}x a cada {self.intervalo_semanas} semana(s)"
+
+
+def conflito_de_horario(erro):
+    """Indica se o IntegrityError veio da constraint de sobreposição de consultas"""
+    diagnostico = getattr(erro.__cause__, 'diag', None)
+    return getattr(diagnostico, 'constraint_name', None) == Consulta.CONSTRAINT_SOBREPOSICAO
+
+
 class Prontuario(models.Model):
     consulta = models.OneToOneField(Consulta, on_delete=models.PROTECT, related_name='prontuario', verbose_name='Consulta', help_text='Consulta relacionada a este prontuário')
     peso = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, verbose_name='Peso (kg)', help_text='Peso do animal em quilogramas')
@@ -193,16 +404,88 @@ class Receita(models.Model):
 
 class HistoricoConsulta(models.Model):
     ACAO_CHOICES = [('AGENDAMENTO', 'Agendamento Criado'), ('CONFIRMACAO', 'Consulta Confirmada'), ('INICIO_ATENDIMENTO', 'Atendimento Iniciado'), ('PRONTUARIO_CRIADO', 'Prontuário Criado'), ('PRONTUARIO_ATUALIZADO', 'Prontuário Atualizado'), ('RECEITA_ADICIONADA', 'Receita Adicionada'), ('CANCELAMENTO', 'Consulta Cancelada'), ('OBSERVACAO', 'Observação Adicionada')]
-    consulta = models.ForeignKey(Consulta, on_delete=models.CASCADE, related_name='historico', verbose_name='Consulta')
+    # db_index=False: o índice (consulta, criado_em) de Meta.indexes já atende
+    consulta = models.ForeignKey(Consulta, on_delete=models.CASCADE, related_name='historico', verbose_name='Consulta', db_index=False)
     acao = models.CharField(max_length=30, choices=ACAO_CHOICES, verbose_name='Ação')
     descricao = models.TextField(verbose_name='Descrição', help_text='Detalhes da ação realizada')
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, verbose_name='Usuário', help_text='Usuário que realizou a ação')
-    criado_em = models.DateTimeField(auto_now_add=True)
+    # default em vez de auto_now_add: consultas.auditoria grava depois, com o horário do registro
+    criado_em = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         verbose_name = 'Histórico de Consulta'
         verbose_name_plural = 'Históricos de Consultas'
         ordering = ['-criado_em']
+        # a tabela é particionada por mês de criado_em (migração 0006, consultas.particoes)
+        indexes = [
+            models.Index(fields=['consulta', 'criado_em'], name='historico_consulta_criado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_acao_display()} - {self.consulta} - {self.criado_em.strftime('%d/%m/%Y %H:%M')}"
+
+
+class MensagemSaida(models.Model):
+    """
+    Caixa de saída (outbox): mensagens geradas pelo agendador
+    (consultas.agendador) e entregues depois pelo enviador configurado em
+    MENSAGENS_ENVIADOR. Uma mensagem de cada tipo por consulta.
+    """
+    TIPO_CHOICES = [('LEMBRETE', 'Lembrete de Consulta')]
+    
+    consulta = models.ForeignKey(Consulta, on_delete=models.CASCADE, related_name='mensagens', verbose_name='Consulta')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name='Tipo')
+    destinatario = models.EmailField(blank=True, verbose_name='Destinatário')
+    assunto = models.CharField(max_length=200, verbose_name='Assunto')
+    corpo = models.TextField(verbose_name='Corpo')
+    criado_em = models.DateTimeField(default=timezone.now, editable=False)
+    enviado_em = models.DateTimeField(null=True, blank=True, verbose_name='Enviado em')
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    erro = models.TextField(blank=True, verbose_name='Último erro')
+    
+    class Meta:
+        verbose_name = 'Mensagem de Saída'
+        verbose_name_plural = 'Mensagens de Saída'
+        ordering = ['-criado_em']
+        constraints = [
+            models.UniqueConstraint(fields=['consulta', 'tipo'], name='mensagem_saida_unica_por_consulta'),
+        ]
+        indexes = [
+            # só as pendentes: a fila que os workers drenam
+            models.Index(fields=['criado_em'], condition=models.Q(enviado_em__isnull=True), name='mensagem_saida_pendente_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.destinatario or 'sem destinatário'}"
+
+
+class TokenAgenda(models.Model):
+    """
+    Token secreto do feed .ics da agenda do veterinário (consultas.calendario).
+    Aplicativos de calendário não fazem login: quem tem o link vê a agenda,
+    então gerar um token novo invalida o link anterior.
+    """
+    veterinario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='token_agenda',
+        limit_choices_to={'user_type': 'VETERINARIO'},
+        verbose_name='Veterinário'
+    )
+    token = models.CharField(max_length=64, unique=True, editable=False)
+    criado_em = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Token da Agenda'
+        verbose_name_plural = 'Tokens da Agenda'
+    
+    def __str__(self):
+        return f"Agenda de {self.veterinario}"
+    
+    @classmethod
+    def gerar(cls, veterinario):
+        """Cria (ou troca) o token do veterinário"""
+        token, _ = cls.objects.update_or_create(
+            veterinario=veterinario, defaults={'token': secrets.token_urlsafe(32)}
+        )
+        return token
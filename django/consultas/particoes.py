@@ -0,0 +1,147 @@
+"""
+Particionamento mensal do histórico das consultas
+
+consultas_historicoconsulta é particionada por intervalo de criado_em, uma
+partição por mês (UTC): consultas_historicoconsulta_pAAAAMM. A partição
+padrão (_padrao) recebe o que cair fora dos meses criados, para um INSERT
+nunca falhar; o comando manter_particoes_historico cria os meses seguintes
+com antecedência e tira da partição padrão as linhas de meses que ganharam
+partição própria.
+
+Partições antigas são arquivadas por arquivar_historico: as linhas vão para
+um arquivo JSONL compactado e a partição inteira é removida (DROP TABLE, sem
+DELETE linha a linha nem VACUUM).
+"""
+
+import gzip
+import json
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from .models import HistoricoConsulta
+
+TABELA = HistoricoConsulta._meta.db_table
+PADRAO = f'{TABELA}_padrao'
+
+_NOME_MENSAL = re.compile(rf'^{TABELA}_p(\d{{4}})(\d{{2}})$')
+
+CAMPOS_ARQUIVO = ['id', 'consulta_id', 'acao', 'descricao', 'usuario_id', 'criado_em']
+
+
+def mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def somar_meses(mes, meses):
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(mes):
+    return f'{TABELA}_p{mes.year:04d}{mes.month:02d}'
+
+
+def _limites(mes):
+    inicio = datetime(mes.year, mes.month, 1, tzinfo=dt_timezone.utc)
+    proximo = mes_seguinte(mes)
+    return inicio, datetime(proximo.year, proximo.month, 1, tzinfo=dt_timezone.utc)
+
+
+def particoes_mensais():
+    """Meses (date do dia 1) que têm partição própria, em ordem"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass',
+            [TABELA],
+        )
+        nomes = [nome for nome, in cursor.fetchall()]
+    meses = []
+    for nome in nomes:
+        encontrado = _NOME_MENSAL.match(nome)
+        if encontrado:
+            meses.append(date(int(encontrado[1]), int(encontrado[2]), 1))
+    return sorted(meses)
+
+
+@transaction.atomic
+def criar_particao(mes):
+    """
+    Cria a partição do mês se ainda não existe. Linhas do mês que estejam na
+    partição padrão são movidas para ela. Retorna quantas linhas foram movidas,
+    ou None se a partição já existia.
+    """
+    if mes in particoes_mensais():
+        return None
+    nome = connection.ops.quote_name(nome_particao(mes))
+    tabela = connection.ops.quote_name(TABELA)
+    padrao = connection.ops.quote_name(PADRAO)
+    inicio, fim = _limites(mes)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {padrao} WHERE criado_em >= %s AND criado_em < %s)', [inicio, fim])
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'CREATE TABLE {nome} PARTITION OF {tabela} FOR VALUES FROM (%s) TO (%s)', [inicio, fim])
+            return 0
+
+        # o ATTACH recusa uma faixa que ainda tem linhas na partição padrão
+        cursor.execute(f'CREATE TABLE {nome} (LIKE {tabela} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH movidas AS ('
+            f'  DELETE FROM {padrao} WHERE criado_em >= %s AND criado_em < %s RETURNING *'
+            f') INSERT INTO {nome} SELECT * FROM movidas',
+            [inicio, fim],
+        )
+        movidas = cursor.rowcount
+        cursor.execute(f'ALTER TABLE {tabela} ATTACH PARTITION {nome} FOR VALUES FROM (%s) TO (%s)', [inicio, fim])
+    return movidas
+
+
+def meses_na_particao_padrao():
+    """Meses com linhas na partição padrão (que ainda não têm partição própria)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', criado_em AT TIME ZONE 'UTC')::date "
+            f'FROM {connection.ops.quote_name(PADRAO)} ORDER BY 1'
+        )
+        return [mes for mes, in cursor.fetchall()]
+
+
+def arquivar_particao(mes, diretorio, chunk_size=2000):
+    """
+    Grava as linhas do mês em <diretorio>/<partição>.jsonl.gz e remove a
+    partição. O arquivo é escrito com outro nome e renomeado no fim, então
+    um arquivo com o nome final está sempre completo. Retorna (caminho, linhas).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, f'{nome_particao(mes)}.jsonl.gz')
+    temporario = f'{caminho}.parcial'
+    inicio, fim = _limites(mes)
+
+    with transaction.atomic():
+        # impede novas linhas no mês enquanto o arquivo é escrito
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(nome_particao(mes))} IN SHARE MODE')
+
+        linhas = 0
+        consulta = (
+            HistoricoConsulta.objects.filter(criado_em__gte=inicio, criado_em__lt=fim)
+            .order_by('id')
+            .values_list(*CAMPOS_ARQUIVO)
+        )
+        with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+            for valores in consulta.iterator(chunk_size=chunk_size):
+                registro = dict(zip(CAMPOS_ARQUIVO, valores))
+                registro['criado_em'] = registro['criado_em'].isoformat()
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                linhas += 1
+        os.replace(temporario, caminho)
+
+        with connection.cursor() as cursor:
+            nome = connection.ops.quote_name(nome_particao(mes))
+            cursor.execute(f'ALTER TABLE {connection.ops.quote_name(TABELA)} DETACH PARTITION {nome}')
+            cursor.execute(f'DROP TABLE {nome}')
+    return caminho, linhas
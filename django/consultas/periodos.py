@@ -0,0 +1,50 @@
+"""
+Janelas de datas locais como intervalos de timestamps
+
+Filtrar por data_hora__date (ou __date__gte/__lte) faz o Postgres converter
+cada linha para o fuso local antes de comparar — a coluna fica dentro de uma
+função e o índice (data_hora, veterinario) não pode ser usado. Aqui dias e
+semanas do calendário local (TIME_ZONE, America/Sao_Paulo) viram intervalos
+semiabertos [inicio, fim) em UTC, comparados direto com a coluna:
+
+    Consulta.objects.filter(periodo_dia(hoje).q())
+    Count('id', filter=periodo_semana(hoje).q())
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import NamedTuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Periodo(NamedTuple):
+    """Intervalo semiaberto [inicio, fim) de datetimes em UTC"""
+    inicio: datetime
+    fim: datetime
+
+    def q(self, campo='data_hora'):
+        return Q(**{f'{campo}__gte': self.inicio, f'{campo}__lt': self.fim})
+
+    def __contains__(self, momento):
+        return self.inicio <= momento < self.fim
+
+
+def inicio_do_dia(dia):
+    """Meia-noite local do dia, em UTC"""
+    return datetime.combine(dia, time.min, tzinfo=timezone.get_default_timezone()).astimezone(dt_timezone.utc)
+
+
+def periodo_dias(primeiro, ultimo):
+    """Do início de primeiro ao fim de ultimo (datas locais, inclusive)"""
+    return Periodo(inicio_do_dia(primeiro), inicio_do_dia(ultimo + timedelta(days=1)))
+
+
+def periodo_dia(dia):
+    return periodo_dias(dia, dia)
+
+
+def periodo_semana(dia):
+    """Semana (segunda a domingo) que contém o dia"""
+    segunda = dia - timedelta(days=dia.weekday())
+    return periodo_dias(segunda, segunda + timedelta(days=6))
@@ -0,0 +1,189 @@
+"""
+Agendamentos recorrentes (SerieConsulta)
+
+Uma série é materializada de uma vez: uma consulta ao banco verifica o
+conflito de todas as ocorrências e um bulk_create grava as consultas; o
+histórico vai junto com o do request (consultas.auditoria), após o commit. Editar ou cancelar a série age sobre as ocorrências futuras
+ainda pendentes, também em lote.
+
+bulk_create/bulk_update/update() não passam por Consulta.save() nem pelos
+sinais: o cache de disponibilidade e os contadores do dashboard são
+invalidados aqui.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.contrib.postgres.fields import RangeBoundary
+from django.db.models import Q
+from django.utils import timezone
+from .auditoria import registrar_historicos
+from .disponibilidade import invalidar_periodo
+from .estatisticas import invalidar_estatisticas
+from .models import Consulta, HistoricoConsulta, SerieConsulta, TsTzRange
+
+# ocorrências que ainda podem ser editadas/canceladas (Consulta.pode_editar/pode_cancelar)
+STATUS_PENDENTES = ['AGENDADA', 'CONFIRMADA']
+
+MAX_OCORRENCIAS = 52
+
+
+class ConflitoNaSerie(Exception):
+    """Alguma ocorrência da série cai sobre outra consulta do veterinário"""
+
+    def __init__(self, horarios):
+        self.horarios = horarios
+        super().__init__('Conflito de horário em: ' + ', '.join(
+            timezone.localtime(horario).strftime('%d/%m/%Y %H:%M') for horario in horarios
+        ))
+
+
+def datas_da_serie(data_hora, intervalo_semanas, ocorrencias):
+    """Início de cada ocorrência, mantendo o horário local da primeira"""
+    primeira = timezone.localtime(data_hora)
+    return [primeira + timedelta(weeks=intervalo_semanas * n) for n in range(ocorrencias)]
+
+
+def _conflitos(veterinario_id, periodos, ignorar_ids=()):
+    """
+    Início das consultas não canceladas do veterinário que se sobrepõem a
+    algum dos períodos [(inicio, fim)], em uma única consulta (índice GiST
+    da constraint consulta_sem_sobreposicao)
+    """
+    sobreposicao = Q()
+    for inicio, fim in periodos:
+        sobreposicao |= Q(periodo__overlap=DateTimeTZRange(inicio, fim))
+    return list(
+        Consulta.objects.filter(veterinario_id=veterinario_id)
+        .exclude(status='CANCELADA')
+        .exclude(pk__in=ignorar_ids)
+        .annotate(periodo=TsTzRange('data_hora', 'data_fim', RangeBoundary()))
+        .filter(sobreposicao)
+        .order_by('data_hora')
+        .values_list('data_hora', flat=True)
+    )
+
+
+def _invalidar_caches(veterinario_id, periodos):
+    for inicio, fim in periodos:
+        invalidar_periodo(veterinario_id, inicio, fim)
+    transaction.on_commit(lambda: invalidar_estatisticas(veterinario_id))
+
+
+def _historico(consultas, acao, descricoes, usuario):
+    registrar_historicos([
+        HistoricoConsulta(consulta=consulta, acao=acao, descricao=descricao, usuario=usuario)
+        for consulta, descricao in zip(consultas, descricoes)
+    ])
+
+
+@transaction.atomic
+def criar_serie(consulta, intervalo_semanas, ocorrencias, usuario):
+    """
+    Agenda as ocorrências a partir de uma consulta ainda não salva (a
+    primeira da série). Levanta ConflitoNaSerie se alguma cair sobre outra
+    consulta; um agendamento concorrente ainda é barrado pela constraint
+    (IntegrityError, ver conflito_de_horario).
+    """
+    duracao = timedelta(minutes=consulta.duracao)
+    inicios = datas_da_serie(consulta.data_hora, intervalo_semanas, ocorrencias)
+    conflitos = _conflitos(consulta.veterinario_id, [(inicio, inicio + duracao) for inicio in inicios])
+    if conflitos:
+        raise ConflitoNaSerie(conflitos)
+
+    serie = SerieConsulta.objects.create(
+        veterinario_id=consulta.veterinario_id,
+        intervalo_semanas=intervalo_semanas,
+        ocorrencias=ocorrencias,
+        criado_por=usuario,
+    )
+    consultas = Consulta.objects.bulk_create([
+        Consulta(
+            animal_id=consulta.animal_id,
+            veterinario_id=consulta.veterinario_id,
+            data_hora=inicio,
+            duracao=consulta.duracao,
+            data_fim=inicio + duracao,
+            tipo=consulta.tipo,
+            motivo=consulta.motivo,
+            observacoes=consulta.observacoes,
+            serie=serie,
+            criado_por=usuario,
+        )
+        for inicio in inicios
+    ])
+    _historico(consultas, 'AGENDAMENTO', [
+        f'Consulta agendada para {inicio.strftime("%d/%m/%Y às %H:%M")} (série: {numero}/{ocorrencias})'
+        for numero, inicio in enumerate(inicios, start=1)
+    ], usuario)
+    _invalidar_caches(consulta.veterinario_id, [(c.data_hora, c.data_fim) for c in consultas])
+    return serie
+
+
+def ocorrencias_pendentes(serie, a_partir_de=None):
+    """Ocorrências futuras que ainda podem ser editadas ou canceladas"""
+    return serie.consultas.filter(
+        status__in=STATUS_PENDENTES,
+        data_hora__gte=a_partir_de or timezone.now(),
+    ).order_by('data_hora')
+
+
+@transaction.atomic
+def cancelar_serie(serie, usuario, a_partir_de=None):
+    """Cancela as ocorrências pendentes com um UPDATE; retorna quantas"""
+    pendentes = list(ocorrencias_pendentes(serie, a_partir_de).select_for_update())
+    if not pendentes:
+        return 0
+
+    Consulta.objects.filter(pk__in=[consulta.pk for consulta in pendentes]).update(
+        status='CANCELADA', atualizado_em=timezone.now()
+    )
+    _historico(pendentes, 'CANCELAMENTO', ['Consulta cancelada junto com a série'] * len(pendentes), usuario)
+    _invalidar_caches(serie.veterinario_id, [(c.data_hora, c.data_fim) for c in pendentes])
+    return len(pendentes)
+
+
+@transaction.atomic
+def editar_serie(serie, usuario, horario=None, duracao=None, a_partir_de=None, **campos):
+    """
+    Aplica as alterações às ocorrências pendentes com um bulk_update.
+    horario (time) move todas para o novo horário local no mesmo dia;
+    campos aceita tipo, motivo e observacoes. Retorna quantas mudaram.
+    """
+    pendentes = list(ocorrencias_pendentes(serie, a_partir_de).select_for_update())
+    if not pendentes:
+        return 0
+
+    anteriores = [(consulta.data_hora, consulta.data_fim) for consulta in pendentes]
+    alterados = ['atualizado_em', *campos]
+    agora = timezone.now()
+    for consulta in pendentes:
+        if horario is not None:
+            consulta.data_hora = timezone.localtime(consulta.data_hora).replace(
+                hour=horario.hour, minute=horario.minute, second=0, microsecond=0
+            )
+        if duracao is not None:
+            consulta.duracao = duracao
+        for campo, valor in campos.items():
+            setattr(consulta, campo, valor)
+        consulta.calcular_fim()
+        consulta.atualizado_em = agora
+
+    if horario is not None or duracao is not None:
+        alterados += ['data_hora', 'duracao', 'data_fim']
+        conflitos = _conflitos(
+            serie.veterinario_id,
+            [(consulta.data_hora, consulta.data_fim) for consulta in pendentes],
+            ignorar_ids=[consulta.pk for consulta in pendentes],
+        )
+        if conflitos:
+            raise ConflitoNaSerie(conflitos)
+
+    Consulta.objects.bulk_update(pendentes, alterados)
+    _historico(pendentes, 'OBSERVACAO', ['Consulta alterada junto com a série'] * len(pendentes), usuario)
+    _invalidar_caches(
+        serie.veterinario_id,
+        anteriores + [(consulta.data_hora, consulta.data_fim) for consulta in pendentes],
+    )
+    return len(pendentes)
@@ -0,0 +1,31 @@
+"""
+Sinais do app consultas
+Mantêm os contadores do dashboard do veterinário (consultas.estatisticas) em dia
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .estatisticas import invalidar_estatisticas
+from .models import Consulta, Prontuario
+
+
+def _invalidar_depois_do_commit(*veterinario_ids):
+    # só depois do commit: antes disso outro request poderia recalcular
+    # os contadores com os dados antigos
+    for veterinario_id in set(veterinario_ids):
+        transaction.on_commit(lambda veterinario_id=veterinario_id: invalidar_estatisticas(veterinario_id))
+
+
+@receiver(post_save, sender=Consulta)
+@receiver(post_delete, sender=Consulta)
+def invalidar_estatisticas_consulta(sender, instance, **kwargs):
+    # consulta transferida para outro veterinário muda os dois painéis
+    anterior = getattr(instance, '_agenda_carregada', (None,))[0]
+    _invalidar_depois_do_commit(instance.veterinario_id, anterior)
+
+
+@receiver(post_save, sender=Prontuario)
+@receiver(post_delete, sender=Prontuario)
+def invalidar_estatisticas_prontuario(sender, instance, **kwargs):
+    _invalidar_depois_do_commit(instance.consulta.veterinario_id)
@@ -1,3 +1,657 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from consultas import agendador, particoes
+from consultas.auditoria import historico_em_lote, registrar_historico
+from consultas.disponibilidade import horarios_livres
+from consultas.models import (
+    Consulta, HistoricoConsulta, HorarioAtendimento, MensagemSaida, Prontuario, SerieConsulta,
+    TokenAgenda, conflito_de_horario,
+)
+from consultas.periodos import periodo_dia, periodo_semana
+from consultas.series import criar_serie
+from consultas.transicoes import transicionar
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+
+
+def criar_cenario():
+    """Veterinário, tutor e um animal para os testes de agenda"""
+    veterinario = User.objects.create(username='vet', email='vet@teste.com', user_type=User.VETERINARIO)
+    tutor = User.objects.create(username='tutor', email='tutor@teste.com')
+    tipo = TipoAnimal.objects.create(nome='Cão')
+    raca = Raca.objects.create(nome='SRD', tipo_animal=tipo)
+    animal = Animal.objects.create(proprietario=tutor, nome='Rex', tipo_animal=tipo, raca=raca)
+    return veterinario, animal
+
+
+def amanha_as(hora, minuto=0):
+    return (timezone.localtime() + timedelta(days=1)).replace(hour=hora, minute=minuto, second=0, microsecond=0)
+
+
+class ConflitoDeHorarioTest(TestCase):
+    """Constraint de exclusão: o banco recusa consultas sobrepostas do mesmo veterinário"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        self.client.force_login(self.veterinario)
+
+    def _consulta(self, inicio, duracao=30, **extra):
+        return Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=inicio, duracao=duracao, motivo='Rotina', **extra
+        )
+
+    def test_formulario_mostra_conflito(self):
+        self._consulta(amanha_as(10), duracao=60)
+        resposta = self.client.post(reverse('consultas:consulta_create'), {
+            'animal': self.animal.pk,
+            'data_hora': amanha_as(10, 30).strftime('%Y-%m-%dT%H:%M'),
+            'duracao': 30,
+            'tipo': 'CONSULTA',
+            'motivo': 'Retorno',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.context['form'].has_error('data_hora'))
+        self.assertEqual(Consulta.objects.count(), 1)
+
+    @override_settings(CONSULTA_DURACAO_POR_TIPO={'CIRURGIA': 90, 'VACINACAO': 15})
+    def test_duracao_em_branco_usa_padrao_do_tipo(self):
+        dados = {'animal': self.animal.pk, 'motivo': 'Castração'}
+        for hora, tipo, duracao in [(8, 'CIRURGIA', ''), (11, 'VACINACAO', None), (12, 'VACINACAO', 45)]:
+            dados.update(tipo=tipo, data_hora=amanha_as(hora).strftime('%Y-%m-%dT%H:%M'))
+            # None: campo fora do POST
+            dados.pop('duracao', None)
+            if duracao is not None:
+                dados['duracao'] = duracao
+            resposta = self.client.post(reverse('consultas:consulta_create'), dados)
+            self.assertEqual(resposta.status_code, 302)
+
+        self.assertEqual(
+            list(Consulta.objects.order_by('data_hora').values_list('tipo', 'duracao')),
+            [('CIRURGIA', 90), ('VACINACAO', 15), ('VACINACAO', 45)],
+        )
+        self.assertEqual(Consulta.objects.get(tipo='CIRURGIA').data_fim, amanha_as(9, 30))
+
+    def test_horarios_encostados_e_canceladas_nao_conflitam(self):
+        self._consulta(amanha_as(10))
+        self._consulta(amanha_as(10, 30))
+        self._consulta(amanha_as(11), status='CANCELADA')
+        self._consulta(amanha_as(11))
+
+        with self.assertRaises(IntegrityError) as contexto:
+            self._consulta(amanha_as(10, 15))
+        self.assertTrue(conflito_de_horario(contexto.exception))
+
+    def test_edicao_recalcula_termino(self):
+        consulta = self._consulta(amanha_as(10))
+        consulta.duracao = 90
+        consulta.save(update_fields=['duracao'])
+        consulta.refresh_from_db()
+        self.assertEqual(consulta.data_fim, amanha_as(11, 30))
+
+
+class AgendamentoConcorrenteTest(TransactionTestCase):
+    """Vários agendamentos simultâneos para o mesmo horário: só um entra"""
+
+    def test_apenas_um_agendamento_no_horario(self):
+        veterinario, animal = criar_cenario()
+        inicio = amanha_as(15)
+        resultados = []
+
+        def agendar(indice):
+            try:
+                Consulta.objects.create(
+                    animal=animal, veterinario=veterinario, criado_por=veterinario,
+                    data_hora=inicio + timedelta(minutes=indice), motivo='Rotina'
+                )
+                resultados.append('ok')
+            except IntegrityError as erro:
+                resultados.append('conflito' if conflito_de_horario(erro) else erro)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=agendar, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(resultados), ['conflito'] * 7 + ['ok'])
+        self.assertEqual(Consulta.objects.count(), 1)
+
+
+class DisponibilidadeTest(TestCase):
+    """Horários livres = janelas de atendimento menos consultas, em cache por dia"""
+
+    def setUp(self):
+        cache.clear()
+        self.veterinario, self.animal = criar_cenario()
+        self.dia = amanha_as(0).date()
+        HorarioAtendimento.objects.create(
+            veterinario=self.veterinario, dia_semana=self.dia.weekday(), inicio=time(9), fim=time(11)
+        )
+        self.agora = amanha_as(0) - timedelta(hours=1)
+
+    def _horarios(self, tipo='CONSULTA'):
+        resultado = horarios_livres([self.veterinario], self.dia, self.dia, tipo, agora=self.agora)
+        dias = resultado[0]['dias']
+        return [timezone.localtime(h).strftime('%H:%M') for h in dias[0]['horarios']] if dias else []
+
+    def _consulta(self, inicio, duracao=30, **extra):
+        return Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=inicio, duracao=duracao, motivo='Rotina', **extra
+        )
+
+    def test_subtrai_consultas_da_janela(self):
+        self._consulta(amanha_as(9, 30), duracao=45)
+        self.assertEqual(self._horarios(), ['09:00', '10:15', '10:30'])
+        # o tipo define a duração necessária: cirurgia (120 min) não cabe
+        self.assertEqual(self._horarios('CIRURGIA'), [])
+
+    def test_segunda_leitura_vem_do_cache(self):
+        self._horarios()
+        with self.assertNumQueries(0):
+            self._horarios()
+
+    def test_cancelar_e_remarcar_invalidam_o_dia(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            consulta = self._consulta(amanha_as(9), duracao=120)
+        self.assertEqual(self._horarios(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            consulta.status = 'CANCELADA'
+            consulta.save()
+        self.assertEqual(len(self._horarios()), 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            consulta.status = 'AGENDADA'
+            consulta.data_hora = amanha_as(10)
+            consulta.duracao = 60
+            consulta.save()
+        self.assertEqual(self._horarios(), ['09:00', '09:15', '09:30'])
+
+    def test_endpoint_json(self):
+        self._consulta(amanha_as(9), duracao=60)
+        self.client.force_login(self.veterinario)
+        resposta = self.client.get(reverse('consultas:disponibilidade'), {
+            'inicio': self.dia.isoformat(), 'fim': self.dia.isoformat(), 'tipo': 'VACINACAO',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        veterinario = resposta.json()['veterinarios'][0]
+        self.assertEqual(veterinario['duracao'], 15)
+        self.assertEqual(veterinario['dias'][0]['horarios'][0], '10:00')
+
+        resposta = self.client.get(reverse('consultas:disponibilidade'), {'tipo': 'BANHO'})
+        self.assertEqual(resposta.status_code, 400)
+
+
+class DashboardVetTest(TestCase):
+    """Contadores do dashboard em um único aggregate(), em cache por veterinário"""
+
+    def setUp(self):
+        cache.clear()
+        self.veterinario, self.animal = criar_cenario()
+        self.client.force_login(self.veterinario)
+        for hora, status in [(9, 'AGENDADA'), (10, 'CONFIRMADA'), (11, 'REALIZADA')]:
+            Consulta.objects.create(
+                animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+                data_hora=amanha_as(hora), motivo='Rotina', status=status
+            )
+
+    def test_numero_de_consultas(self):
+        # sessão + usuário + contadores + 3 listas + link do calendário + gravação
+        # da sessão (SESSION_SAVE_EVERY_REQUEST: savepoint, UPDATE e release)
+        with self.assertNumQueries(10):
+            resposta = self.client.get(reverse('consultas:dashboard'))
+        self.assertEqual(resposta.context['total_consultas'], 3)
+        self.assertEqual(resposta.context['consultas_agendadas'], 1)
+        self.assertEqual(resposta.context['consultas_realizadas'], 1)
+
+        # com os contadores em cache, só as listas
+        with self.assertNumQueries(9):
+            self.client.get(reverse('consultas:dashboard'))
+
+    def test_prontuario_invalida_contadores(self):
+        self.client.get(reverse('consultas:dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Prontuario.objects.create(
+                consulta=Consulta.objects.get(status='CONFIRMADA'),
+                anamnese='-', exame_fisico='-', diagnostico='-', tratamento='-'
+            )
+        resposta = self.client.get(reverse('consultas:dashboard'))
+        self.assertEqual(resposta.context['total_prontuarios'], 1)
+        self.assertEqual(resposta.context['consultas_realizadas'], 2)
+
+
+class PeriodosTest(TestCase):
+    """Dias locais viram intervalos UTC comparados direto com data_hora (usam o índice)"""
+
+    def test_dia_e_semana_locais_em_utc(self):
+        # America/Sao_Paulo: UTC-3
+        self.assertEqual(periodo_dia(date(2026, 3, 10)), (
+            datetime(2026, 3, 10, 3, tzinfo=dt_timezone.utc), datetime(2026, 3, 11, 3, tzinfo=dt_timezone.utc),
+        ))
+        semana = periodo_semana(date(2026, 3, 12))
+        self.assertEqual(semana.inicio, datetime(2026, 3, 9, 3, tzinfo=dt_timezone.utc))
+        self.assertEqual(semana.fim - semana.inicio, timedelta(days=7))
+        self.assertIn(datetime(2026, 3, 16, 2, 59, tzinfo=dt_timezone.utc), semana)
+
+    def test_filtro_por_dia_usa_indice(self):
+        veterinario, animal = criar_cenario()
+        inicio = amanha_as(10)
+        Consulta.objects.bulk_create([
+            Consulta(
+                animal=animal, veterinario=veterinario, criado_por=veterinario, motivo='Rotina',
+                data_hora=inicio + timedelta(days=n), data_fim=inicio + timedelta(days=n, minutes=30),
+            )
+            for n in range(500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE consultas_consulta')
+
+        indice = Consulta._meta.indexes[0].name
+        hoje = inicio.date()
+        plano = Consulta.objects.filter(periodo_dia(hoje).q(), veterinario=veterinario).explain()
+        self.assertIn(indice, plano)
+        self.assertIn('Index Cond: ((data_hora >=', plano)
+        # com __date a coluna fica dentro da conversão de fuso: o índice não serve
+        plano = Consulta.objects.filter(data_hora__date=hoje, veterinario=veterinario).explain()
+        self.assertNotIn(indice, plano)
+
+
+class SerieConsultaTest(TestCase):
+    """Séries: materializadas em lote, com conflito verificado para todas as ocorrências"""
+
+    def setUp(self):
+        cache.clear()
+        self.veterinario, self.animal = criar_cenario()
+        self.client.force_login(self.veterinario)
+
+    def _agendar(self, inicio, **extra):
+        return self.client.post(reverse('consultas:consulta_create'), {
+            'animal': self.animal.pk,
+            'data_hora': inicio.strftime('%Y-%m-%dT%H:%M'),
+            'duracao': 30,
+            'tipo': 'VACINACAO',
+            'motivo': 'Vacina V10',
+            **extra,
+        })
+
+    def test_cria_serie_com_poucas_consultas(self):
+        # savepoint + conflitos + série + bulk_create das consultas + release;
+        # o histórico vai para consultas.auditoria e é gravado após o commit, em um bulk_create
+        with self.captureOnCommitCallbacks(execute=True), historico_em_lote():
+            with self.assertNumQueries(5):
+                serie = criar_serie(
+                    Consulta(animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+                             data_hora=amanha_as(10), duracao=30, tipo='VACINACAO', motivo='V10'),
+                    intervalo_semanas=3, ocorrencias=4, usuario=self.veterinario,
+                )
+            self.assertFalse(HistoricoConsulta.objects.exists())
+        datas = list(serie.consultas.order_by('data_hora').values_list('data_hora', flat=True))
+        self.assertEqual(datas, [amanha_as(10) + timedelta(weeks=3 * n) for n in range(4)])
+        self.assertEqual(HistoricoConsulta.objects.filter(consulta__serie=serie, acao='AGENDAMENTO').count(), 4)
+
+    def test_conflito_em_qualquer_ocorrencia_barra_a_serie(self):
+        Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(10, 15) + timedelta(weeks=4), motivo='Rotina'
+        )
+        resposta = self._agendar(amanha_as(10), repetir_semanas=2, ocorrencias=3)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.context['form'].has_error('data_hora'))
+        self.assertFalse(SerieConsulta.objects.exists())
+        self.assertEqual(Consulta.objects.count(), 1)
+
+    def test_editar_e_cancelar_serie(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self._agendar(amanha_as(10), repetir_semanas=1, ocorrencias=3)
+        self.assertRedirects(resposta, reverse('consultas:consulta_list'))
+        serie = SerieConsulta.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('consultas:serie_update', args=[serie.pk]), {'horario': '14:30', 'motivo': 'Reforço'})
+        consultas = list(serie.consultas.order_by('data_hora'))
+        self.assertEqual([timezone.localtime(c.data_hora).strftime('%H:%M') for c in consultas], ['14:30'] * 3)
+        self.assertEqual(consultas[0].data_fim, consultas[0].data_hora + timedelta(minutes=30))
+        self.assertEqual({c.motivo for c in consultas}, {'Reforço'})
+
+        consultas[0].status = 'REALIZADA'
+        consultas[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('consultas:serie_cancelar', args=[serie.pk]))
+        self.assertEqual(
+            list(serie.consultas.order_by('data_hora').values_list('status', flat=True)),
+            ['REALIZADA', 'CANCELADA', 'CANCELADA'],
+        )
+        self.assertEqual(HistoricoConsulta.objects.filter(acao='CANCELAMENTO').count(), 2)
+        self.assertEqual(HistoricoConsulta.objects.filter(acao='OBSERVACAO').count(), 3)
+        self.assertEqual(HistoricoConsulta.objects.filter(acao='AGENDAMENTO').count(), 3)
+
+
+class HistoricoEmLoteTest(TestCase):
+    """Histórico registrado após o commit e gravado com um bulk_create por lote"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        self.consulta = Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(10), motivo='Rotina'
+        )
+
+    def test_lote_grava_em_um_insert_na_ordem_registrada(self):
+        acoes = ['AGENDAMENTO', 'CONFIRMACAO', 'INICIO_ATENDIMENTO']
+        # nada é gravado durante o lote; no fim, um único INSERT
+        with self.assertNumQueries(1), historico_em_lote():
+            with self.captureOnCommitCallbacks(execute=True):
+                for acao in acoes:
+                    registrar_historico(self.consulta, acao, acao.lower(), self.veterinario)
+        self.assertEqual(list(self.consulta.historico.values_list('acao', flat=True)), acoes[::-1])
+
+    def test_transacao_desfeita_descarta_evento(self):
+        with historico_em_lote():
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        registrar_historico(self.consulta, 'CANCELAMENTO', 'Cancelada', self.veterinario)
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(HistoricoConsulta.objects.exists())
+
+    def test_view_registra_cancelamento(self):
+        self.client.force_login(self.veterinario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('consultas:consulta_cancelar', args=[self.consulta.pk]))
+        historico = self.consulta.historico.get()
+        self.assertEqual((historico.acao, historico.descricao), ('CANCELAMENTO', 'Consulta cancelada pelo veterinário'))
+
+
+class HistoricoParticionadoTest(TestCase):
+    """Histórico particionado por mês, com arquivamento das partições antigas"""
+
+    def setUp(self):
+        self.veterinario, animal = criar_cenario()
+        self.consulta = Consulta.objects.create(
+            animal=animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(10), motivo='Rotina'
+        )
+
+    def _particao_de(self, historico):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM {particoes.TABELA} WHERE id = %s', [historico.pk])
+            return cursor.fetchone()[0]
+
+    def _historico(self, criado_em):
+        return HistoricoConsulta.objects.create(
+            consulta=self.consulta, acao='OBSERVACAO', descricao='Observação', usuario=self.veterinario, criado_em=criado_em
+        )
+
+    def test_linhas_vao_para_a_particao_do_mes(self):
+        historico = self._historico(timezone.now())
+        self.assertEqual(self._particao_de(historico), particoes.nome_particao(timezone.now().date().replace(day=1)))
+
+        # mês sem partição cai na padrão; ao criar a partição a linha é movida
+        antigo = self._historico(datetime(2020, 5, 10, 12, tzinfo=dt_timezone.utc))
+        self.assertEqual(self._particao_de(antigo), particoes.PADRAO)
+        call_command('manter_particoes_historico', stdout=StringIO())
+        self.assertEqual(self._particao_de(antigo), particoes.nome_particao(date(2020, 5, 1)))
+
+    def test_arquivar_particoes_antigas(self):
+        self._historico(datetime(2020, 5, 10, 12, tzinfo=dt_timezone.utc))
+        self._historico(datetime(2020, 5, 20, 12, tzinfo=dt_timezone.utc))
+        recente = self._historico(timezone.now())
+        particoes.criar_particao(date(2020, 5, 1))
+
+        with tempfile.TemporaryDirectory() as destino:
+            call_command('arquivar_historico', meses=24, destino=destino, stdout=StringIO())
+            with gzip.open(os.path.join(destino, f'{particoes.TABELA}_p202005.jsonl.gz'), 'rt') as arquivo:
+                linhas = [json.loads(linha) for linha in arquivo]
+
+        self.assertEqual([linha['criado_em'][:10] for linha in linhas], ['2020-05-10', '2020-05-20'])
+        self.assertEqual(list(HistoricoConsulta.objects.values_list('pk', flat=True)), [recente.pk])
+        self.assertNotIn(date(2020, 5, 1), particoes.particoes_mensais())
+
+
+class TransicaoEmLoteTest(TransactionTestCase):
+    """Um UPDATE só nas consultas que permitem a transição e um INSERT para o histórico"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        agora = timezone.now()
+        self.passadas = Consulta.objects.bulk_create([
+            Consulta(
+                animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario, motivo='Rotina',
+                data_hora=agora - timedelta(hours=horas), data_fim=agora - timedelta(hours=horas, minutes=-30),
+                status=status,
+            )
+            for horas, status in [(5, 'AGENDADA'), (4, 'CONFIRMADA'), (3, 'REALIZADA')]
+        ])
+        self.futura = Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(10), motivo='Rotina'
+        )
+
+    def test_marcar_falta_em_lote(self):
+        ids = [consulta.pk for consulta in self.passadas] + [self.futura.pk]
+        # BEGIN/UPDATE/COMMIT e, depois do commit, BEGIN/INSERT do histórico/COMMIT
+        with self.assertNumQueries(6):
+            alteradas = transicionar(ids, 'FALTOU', self.veterinario)
+
+        # realizada e futura não podem virar falta
+        self.assertEqual(alteradas, [self.passadas[0].pk, self.passadas[1].pk])
+        self.assertEqual(
+            dict(Consulta.objects.values_list('pk', 'status')),
+            {self.passadas[0].pk: 'FALTOU', self.passadas[1].pk: 'FALTOU',
+             self.passadas[2].pk: 'REALIZADA', self.futura.pk: 'AGENDADA'},
+        )
+        self.assertEqual(HistoricoConsulta.objects.filter(consulta_id__in=alteradas).count(), 2)
+        self.assertFalse(self.futura.pode_marcar_falta())
+
+    def test_view_so_altera_consultas_do_veterinario(self):
+        outro = User.objects.create(username='vet2', email='vet2@teste.com', user_type=User.VETERINARIO)
+        self.client.force_login(outro)
+        self.client.post(reverse('consultas:consulta_transicao_lote'), {'status': 'CONFIRMADA', 'consultas': [self.futura.pk]})
+        self.futura.refresh_from_db()
+        self.assertEqual(self.futura.status, 'AGENDADA')
+
+        self.client.force_login(self.veterinario)
+        self.client.post(reverse('consultas:consulta_transicao_lote'), {'status': 'CONFIRMADA', 'consultas': [self.futura.pk]})
+        self.futura.refresh_from_db()
+        self.assertEqual(self.futura.status, 'CONFIRMADA')
+        self.assertEqual(self.futura.historico.get().acao, 'CONFIRMACAO')
+
+
+class AgendadorTest(TransactionTestCase):
+    """Faltas automáticas, lembretes na caixa de saída e workers concorrentes"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        agora = timezone.now()
+        self.vencidas = Consulta.objects.bulk_create([
+            Consulta(
+                animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario, motivo='Rotina',
+                data_hora=agora - timedelta(hours=horas), data_fim=agora - timedelta(hours=horas, minutes=-30),
+                status=status,
+            )
+            for horas, status in [(5, 'AGENDADA'), (3, 'CONFIRMADA')]
+        ])
+        # ainda dentro da tolerância de CONSULTA_FALTA_APOS_MINUTOS
+        self.recente = Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=agora - timedelta(minutes=50), motivo='Rotina'
+        )
+        self.proxima = Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=agora + timedelta(hours=2), motivo='Rotina'
+        )
+
+    def test_comando_marca_faltas_e_envia_lembretes(self):
+        with self.assertLogs('consultas.agendador', 'INFO') as logs:
+            call_command('agendador_consultas', stdout=StringIO())
+
+        self.assertEqual(
+            set(Consulta.objects.filter(status='FALTOU').values_list('pk', flat=True)),
+            {consulta.pk for consulta in self.vencidas},
+        )
+        historico = HistoricoConsulta.objects.filter(consulta_id=self.vencidas[0].pk).get()
+        self.assertEqual(historico.usuario, self.veterinario)
+
+        mensagem = MensagemSaida.objects.get()
+        self.assertEqual((mensagem.consulta_id, mensagem.destinatario), (self.proxima.pk, 'tutor@teste.com'))
+        self.assertIsNotNone(mensagem.enviado_em)
+        self.assertEqual(len(logs.output), 1)
+
+        # segunda execução: nada a fazer
+        call_command('agendador_consultas', stdout=StringIO())
+        self.assertEqual(MensagemSaida.objects.count(), 1)
+        self.assertEqual(HistoricoConsulta.objects.count(), 2)
+
+    def test_falha_no_envio_fica_na_fila(self):
+        class EnviadorQuebrado:
+            def enviar(self, mensagem):
+                raise ConnectionError('servidor fora do ar')
+
+        agendador.gerar_lembretes()
+        with self.assertLogs('consultas.agendador', 'WARNING'):
+            self.assertEqual(agendador.drenar_saida(enviador=EnviadorQuebrado()), (0, 1))
+        mensagem = MensagemSaida.objects.get()
+        self.assertEqual((mensagem.tentativas, mensagem.erro), (1, 'servidor fora do ar'))
+        self.assertEqual(agendador.drenar_saida(enviador=agendador.EnviadorLocal()), (1, 0))
+
+    def test_workers_pulam_consultas_travadas(self):
+        travada, liberar = threading.Event(), threading.Event()
+
+        def outro_worker():
+            try:
+                with transaction.atomic():
+                    Consulta.objects.select_for_update().get(pk=self.vencidas[0].pk)
+                    travada.set()
+                    liberar.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=outro_worker)
+        thread.start()
+        travada.wait(10)
+        try:
+            # não espera a trava: segue com as outras consultas vencidas
+            self.assertEqual(agendador.marcar_faltas(), [self.vencidas[1].pk])
+        finally:
+            liberar.set()
+            thread.join()
+        self.assertEqual(agendador.marcar_faltas(), [self.vencidas[0].pk])
+
+
+class AgendaFeedTest(TestCase):
+    """Feed .ics por token, com ETag e 304"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        self.consulta = Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(10), motivo='Vacina; reforço, anual'
+        )
+        self.url = reverse('consultas:agenda_ics', args=[TokenAgenda.gerar(self.veterinario).token])
+
+    def test_feed_e_get_condicional(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta['Content-Type'], 'text/calendar; charset=utf-8')
+        corpo = b''.join(resposta.streaming_content).decode()
+        self.assertTrue(corpo.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn(f'UID:consulta-{self.consulta.pk}@testserver\r\n', corpo)
+        self.assertIn('DESCRIPTION:Vacina\\; reforço\\, anual\r\n', corpo)
+        self.assertTrue(all(len(linha.encode()) <= 75 for linha in corpo.split('\r\n')))
+
+        # token + aggregate, sem gerar o arquivo
+        with self.assertNumQueries(2):
+            resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(resposta.status_code, 304)
+        self.assertNotIn('Last-Modified', resposta)
+
+        etag = resposta['ETag']
+        self.consulta.status = 'CANCELADA'
+        self.consulta.save()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('STATUS:CANCELLED', b''.join(resposta.streaming_content).decode())
+
+    def test_exclusao_e_animal_mudam_a_etag(self):
+        Consulta.objects.create(
+            animal=self.animal, veterinario=self.veterinario, criado_por=self.veterinario,
+            data_hora=amanha_as(11), motivo='Retorno'
+        )
+        etag = self.client.get(self.url)['ETag']
+
+        # a exclusão não muda nenhum atualizado_em, só a contagem
+        self.consulta.delete()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn(f'UID:consulta-{self.consulta.pk}@', b''.join(resposta.streaming_content).decode())
+
+        # o nome do animal aparece no evento
+        etag = resposta['ETag']
+        self.animal.nome = 'Thor'
+        self.animal.save()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('SUMMARY:Thor - ', b''.join(resposta.streaming_content).decode())
+
+    def test_nome_do_veterinario_e_edicao_sem_data_mudam_a_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        # o nome do veterinário vai no título do calendário e User não tem atualizado_em
+        self.veterinario.first_name = 'Marta'
+        self.veterinario.save()
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('X-WR-CALNAME:Agenda - Marta', b''.join(resposta.streaming_content).decode())
+
+        # mesma contagem e mesmo atualizado_em, conteúdo diferente
+        etag = resposta['ETag']
+        Consulta.objects.filter(pk=self.consulta.pk).update(motivo='Retorno')
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('DESCRIPTION:Retorno\r\n', b''.join(resposta.streaming_content).decode())
+
+    def test_novo_token_invalida_o_link(self):
+        self.client.force_login(self.veterinario)
+        self.client.post(reverse('consultas:agenda_token'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        resposta = self.client.get(reverse('consultas:dashboard'))
+        self.assertContains(resposta, TokenAgenda.objects.get().token)
+
+
+class ExportacaoConsultasTest(TestCase):
+    """CSV das consultas: só as do veterinário logado, com os filtros da lista"""
+
+    def setUp(self):
+        self.veterinario, self.animal = criar_cenario()
+        outro = User.objects.create(username='vet2', email='vet2@teste.com', user_type=User.VETERINARIO)
+        for veterinario, hora, status in [(self.veterinario, 10, 'AGENDADA'), (self.veterinario, 11, 'CANCELADA'), (outro, 10, 'AGENDADA')]:
+            Consulta.objects.create(
+                animal=self.animal, veterinario=veterinario, criado_por=veterinario,
+                data_hora=amanha_as(hora), motivo='Rotina', status=status,
+            )
+        self.client.force_login(self.veterinario)
+
+    def test_exporta_com_filtros(self):
+        resposta = self.client.get(reverse('consultas:consulta_exportar', args=['csv']), {'status': 'AGENDADA'})
+        linhas = b''.join(resposta.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(linhas), 2)
+        self.assertIn(amanha_as(10).strftime('%d/%m/%Y %H:%M'), linhas[1])
+        self.assertIn('Agendada', linhas[1])
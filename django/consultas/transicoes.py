@@ -0,0 +1,77 @@
+"""
+Mudanças de status em lote
+
+A recepção confirma ou marca faltas de dezenas de consultas de uma vez:
+um único UPDATE ... WHERE id = ANY(...) AND status = ANY(...) aplica a
+transição só às consultas que a permitem (mesmas regras de
+Consulta.pode_transicionar) e devolve as alteradas, cujo histórico é gravado
+com um bulk_create (consultas.auditoria).
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from .auditoria import historico_em_lote, registrar_historico
+from .disponibilidade import invalidar_periodo
+from .estatisticas import invalidar_estatisticas
+from .models import Consulta
+
+# novo status -> (ação do histórico, descrição)
+HISTORICO = {
+    'CONFIRMADA': ('CONFIRMACAO', 'Consulta confirmada'),
+    'EM_ATENDIMENTO': ('INICIO_ATENDIMENTO', 'Atendimento iniciado'),
+    'CANCELADA': ('CANCELAMENTO', 'Consulta cancelada'),
+    'FALTOU': ('OBSERVACAO', 'Status alterado para: Paciente Faltou'),
+}
+
+_SQL_TRANSICAO = """
+UPDATE consultas_consulta
+   SET status = %(status)s, atualizado_em = %(agora)s
+ WHERE id = ANY(%(ids)s)
+   AND status = ANY(%(origens)s)
+   {condicoes}
+RETURNING id, veterinario_id, data_hora, data_fim
+"""
+
+
+def transicionar(ids, status, usuario, veterinario=None, agora=None, descricao=None):
+    """
+    Move para `status` as consultas de `ids` que permitem a transição
+    (opcionalmente só as do veterinário). Retorna os ids alterados; os
+    demais ficam como estão. Sem `usuario` (transições automáticas, ver
+    consultas.agendador) o histórico fica em nome do veterinário de cada
+    consulta.
+    """
+    if status not in Consulta.TRANSICOES:
+        raise ValueError(f'Transição para {status} não permitida.')
+    agora = agora or timezone.now()
+    parametros = {
+        'status': status,
+        'agora': agora,
+        'ids': sorted({int(id_consulta) for id_consulta in ids}),
+        'origens': Consulta.TRANSICOES[status],
+    }
+    condicoes = []
+    if status == 'FALTOU':
+        condicoes.append('AND data_hora <= %(agora)s')
+    if veterinario is not None:
+        condicoes.append('AND veterinario_id = %(veterinario_id)s')
+        parametros['veterinario_id'] = veterinario.pk
+
+    acao, descricao_padrao = HISTORICO[status]
+    descricao = descricao or descricao_padrao
+    with historico_em_lote(), transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(_SQL_TRANSICAO.format(condicoes='\n   '.join(condicoes)), parametros)
+            alteradas = sorted(cursor.fetchall(), key=lambda linha: linha[2])
+
+        for id_consulta, veterinario_id, data_hora, data_fim in alteradas:
+            responsavel = usuario or get_user_model()(pk=veterinario_id)
+            registrar_historico(Consulta(pk=id_consulta), acao, descricao, responsavel)
+            if status == 'CANCELADA':
+                # o horário volta a ficar livre na agenda
+                invalidar_periodo(veterinario_id, data_hora, data_fim)
+        for veterinario_id in {linha[1] for linha in alteradas}:
+            transaction.on_commit(lambda veterinario_id=veterinario_id: invalidar_estatisticas(veterinario_id))
+
+    return [linha[0] for linha in alteradas]
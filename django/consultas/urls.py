@@ -6,17 +6,24 @@ from django.urls import path
 from .views import (
     DashboardVetView,
     ConsultaListView,
+    ConsultaExportView,
     ConsultaCreateView,
     ConsultaUpdateView,
     ConsultaDetailView,
     ConsultaCancelarView,
     ConsultaIniciarAtendimentoView,
+    ConsultaTransicaoLoteView,
     ProntuarioCreateView,
     ProntuarioUpdateView,
     ProntuarioDetailView,
     ReceitaCreateView,
     ReceitaUpdateView,
     ReceitaDeleteView,
+    DisponibilidadeView,
+    SerieUpdateView,
+    SerieCancelarView,
+    AgendaFeedView,
+    AgendaTokenView,
 )
 
 app_name = 'consultas'
@@ -27,11 +34,22 @@ urlpatterns = [
     
     # Consultas
     path('consultas/', ConsultaListView.as_view(), name='consulta_list'),
+    path('consultas/exportar.<str:formato>', ConsultaExportView.as_view(), name='consulta_exportar'),
     path('consultas/nova/', ConsultaCreateView.as_view(), name='consulta_create'),
     path('consultas/<int:pk>/', ConsultaDetailView.as_view(), name='consulta_detail'),
     path('consultas/<int:pk>/editar/', ConsultaUpdateView.as_view(), name='consulta_update'),
     path('consultas/<int:pk>/cancelar/', ConsultaCancelarView.as_view(), name='consulta_cancelar'),
     path('consultas/<int:pk>/iniciar/', ConsultaIniciarAtendimentoView.as_view(), name='consulta_iniciar'),
+    path('consultas/status-em-lote/', ConsultaTransicaoLoteView.as_view(), name='consulta_transicao_lote'),
+    
+    # Séries (agendamentos recorrentes)
+    path('series/<int:pk>/editar/', SerieUpdateView.as_view(), name='serie_update'),
+    path('series/<int:pk>/cancelar/', SerieCancelarView.as_view(), name='serie_cancelar'),
+    
+    # Agenda
+    path('disponibilidade/', DisponibilidadeView.as_view(), name='disponibilidade'),
+    path('agenda/link/', AgendaTokenView.as_view(), name='agenda_token'),
+    path('agenda/<str:token>.ics', AgendaFeedView.as_view(), name='agenda_ics'),
     
     # Prontuários
     path('consultas/<int:consulta_pk>/prontuario/criar/', ProntuarioCreateView.as_view(), name='prontuario_create'),
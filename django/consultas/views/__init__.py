@@ -5,17 +5,22 @@ Views do sistema de consultas veterinárias
 from .dashboard import DashboardVetView
 from .consultas import (
     ConsultaListView,
+    ConsultaExportView,
     ConsultaCreateView,
     ConsultaUpdateView,
     ConsultaDetailView,
     ConsultaCancelarView,
     ConsultaIniciarAtendimentoView,
+    ConsultaTransicaoLoteView,
 )
 from .prontuarios import (
     ProntuarioCreateView,
     ProntuarioUpdateView,
     ProntuarioDetailView,
 )
+from .disponibilidade import DisponibilidadeView
+from .series import SerieUpdateView, SerieCancelarView
+from .agenda import AgendaFeedView, AgendaTokenView
 from .receitas import (
     ReceitaCreateView,
     ReceitaUpdateView,
@@ -25,15 +30,22 @@ from .receitas import (
 __all__ = [
     'DashboardVetView',
     'ConsultaListView',
+    'ConsultaExportView',
     'ConsultaCreateView',
     'ConsultaUpdateView',
     'ConsultaDetailView',
     'ConsultaCancelarView',
     'ConsultaIniciarAtendimentoView',
+    'ConsultaTransicaoLoteView',
     'ProntuarioCreateView',
     'ProntuarioUpdateView',
     'ProntuarioDetailView',
     'ReceitaCreateView',
     'ReceitaUpdateView',
     'ReceitaDeleteView',
+    'DisponibilidadeView',
+    'SerieUpdateView',
+    'SerieCancelarView',
+    'AgendaFeedView',
+    'AgendaTokenView',
 ]
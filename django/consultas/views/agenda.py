@@ -0,0 +1,59 @@
+"""
+Feed iCalendar (.ics) da agenda do veterinário
+O acesso é pelo token no link (aplicativos de calendário não fazem login)
+"""
+
+from django.views.generic import View
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib import messages
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response
+from consultas.calendario import consultas_da_agenda, gerar_ics, versao_da_agenda
+from consultas.models import TokenAgenda
+from .consultas import VeterinarioRequiredMixin
+
+
+class AgendaFeedView(View):
+    """
+    GET /agenda/<token>.ics
+    Responde 304 (sem gerar o arquivo) quando o cliente já tem a versão atual
+    (If-None-Match). Sem Last-Modified: exclusões não mudam a data da última
+    alteração, e um If-Modified-Since responderia 304 com a agenda velha
+    """
+
+    def get(self, request, token):
+        token_agenda = (
+            TokenAgenda.objects.select_related('veterinario')
+            .filter(token=token, veterinario__is_active=True).first()
+        )
+        if token_agenda is None or not token_agenda.veterinario.is_veterinario():
+            raise Http404
+        veterinario = token_agenda.veterinario
+
+        consultas = consultas_da_agenda(veterinario)
+        etag = versao_da_agenda(veterinario, consultas)
+
+        # o gerador só roda (e consulta o banco) se a resposta for enviada
+        resposta = StreamingHttpResponse(
+            gerar_ics(veterinario, consultas, request.get_host().split(':')[0]),
+            content_type='text/calendar; charset=utf-8',
+        )
+        resposta['ETag'] = etag
+        # sempre revalida: a resposta 304 custa uma consulta
+        resposta['Cache-Control'] = 'private, no-cache'
+        resposta['Content-Disposition'] = 'inline; filename="agenda.ics"'
+        return get_conditional_response(request, etag=etag, response=resposta)
+
+
+class AgendaTokenView(LoginRequiredMixin, VeterinarioRequiredMixin, View):
+    """Gera (ou troca) o link do feed; o link anterior deixa de funcionar"""
+
+    def post(self, request):
+        trocado = TokenAgenda.objects.filter(veterinario=request.user).exists()
+        TokenAgenda.gerar(request.user)
+        if trocado:
+            messages.success(request, 'Novo link do calendário gerado. O link anterior não funciona mais.')
+        else:
+            messages.success(request, 'Link do calendário gerado! Assine-o no seu aplicativo de calendário.')
+        return redirect('consultas:dashboard')
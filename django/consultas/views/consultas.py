@@ -7,11 +7,17 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Q
+from django.db import IntegrityError, transaction
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
-from consultas.models import Consulta, HistoricoConsulta
+from app.busca import buscar
+from app.exportacao import ExportacaoMixin
+from app.paginacao import PaginacaoEstimadaMixin
+from consultas.auditoria import registrar_historico
+from consultas.models import Consulta, conflito_de_horario
 from consultas.forms import ConsultaForm, ConsultaUpdateForm
+from consultas.series import ConflitoNaSerie, criar_serie
+from consultas.transicoes import transicionar
 from pets.models import Animal
 from users.models import User
 
@@ -23,7 +29,13 @@ class VeterinarioRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_veterinario()
 
 
-class ConsultaListView(LoginRequiredMixin, VeterinarioRequiredMixin, ListView):
+# ações disponíveis na seleção múltipla da lista de consultas
+STATUS_EM_LOTE = ['CONFIRMADA', 'FALTOU', 'CANCELADA']
+
+MENSAGEM_CONFLITO = 'Já existe uma consulta sua neste horário. Escolha outro horário ou ajuste a duração.'
+
+
+class ConsultaListView(PaginacaoEstimadaMixin, LoginRequiredMixin, VeterinarioRequiredMixin, ListView):
     """Lista todas as consultas do veterinário"""
     model = Consulta
     template_name = 'consultas/consulta_list.html'
@@ -46,13 +58,10 @@ class ConsultaListView(LoginRequiredMixin, VeterinarioRequiredMixin, ListView):
         if tipo:
             queryset = queryset.filter(tipo=tipo)
         
-        busca = self.request.GET.get('busca')
-        if busca:
-            queryset = queryset.filter(
-                Q(animal__nome__icontains=busca) |
-                Q(animal__proprietario__username__icontains=busca) |
-                Q(motivo__icontains=busca)
-            )
+        queryset = buscar(
+            queryset, self.request.GET.get('busca'),
+            ['animal__nome', 'animal__proprietario__username', 'motivo'],
+        )
         
         return queryset
     
@@ -60,12 +69,27 @@ class ConsultaListView(LoginRequiredMixin, VeterinarioRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['status_choices'] = Consulta.STATUS_CHOICES
         context['tipo_choices'] = Consulta.TIPO_CHOICES
+        context['status_em_lote'] = [(status, dict(Consulta.STATUS_CHOICES)[status]) for status in STATUS_EM_LOTE]
         context['filtro_status'] = self.request.GET.get('status', '')
         context['filtro_tipo'] = self.request.GET.get('tipo', '')
         context['busca'] = self.request.GET.get('busca', '')
         return context
 
 
+class ConsultaExportView(ExportacaoMixin, ConsultaListView):
+    """Exporta as consultas do veterinário, com os filtros da tela, em CSV ou XLSX"""
+    nome_exportacao = 'consultas'
+    colunas_exportacao = [
+        ('data_hora', 'Data e hora'),
+        ('duracao', 'Duração (min)'),
+        ('animal__nome', 'Animal'),
+        ('animal__proprietario__username', 'Tutor'),
+        ('tipo', 'Tipo'),
+        ('status', 'Status'),
+        ('motivo', 'Motivo'),
+    ]
+
+
 class ConsultaCreateView(LoginRequiredMixin, VeterinarioRequiredMixin, CreateView):
     """Cria uma nova consulta"""
     model = Consulta
@@ -88,20 +112,48 @@ class ConsultaCreateView(LoginRequiredMixin, VeterinarioRequiredMixin, CreateVie
         form.instance.veterinario = self.request.user
         form.instance.criado_por = self.request.user
         
-        # Salva a instância
-        response = super().form_valid(form)
+        if form.cleaned_data.get('ocorrencias'):
+            return self.agendar_serie(form)
         
-        # Registra no histórico
-        HistoricoConsulta.objects.create(
-            consulta=self.object,
-            acao='AGENDAMENTO',
-            descricao=f'Consulta agendada para {self.object.data_hora.strftime("%d/%m/%Y às %H:%M")}',
-            usuario=self.request.user
-        )
+        # Salva a instância; o conflito de horário é verificado pelo banco
+        # (constraint consulta_sem_sobreposicao), sem corrida entre agendamentos
+        try:
+            with transaction.atomic():
+                response = super().form_valid(form)
+                
+                # Registra no histórico
+                registrar_historico(
+                    consulta=self.object,
+                    acao='AGENDAMENTO',
+                    descricao=f'Consulta agendada para {self.object.data_hora.strftime("%d/%m/%Y às %H:%M")}',
+                    usuario=self.request.user
+                )
+        except IntegrityError as erro:
+            if not conflito_de_horario(erro):
+                raise
+            form.add_error('data_hora', MENSAGEM_CONFLITO)
+            return self.form_invalid(form)
         
         messages.success(self.request, 'Consulta agendada com sucesso!')
         return response
     
+    def agendar_serie(self, form):
+        """Agenda todas as ocorrências da série de uma vez"""
+        ocorrencias = form.cleaned_data['ocorrencias']
+        try:
+            criar_serie(form.instance, form.cleaned_data['repetir_semanas'], ocorrencias, self.request.user)
+        except ConflitoNaSerie as erro:
+            form.add_error('data_hora', str(erro))
+            return self.form_invalid(form)
+        except IntegrityError as erro:
+            if not conflito_de_horario(erro):
+                raise
+            form.add_error('data_hora', MENSAGEM_CONFLITO)
+            return self.form_invalid(form)
+        
+        messages.success(self.request, f'{ocorrencias} consultas agendadas com sucesso!')
+        return redirect(self.success_url)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['titulo'] = 'Nova Consulta'
@@ -113,7 +165,7 @@ class ConsultaUpdateView(LoginRequiredMixin, VeterinarioRequiredMixin, UpdateVie
     """Atualiza uma consulta existente"""
     model = Consulta
     template_name = 'consultas/consulta_form.html'
-    fields = ['animal', 'data_hora', 'tipo', 'status', 'motivo', 'observacoes']
+    fields = ['animal', 'data_hora', 'duracao', 'tipo', 'status', 'motivo', 'observacoes']
     success_url = reverse_lazy('consultas:consulta_list')
     
     def get_queryset(self):
@@ -140,16 +192,23 @@ class ConsultaUpdateView(LoginRequiredMixin, VeterinarioRequiredMixin, UpdateVie
         return form
     
     def form_valid(self, form):
-        response = super().form_valid(form)
-        
-        # Registra no histórico se houve mudança de status
-        if 'status' in form.changed_data:
-            HistoricoConsulta.objects.create(
-                consulta=self.object,
-                acao='OBSERVACAO',
-                descricao=f'Status alterado para: {self.object.get_status_display()}',
-                usuario=self.request.user
-            )
+        try:
+            with transaction.atomic():
+                response = super().form_valid(form)
+                
+                # Registra no histórico se houve mudança de status
+                if 'status' in form.changed_data:
+                    registrar_historico(
+                        consulta=self.object,
+                        acao='OBSERVACAO',
+                        descricao=f'Status alterado para: {self.object.get_status_display()}',
+                        usuario=self.request.user
+                    )
+        except IntegrityError as erro:
+            if not conflito_de_horario(erro):
+                raise
+            form.add_error('data_hora', MENSAGEM_CONFLITO)
+            return self.form_invalid(form)
         
         messages.success(self.request, 'Consulta atualizada com sucesso!')
         return response
@@ -173,7 +232,7 @@ class ConsultaDetailView(LoginRequiredMixin, VeterinarioRequiredMixin, DetailVie
             veterinario=self.request.user
         ).select_related(
             'animal', 'animal__proprietario', 'animal__raca', 'animal__tipo_animal',
-            'veterinario', 'criado_por'
+            'veterinario', 'criado_por', 'serie'
         ).prefetch_related('historico')
     
     def get_context_data(self, **kwargs):
@@ -207,7 +266,7 @@ class ConsultaCancelarView(LoginRequiredMixin, VeterinarioRequiredMixin, View):
         consulta.save()
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=consulta,
             acao='CANCELAMENTO',
             descricao='Consulta cancelada pelo veterinário',
@@ -232,7 +291,7 @@ class ConsultaIniciarAtendimentoView(LoginRequiredMixin, VeterinarioRequiredMixi
         consulta.save()
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=consulta,
             acao='INICIO_ATENDIMENTO',
             descricao='Atendimento iniciado',
@@ -241,3 +300,23 @@ class ConsultaIniciarAtendimentoView(LoginRequiredMixin, VeterinarioRequiredMixi
         
         messages.success(request, 'Atendimento iniciado! Agora você pode criar o prontuário.')
         return redirect('consultas:prontuario_create', consulta_pk=pk)
+
+
+class ConsultaTransicaoLoteView(LoginRequiredMixin, VeterinarioRequiredMixin, View):
+    """Confirma, cancela ou marca falta em várias consultas de uma vez"""
+    
+    def post(self, request):
+        status = request.POST.get('status')
+        ids = [valor for valor in request.POST.getlist('consultas') if valor.isdigit()]
+        if status not in STATUS_EM_LOTE or not ids:
+            messages.error(request, 'Selecione as consultas e a ação a aplicar.')
+            return redirect('consultas:consulta_list')
+        
+        alteradas = transicionar(ids, status, request.user, veterinario=request.user)
+        rotulo = dict(Consulta.STATUS_CHOICES)[status]
+        if alteradas:
+            messages.success(request, f'{len(alteradas)} consulta(s) alterada(s) para "{rotulo}".')
+        ignoradas = len(set(ids)) - len(alteradas)
+        if ignoradas:
+            messages.warning(request, f'{ignoradas} consulta(s) não permitem a mudança para "{rotulo}" e ficaram como estavam.')
+        return redirect('consultas:consulta_list')
@@ -5,12 +5,13 @@ Exibe estatísticas e resumo das consultas
 
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q
 from django.utils import timezone
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from datetime import timedelta
-from consultas.models import Consulta, Prontuario
+from consultas.estatisticas import estatisticas_veterinario
+from consultas.models import Consulta, TokenAgenda
+from consultas.periodos import periodo_dia, periodo_dias
 
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
@@ -39,61 +40,37 @@ class DashboardVetView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         veterinario = self.request.user
-        hoje = timezone.now().date()
-        inicio_semana = hoje - timedelta(days=hoje.weekday())
-        fim_semana = inicio_semana + timedelta(days=6)
+        hoje = timezone.localdate()
         
         # Consultas do veterinário
         consultas_vet = Consulta.objects.filter(veterinario=veterinario)
         
-        # Estatísticas gerais
-        context['total_consultas'] = consultas_vet.count()
-        context['consultas_hoje'] = consultas_vet.filter(
-            data_hora__date=hoje
-        ).count()
-        context['consultas_semana'] = consultas_vet.filter(
-            data_hora__date__gte=inicio_semana,
-            data_hora__date__lte=fim_semana
-        ).count()
-        
-        # Consultas por status
-        context['consultas_agendadas'] = consultas_vet.filter(
-            status='AGENDADA'
-        ).count()
-        context['consultas_confirmadas'] = consultas_vet.filter(
-            status='CONFIRMADA'
-        ).count()
-        context['consultas_realizadas'] = consultas_vet.filter(
-            status='REALIZADA'
-        ).count()
+        # Estatísticas gerais, por status e de atendimento (uma consulta, em cache)
+        context.update(estatisticas_veterinario(veterinario.pk))
         
         # Próximas consultas (próximos 7 dias)
-        proximo_periodo = hoje + timedelta(days=7)
         context['proximas_consultas'] = consultas_vet.filter(
-            data_hora__date__gte=hoje,
-            data_hora__date__lte=proximo_periodo,
+            periodo_dias(hoje, hoje + timedelta(days=7)).q(),
             status__in=['AGENDADA', 'CONFIRMADA']
         ).select_related(
-            'animal', 'animal__proprietario', 'animal__raca', 'animal__tipo_animal'
+            'animal', 'animal__proprietario', 'animal__raca__tipo_animal', 'animal__tipo_animal'
         ).order_by('data_hora')[:10]
         
         # Consultas de hoje
         context['consultas_hoje_list'] = consultas_vet.filter(
-            data_hora__date=hoje
+            periodo_dia(hoje).q()
         ).select_related(
-            'animal', 'animal__proprietario', 'animal__raca', 'animal__tipo_animal'
+            'animal', 'animal__proprietario', 'animal__raca__tipo_animal', 'animal__tipo_animal'
         ).order_by('data_hora')
         
         # Últimas consultas realizadas
         context['ultimas_realizadas'] = consultas_vet.filter(
             status='REALIZADA'
         ).select_related(
-            'animal', 'animal__proprietario'
+            'animal', 'animal__proprietario', 'animal__raca__tipo_animal'
         ).order_by('-data_hora')[:5]
         
-        # Estatísticas de atendimento
-        context['total_prontuarios'] = Prontuario.objects.filter(
-            consulta__veterinario=veterinario
-        ).count()
+        # Link do feed .ics (agenda no aplicativo de calendário)
+        context['token_agenda'] = TokenAgenda.objects.filter(veterinario=veterinario).first()
         
         return context
@@ -0,0 +1,74 @@
+"""
+Endpoint JSON de horários livres dos veterinários
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from consultas.disponibilidade import horarios_livres
+from consultas.models import Consulta
+from users.models import User
+
+# maior intervalo aceito por requisição
+MAX_DIAS = 31
+
+
+class DisponibilidadeView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    GET ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD&tipo=CONSULTA&veterinario=<id>
+    Devolve os horários livres de cada veterinário (ou só do informado)
+    para o tipo de atendimento. Sem datas, considera os próximos 7 dias.
+    """
+    
+    def test_func(self):
+        """Disponível para a equipe (veterinários e funcionários), não para clientes"""
+        return not self.request.user.is_cliente()
+    
+    def get(self, request):
+        hoje = timezone.localdate()
+        try:
+            inicio = date.fromisoformat(request.GET['inicio']) if request.GET.get('inicio') else hoje
+            fim = date.fromisoformat(request.GET['fim']) if request.GET.get('fim') else inicio + timedelta(days=6)
+        except ValueError:
+            return JsonResponse({'error': 'Datas devem estar no formato AAAA-MM-DD.'}, status=400)
+        inicio = max(inicio, hoje)
+        if fim < inicio:
+            return JsonResponse({'error': 'A data final deve ser posterior à inicial.'}, status=400)
+        if (fim - inicio).days >= MAX_DIAS:
+            return JsonResponse({'error': f'Consulte no máximo {MAX_DIAS} dias por vez.'}, status=400)
+        
+        tipo = request.GET.get('tipo', 'CONSULTA')
+        if tipo not in dict(Consulta.TIPO_CHOICES):
+            return JsonResponse({'error': 'Tipo de atendimento inválido.'}, status=400)
+        
+        veterinarios = User.objects.filter(user_type=User.VETERINARIO, is_active=True).order_by('first_name', 'username')
+        veterinario = request.GET.get('veterinario', '')
+        if veterinario:
+            if not veterinario.isdigit():
+                return JsonResponse({'error': 'Veterinário inválido.'}, status=400)
+            veterinarios = veterinarios.filter(pk=int(veterinario))
+        
+        disponibilidade = horarios_livres(list(veterinarios), inicio, fim, tipo)
+        return JsonResponse({
+            'tipo': tipo,
+            'inicio': inicio.isoformat(),
+            'fim': fim.isoformat(),
+            'veterinarios': [
+                {
+                    'id': item['veterinario'].pk,
+                    'nome': item['veterinario'].get_full_name() or item['veterinario'].username,
+                    'duracao': item['duracao'],
+                    'dias': [
+                        {
+                            'data': dia['data'].isoformat(),
+                            'horarios': [timezone.localtime(horario).strftime('%H:%M') for horario in dia['horarios']],
+                        }
+                        for dia in item['dias']
+                    ],
+                }
+                for item in disponibilidade
+            ],
+        })
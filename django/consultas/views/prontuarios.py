@@ -7,7 +7,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
-from consultas.models import Consulta, Prontuario, HistoricoConsulta
+from consultas.auditoria import registrar_historico
+from consultas.models import Consulta, Prontuario
 from .consultas import VeterinarioRequiredMixin
 
 
@@ -53,7 +54,7 @@ class ProntuarioCreateView(LoginRequiredMixin, VeterinarioRequiredMixin, CreateV
         response = super().form_valid(form)
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=self.consulta,
             acao='PRONTUARIO_CRIADO',
             descricao='Prontuário criado',
@@ -105,7 +106,7 @@ class ProntuarioUpdateView(LoginRequiredMixin, VeterinarioRequiredMixin, UpdateV
         response = super().form_valid(form)
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=self.object.consulta,
             acao='PRONTUARIO_ATUALIZADO',
             descricao='Prontuário atualizado',
@@ -7,7 +7,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
-from consultas.models import Prontuario, Receita, HistoricoConsulta
+from consultas.auditoria import registrar_historico
+from consultas.models import Prontuario, Receita
 from .consultas import VeterinarioRequiredMixin
 
 
@@ -42,7 +43,7 @@ class ReceitaCreateView(LoginRequiredMixin, VeterinarioRequiredMixin, CreateView
         response = super().form_valid(form)
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=self.prontuario.consulta,
             acao='RECEITA_ADICIONADA',
             descricao=f'Receita adicionada: {self.object.medicamento}',
@@ -90,7 +91,7 @@ class ReceitaUpdateView(LoginRequiredMixin, VeterinarioRequiredMixin, UpdateView
         response = super().form_valid(form)
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=self.object.prontuario.consulta,
             acao='OBSERVACAO',
             descricao=f'Receita atualizada: {self.object.medicamento}',
@@ -132,7 +133,7 @@ class ReceitaDeleteView(LoginRequiredMixin, VeterinarioRequiredMixin, DeleteView
         response = super().delete(request, *args, **kwargs)
         
         # Registra no histórico
-        HistoricoConsulta.objects.create(
+        registrar_historico(
             consulta=consulta,
             acao='OBSERVACAO',
             descricao=f'Receita removida: {medicamento}',
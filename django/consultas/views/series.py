@@ -0,0 +1,64 @@
+"""
+Views para agendamentos recorrentes (séries de consultas)
+"""
+
+from django.views.generic import FormView, View
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.urls import reverse_lazy
+from django.shortcuts import redirect, get_object_or_404
+from django.contrib import messages
+from django.db import IntegrityError
+from consultas.forms import SerieForm
+from consultas.models import SerieConsulta, conflito_de_horario
+from consultas.series import ConflitoNaSerie, cancelar_serie, editar_serie
+from .consultas import MENSAGEM_CONFLITO, VeterinarioRequiredMixin
+
+
+class SerieUpdateView(LoginRequiredMixin, VeterinarioRequiredMixin, FormView):
+    """Altera de uma vez as consultas pendentes de uma série"""
+    form_class = SerieForm
+    template_name = 'consultas/consulta_form.html'
+    success_url = reverse_lazy('consultas:consulta_list')
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            self.serie = get_object_or_404(SerieConsulta, pk=kwargs['pk'], veterinario=request.user)
+        return super().dispatch(request, *args, **kwargs)
+    
+    def form_valid(self, form):
+        try:
+            alteradas = editar_serie(self.serie, self.request.user, **form.alteracoes())
+        except ConflitoNaSerie as erro:
+            form.add_error('horario', str(erro))
+            return self.form_invalid(form)
+        except IntegrityError as erro:
+            if not conflito_de_horario(erro):
+                raise
+            form.add_error('horario', MENSAGEM_CONFLITO)
+            return self.form_invalid(form)
+        
+        if alteradas:
+            messages.success(self.request, f'{alteradas} consultas da série atualizadas com sucesso!')
+        else:
+            messages.warning(self.request, 'A série não tem consultas pendentes para alterar.')
+        return super().form_valid(form)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = f'Editar Série ({self.serie})'
+        context['botao_submit'] = 'Alterar Consultas Pendentes'
+        return context
+
+
+class SerieCancelarView(LoginRequiredMixin, VeterinarioRequiredMixin, View):
+    """Cancela as consultas pendentes de uma série"""
+    
+    def post(self, request, pk):
+        serie = get_object_or_404(SerieConsulta, pk=pk, veterinario=request.user)
+        canceladas = cancelar_serie(serie, request.user)
+        
+        if canceladas:
+            messages.success(request, f'{canceladas} consultas da série canceladas com sucesso!')
+        else:
+            messages.warning(request, 'A série não tem consultas pendentes para cancelar.')
+        return redirect('consultas:consulta_list')
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import EstatisticasPainel
 
-# Register your models here.
+
+@admin.register(EstatisticasPainel)
+class EstatisticasPainelAdmin(admin.ModelAdmin):
+    list_display = ['chave', 'atualizado_em', 'desatualizado']
+    readonly_fields = ['dados', 'atualizado_em']
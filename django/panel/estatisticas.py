@@ -0,0 +1,147 @@
+"""
+Estatísticas dos dashboards do painel (DashboardView e DashboardFuncView)
+
+Contadores, pets por tipo e as listas de "últimos cadastrados" ficam em um
+retrato gravado em EstatisticasPainel; os dashboards leem só essa linha
+(pela chave primária). O retrato é refeito:
+
+- na leitura, quando passou de PAINEL_ESTATISTICAS_SEGUNDOS ou foi marcado
+  como desatualizado pelos sinais (panel.signals). Só um request refaz
+  (SELECT ... FOR UPDATE SKIP LOCKED); os outros mostram o retrato anterior;
+- pelo comando refresh_stats, para rodar no cron e a leitura quase nunca
+  precisar refazer.
+
+Alterações em massa (update(), bulk_create, movimentação de estoque) não
+disparam sinais e aparecem quando o retrato vence.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+from .models import EstatisticasPainel
+
+ULTIMOS = 5
+
+
+def _usuario(usuario):
+    return {
+        'username': usuario.username,
+        'email': usuario.email,
+        'nome': usuario.get_full_name(),
+        'is_active': usuario.is_active,
+        'date_joined': usuario.date_joined,
+    }
+
+
+def _pet(pet):
+    return {
+        'nome': pet.nome,
+        'tipo_animal': {'nome': pet.tipo_animal.nome},
+        'raca': {'nome': pet.raca.nome},
+        'proprietario': {'username': pet.proprietario.username, 'nome': pet.proprietario.get_full_name()},
+    }
+
+
+def _produtos():
+    try:
+        from produtos.models import Produto
+        from produtos.categorias import indice_categorias
+    except ImportError:
+        return {'total_produtos': 0, 'categorias_loja': [], 'produtos_destaque': []}
+
+    indice = indice_categorias()
+    return {
+        'total_produtos': indice['total_em_estoque'],
+        'categorias_loja': indice['categorias'],
+        'produtos_destaque': [
+            {
+                'nome': produto.nome,
+                'preco': produto.preco,
+                'estoque': produto.estoque,
+                'imagem': {'url': produto.imagem.url} if produto.imagem else None,
+            }
+            for produto in Produto.objects.filter(estoque__gt=0).order_by('-produto_id')[:ULTIMOS]
+        ],
+    }
+
+
+def calcular_estatisticas():
+    """Monta o retrato a partir das tabelas (um aggregate por tabela e as listas)"""
+    dados = User.objects.aggregate(
+        total_usuarios=Count('id'),
+        usuarios_ativos=Count('id', filter=Q(is_active=True)),
+        usuarios_staff=Count('id', filter=Q(is_staff=True)),
+        total_clientes=Count('id', filter=Q(user_type=User.CLIENTE, is_active=True)),
+    )
+    dados['pets_por_tipo'] = list(
+        Animal.objects.filter(ativo=True).values('tipo_animal__nome').annotate(total=Count('id')).order_by('-total')
+    )
+    dados['total_pets'] = sum(item['total'] for item in dados['pets_por_tipo'])
+    dados['total_tipos_animais'] = TipoAnimal.objects.filter(ativo=True).count()
+    dados['total_racas'] = Raca.objects.filter(ativo=True).count()
+
+    dados['ultimos_usuarios'] = [_usuario(usuario) for usuario in User.objects.order_by('-date_joined')[:ULTIMOS]]
+    dados['ultimos_clientes'] = [
+        _usuario(usuario) for usuario in User.objects.filter(user_type=User.CLIENTE).order_by('-date_joined')[:ULTIMOS]
+    ]
+    dados['ultimos_pets'] = [
+        _pet(pet) for pet in Animal.objects.filter(ativo=True).select_related(
+            'proprietario', 'tipo_animal', 'raca'
+        ).order_by('-criado_em')[:ULTIMOS]
+    ]
+    dados.update(_produtos())
+    return dados
+
+
+def atualizar_estatisticas():
+    """
+    Refaz e grava o retrato. Retorna None se outro processo já está refazendo
+    (a linha está travada).
+    """
+    with transaction.atomic():
+        livre = list(
+            EstatisticasPainel.objects.select_for_update(skip_locked=True)
+            .filter(pk=EstatisticasPainel.CHAVE).values_list('pk', flat=True)
+        )
+        if not livre and EstatisticasPainel.objects.filter(pk=EstatisticasPainel.CHAVE).exists():
+            return None
+        retrato, _ = EstatisticasPainel.objects.update_or_create(
+            pk=EstatisticasPainel.CHAVE,
+            defaults={'dados': calcular_estatisticas(), 'atualizado_em': timezone.now(), 'desatualizado': False},
+        )
+    return retrato
+
+
+def _vencido(retrato, agora):
+    return retrato.desatualizado or agora - retrato.atualizado_em > timedelta(seconds=settings.PAINEL_ESTATISTICAS_SEGUNDOS)
+
+
+def _restaurar(dados):
+    """O JSON guarda datas como texto: volta para datetime (filtro |date dos templates)"""
+    for chave in ('ultimos_usuarios', 'ultimos_clientes'):
+        for usuario in dados[chave]:
+            if isinstance(usuario['date_joined'], str):
+                usuario['date_joined'] = parse_datetime(usuario['date_joined'])
+    return dados
+
+
+def estatisticas_painel(agora=None):
+    """Dados dos dashboards do painel, do retrato gravado (refeito se vencido)"""
+    retrato = EstatisticasPainel.objects.filter(pk=EstatisticasPainel.CHAVE).first()
+    if retrato is None or _vencido(retrato, agora or timezone.now()):
+        retrato = atualizar_estatisticas() or retrato
+        if retrato is None:
+            # outro processo está gravando o primeiro retrato
+            return calcular_estatisticas()
+    return _restaurar(retrato.dados)
+
+
+def marcar_desatualizado():
+    """Chamado pelos sinais: o próximo dashboard refaz o retrato"""
+    EstatisticasPainel.objects.filter(pk=EstatisticasPainel.CHAVE, desatualizado=False).update(desatualizado=True)
@@ -0,0 +1,218 @@
+"""
+Management command para medir a busca das listas do painel (app.busca)
+Cria usuários, animais e consultas sintéticos direto no banco (INSERT ...
+SELECT generate_series; padrão: 1 milhão de clientes, 2 milhões de animais e
+200 mil consultas de um veterinário), roda a busca de cada lista como a view
+faz (get_queryset + COUNT da paginação + primeira página) e mostra
+p50/p95/p99. Com --comparar mede também o OR de __icontains que as views
+usavam antes.
+
+Só roda com --confirmar (app.benchmark): use um banco de desenvolvimento.
+Os dados criados são removidos no final; se a execução for interrompida,
+as sobras são removidas no início da próxima ou com --limpar.
+"""
+
+import random
+import statistics
+import time
+from functools import reduce
+import operator
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test import RequestFactory
+from app.benchmark import adicionar_confirmacao, exigir_confirmacao
+from consultas.models import Consulta
+from consultas.views import ConsultaListView
+from panel.views import ClienteListView, PetAdminListView, RacaAdminListView, UsuarioListView
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+
+DOMINIO = 'bench.invalid'
+# sufixo dos tipos de animal criados aqui (as raças são removidas com eles)
+SUFIXO_TIPO = ' (bench)'
+
+NOMES = [
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Larissa', 'Marcelo', 'Natália', 'Otávio', 'Patrícia', 'Rafael', 'Sabrina', 'Thiago', 'Vanessa', 'Wagner',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+]
+PETS = [
+    'Rex', 'Thor', 'Mel', 'Luna', 'Bob', 'Nina', 'Pipoca', 'Fred', 'Amora', 'Simba', 'Belinha', 'Toby',
+    'Frida', 'Paçoca', 'Zeus', 'Lola', 'Bidu', 'Mia', 'Chico', 'Jade', 'Max', 'Bolinha', 'Nala', 'Floquinho',
+]
+RACAS = {'Cão': ['Labrador', 'Poodle', 'Vira-lata', 'Shih Tzu'], 'Gato': ['Persa', 'Siamês', 'Maine Coon']}
+MOTIVOS = [
+    'Vacinação anual', 'Check-up de rotina', 'Otite', 'Vômito e diarreia', 'Dermatite alérgica',
+    'Retorno pós-cirúrgico', 'Castração', 'Claudicação', 'Limpeza de tártaro', 'Perda de apetite',
+]
+
+# o que a recepção digita: nomes, e-mails, trechos e termos sem resultado
+TERMOS = [
+    'silva', 'ana', 'rex', 'pipoca', 'bench12345', 'ferreira', 'luna', 'labrador', 'xyzw', 'oliveira', 'bench9',
+    'vacina', 'otite', 'dermatite',
+]
+
+# parâmetro da busca na URL e campos buscados por cada lista (os mesmos das views)
+LISTAS = {
+    'usuarios': (UsuarioListView, 'search', ['username', 'email', 'first_name', 'last_name', 'crmv']),
+    'clientes': (ClienteListView, 'search', ['first_name', 'last_name', 'email', 'username']),
+    'pets': (PetAdminListView, 'search', ['nome', 'proprietario__username', 'proprietario__email']),
+    'racas': (RacaAdminListView, 'search', ['nome', 'tipo_animal__nome']),
+    'consultas': (ConsultaListView, 'busca', ['animal__nome', 'animal__proprietario__username', 'motivo']),
+}
+
+
+class Command(BaseCommand):
+    help = 'Mede p50/p95/p99 da busca das listas do painel com milhões de usuários e animais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1_000_000, help='Clientes sintéticos')
+        parser.add_argument('--animais-por-usuario', type=int, default=2, help='Animais de cada cliente')
+        parser.add_argument('--consultas', type=int, default=200_000, help='Consultas do veterinário sintético')
+        parser.add_argument('--rodadas', type=int, default=3, help='Vezes que cada termo é buscado')
+        parser.add_argument('--comparar', action='store_true', help='Mede também o OR de __icontains antigo')
+        parser.add_argument('--limpar', action='store_true', help='Só remove as sobras de uma execução interrompida')
+        adicionar_confirmacao(parser)
+
+    def handle(self, *args, **options):
+        exigir_confirmacao(options)
+        # sobras de uma execução interrompida (o finally não chegou a rodar)
+        self.limpar()
+        if options['limpar']:
+            return
+
+        try:
+            self.stdout.write(self.style.WARNING(
+                f'🔎 Criando {options["usuarios"]} clientes, '
+                f'{options["usuarios"] * options["animais_por_usuario"]} animais e '
+                f'{options["consultas"]} consultas sintéticos...'
+            ))
+            inicio = time.perf_counter()
+            self.popular(options['usuarios'], options['animais_por_usuario'], options['consultas'])
+            with connection.cursor() as cursor:
+                for tabela in ('users_user', 'pets_animal', 'pets_raca', 'consultas_consulta'):
+                    cursor.execute(f'VACUUM ANALYZE {tabela}')
+            self.stdout.write(f'  ⏱️  Dados prontos em {time.perf_counter() - inicio:.1f}s')
+
+            for lista, (view, parametro, campos) in LISTAS.items():
+                self.medir(lista, lambda termo, view=view, parametro=parametro: self.pela_view(view, parametro, termo), options['rodadas'])
+                if options['comparar']:
+                    self.medir(f'{lista} (OR antigo)', lambda termo, view=view, campos=campos: self.com_or(view, campos, termo), options['rodadas'])
+        finally:
+            self.limpar()
+
+    def limpar(self):
+        """Remove tudo o que foi criado pelo benchmark, desta execução ou de uma anterior"""
+        self.stdout.write('  🧹 Removendo dados sintéticos...')
+        padrao = f'%@{DOMINIO}'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Consulta._meta.db_table} WHERE veterinario_id IN (SELECT id FROM users_user WHERE email LIKE %s)',
+                [padrao],
+            )
+            cursor.execute(
+                'DELETE FROM pets_animal WHERE proprietario_id IN (SELECT id FROM users_user WHERE email LIKE %s)',
+                [padrao],
+            )
+            cursor.execute('DELETE FROM users_user WHERE email LIKE %s', [padrao])
+        Raca.objects.filter(tipo_animal__nome__endswith=SUFIXO_TIPO).delete()
+        TipoAnimal.objects.filter(nome__endswith=SUFIXO_TIPO).delete()
+
+    def popular(self, usuarios, animais_por_usuario, consultas=0):
+        racas = []
+        for nome_tipo, nomes_racas in RACAS.items():
+            tipo = TipoAnimal.objects.create(nome=f'{nome_tipo}{SUFIXO_TIPO}')
+            racas += [Raca.objects.create(tipo_animal=tipo, nome=nome).pk for nome in nomes_racas]
+        tipo_da_raca = dict(Raca.objects.filter(pk__in=racas).values_list('pk', 'tipo_animal_id'))
+
+        with connection.cursor() as cursor:
+            # nomes espalhados com multiplicadores primos: combinações variadas e determinísticas
+            cursor.execute("""
+                INSERT INTO users_user (password, is_superuser, username, first_name, last_name, email,
+                                        is_staff, is_active, date_joined, user_type)
+                SELECT '!', false, 'bench' || i,
+                       (%(nomes)s::text[])[1 + (i * 7919) %% cardinality(%(nomes)s::text[])],
+                       (%(sobrenomes)s::text[])[1 + (i * 104729) %% cardinality(%(sobrenomes)s::text[])],
+                       'bench' || i || '@' || %(dominio)s, false, true, now() - i * interval '1 minute', 'CLIENTE'
+                  FROM generate_series(1::bigint, %(usuarios)s) AS i
+            """, {'nomes': NOMES, 'sobrenomes': SOBRENOMES, 'dominio': DOMINIO, 'usuarios': usuarios})
+            cursor.execute("""
+                INSERT INTO pets_animal (proprietario_id, nome, tipo_animal_id, raca_id, sexo, ativo,
+                                         criado_em, atualizado_em, observacoes)
+                SELECT u.id,
+                       (%(pets)s::text[])[1 + (u.id * 31 + k) %% cardinality(%(pets)s::text[])],
+                       (%(tipos)s::int[])[1 + (u.id + k) %% cardinality(%(racas)s::int[])],
+                       (%(racas)s::int[])[1 + (u.id + k) %% cardinality(%(racas)s::int[])],
+                       'I', true, u.date_joined, u.date_joined, ''
+                  FROM users_user u, generate_series(0, %(por_usuario)s - 1) AS k
+                 WHERE u.email LIKE %(padrao)s
+            """, {
+                'pets': PETS, 'racas': racas, 'tipos': [tipo_da_raca[raca] for raca in racas],
+                'por_usuario': animais_por_usuario, 'padrao': f'%@{DOMINIO}',
+            })
+            if not consultas:
+                return
+
+            # um veterinário com uma consulta a cada 30 minutos para trás (sem
+            # sobreposição na agenda), cada uma de um animal
+            cursor.execute("""
+                INSERT INTO users_user (password, is_superuser, username, first_name, last_name, email,
+                                        is_staff, is_active, date_joined, user_type)
+                VALUES ('!', false, 'bench-veterinario', 'Veterinário', 'Bench', 'veterinario@' || %s,
+                        false, true, now(), 'VETERINARIO')
+                RETURNING id
+            """, [DOMINIO])
+            self.veterinario = User.objects.get(pk=cursor.fetchone()[0])
+            cursor.execute(f"""
+                INSERT INTO {Consulta._meta.db_table} (animal_id, veterinario_id, criado_por_id, data_hora, duracao,
+                                                       data_fim, tipo, status, motivo, observacoes, criado_em, atualizado_em)
+                SELECT a.id, %(veterinario)s, %(veterinario)s, c.inicio, 30, c.inicio + interval '30 minutes',
+                       'CONSULTA', 'REALIZADA',
+                       (%(motivos)s::text[])[1 + (a.id * 13) %% cardinality(%(motivos)s::text[])], '', c.inicio, c.inicio
+                  FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM pets_animal
+                         WHERE proprietario_id IN (SELECT id FROM users_user WHERE email LIKE %(padrao)s)
+                         ORDER BY id LIMIT %(consultas)s) AS a,
+                       LATERAL (SELECT date_trunc('hour', now()) - a.n * interval '30 minutes' AS inicio) AS c
+            """, {
+                'veterinario': self.veterinario.pk, 'motivos': MOTIVOS,
+                'padrao': f'%@{DOMINIO}', 'consultas': consultas,
+            })
+
+    def pela_view(self, view_class, parametro, termo):
+        view = view_class()
+        view.request = RequestFactory().get('/', {parametro: termo})
+        # a lista de consultas mostra só as do veterinário logado
+        view.request.user = getattr(self, 'veterinario', None)
+        view.kwargs = {}
+        return view.get_queryset()
+
+    def com_or(self, view_class, campos, termo):
+        view = view_class()
+        view.request = RequestFactory().get('/')
+        view.request.user = getattr(self, 'veterinario', None)
+        view.kwargs = {}
+        return view.get_queryset().filter(reduce(operator.or_, (Q(**{f'{campo}__icontains': termo}) for campo in campos)))
+
+    def medir(self, nome, queryset_do_termo, rodadas):
+        termos = TERMOS * rodadas
+        random.Random(42).shuffle(termos)
+        tempos = []
+        for termo in termos:
+            inicio = time.perf_counter()
+            queryset = queryset_do_termo(termo)
+            # o que a página faz: COUNT da paginação e a primeira página
+            queryset.count()
+            list(queryset[:20])
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        tempos.sort()
+        quantis = statistics.quantiles(tempos, n=100)
+        self.stdout.write(
+            f'  📊 {nome}: {len(tempos)} buscas | p50 {quantis[49]:.1f} ms | p95 {quantis[94]:.1f} ms | '
+            f'p99 {quantis[98]:.1f} ms | máx {tempos[-1]:.1f} ms'
+        )
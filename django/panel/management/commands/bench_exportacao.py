@@ -0,0 +1,83 @@
+"""
+Management command para medir a exportação das listas do painel (app.exportacao)
+Cria clientes e animais sintéticos como o bench_busca_painel (padrão: 1
+milhão de cada), baixa a exportação completa de cada lista em CSV e XLSX
+pela própria view (sem filtros: todas as linhas) e mostra tempo, tamanho,
+linhas por segundo e o pico de memória do processo antes e depois — com o
+streaming o pico não cresce com o número de linhas.
+
+Só roda com --confirmar (app.benchmark): use um banco de desenvolvimento.
+Os dados criados são removidos no final; sobras de uma execução
+interrompida são removidas no início (ou com bench_busca_painel --limpar).
+"""
+
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from app.benchmark import adicionar_confirmacao, exigir_confirmacao
+from panel.views import ClienteExportView, PetAdminExportView, UsuarioExportView
+from .bench_busca_painel import Command as BenchBuscaPainel
+
+LISTAS = {
+    'usuarios': UsuarioExportView,
+    'clientes': ClienteExportView,
+    'pets': PetAdminExportView,
+}
+
+
+def _pico_memoria_mb():
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Mede a exportação CSV/XLSX das listas do painel com 1 milhão de linhas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1_000_000, help='Clientes sintéticos')
+        parser.add_argument('--animais-por-usuario', type=int, default=1, help='Animais de cada cliente')
+        parser.add_argument('--formatos', nargs='+', choices=['csv', 'xlsx'], default=['csv', 'xlsx'])
+        adicionar_confirmacao(parser)
+
+    def handle(self, *args, **options):
+        exigir_confirmacao(options)
+        dados = BenchBuscaPainel(stdout=self.stdout, stderr=self.stderr)
+        dados.limpar()
+        try:
+            self.stdout.write(self.style.WARNING(
+                f'📤 Criando {options["usuarios"]} clientes e '
+                f'{options["usuarios"] * options["animais_por_usuario"]} animais sintéticos...'
+            ))
+            inicio = time.perf_counter()
+            dados.popular(options['usuarios'], options['animais_por_usuario'])
+            with connection.cursor() as cursor:
+                for tabela in ('users_user', 'pets_animal'):
+                    cursor.execute(f'VACUUM ANALYZE {tabela}')
+            self.stdout.write(f'  ⏱️  Dados prontos em {time.perf_counter() - inicio:.1f}s')
+
+            for lista, view in LISTAS.items():
+                for formato in options['formatos']:
+                    self.medir(lista, view, formato)
+        finally:
+            dados.limpar()
+
+    def medir(self, lista, view_class, formato):
+        request = RequestFactory().get('/')
+        view = view_class()
+        view.setup(request, formato=formato)
+        linhas = view.get_queryset().count()
+
+        pico_antes = _pico_memoria_mb()
+        inicio = time.perf_counter()
+        tamanho = 0
+        for pedaco in view.get(request, formato=formato).streaming_content:
+            tamanho += len(pedaco)
+        tempo = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f'  📊 {lista} ({formato}): {linhas} linhas em {tempo:.1f}s ({linhas / tempo:,.0f} linhas/s) | '
+            f'{tamanho / 1024 / 1024:.1f} MB | pico de memória {pico_antes:.0f} -> {_pico_memoria_mb():.0f} MB'
+        )
@@ -0,0 +1,34 @@
+"""
+Management command para refazer o retrato de estatísticas dos dashboards
+(panel.estatisticas). Rodando no cron com intervalo menor que
+PAINEL_ESTATISTICAS_SEGUNDOS, os dashboards quase nunca precisam refazer o
+retrato durante um request. Pode rodar uma vez ou em loop
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from panel.estatisticas import atualizar_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Refaz as estatísticas dos dashboards do painel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Continua rodando, refazendo a cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre atualizações no modo --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            inicio = time.perf_counter()
+            retrato = atualizar_estatisticas()
+            if retrato is None:
+                self.stdout.write('  Outro processo já está atualizando as estatísticas.')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✅ Estatísticas atualizadas em {(time.perf_counter() - inicio) * 1000:.0f} ms'
+                ))
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
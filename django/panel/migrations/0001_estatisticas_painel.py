@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 13:00
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticasPainel',
+            fields=[
+                ('chave', models.CharField(default='painel', max_length=20, primary_key=True, serialize=False)),
+                ('dados', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('atualizado_em', models.DateTimeField()),
+                ('desatualizado', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Estatísticas do Painel',
+                'verbose_name_plural': 'Estatísticas do Painel',
+            },
+        ),
+    ]
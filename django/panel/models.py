@@ -1,3 +1,24 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class EstatisticasPainel(models.Model):
+    """
+    Retrato (snapshot) dos números e listas dos dashboards do painel
+    (panel.estatisticas). Uma linha só, lida pela chave primária; é refeita
+    quando fica mais velha que PAINEL_ESTATISTICAS_SEGUNDOS ou quando os
+    sinais a marcam como desatualizada.
+    """
+    CHAVE = 'painel'
+    
+    chave = models.CharField(max_length=20, primary_key=True, default=CHAVE)
+    dados = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    atualizado_em = models.DateTimeField()
+    desatualizado = models.BooleanField(default=False)
+    
+    class Meta:
+        verbose_name = 'Estatísticas do Painel'
+        verbose_name_plural = 'Estatísticas do Painel'
+    
+    def __str__(self):
+        return f"Estatísticas de {self.atualizado_em:%d/%m/%Y %H:%M}"
@@ -0,0 +1,40 @@
+"""
+Sinais do app panel
+Marcam o retrato de estatísticas dos dashboards (panel.estatisticas) como
+desatualizado quando algo que ele conta é criado, alterado ou excluído
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+from .estatisticas import marcar_desatualizado
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_alterado(sender, update_fields=None, **kwargs):
+    # o login grava last_login a cada acesso e não muda nada do dashboard
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(marcar_desatualizado)
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+@receiver(post_save, sender=TipoAnimal)
+@receiver(post_delete, sender=TipoAnimal)
+@receiver(post_save, sender=Raca)
+@receiver(post_delete, sender=Raca)
+def cadastro_alterado(sender, **kwargs):
+    transaction.on_commit(marcar_desatualizado)
+
+
+try:
+    from produtos.models import Produto
+except ImportError:
+    pass
+else:
+    post_save.connect(cadastro_alterado, sender=Produto, dispatch_uid='panel_produto_salvo')
+    post_delete.connect(cadastro_alterado, sender=Produto, dispatch_uid='panel_produto_excluido')
@@ -1,3 +1,241 @@
-from django.test import TestCase
+import csv
+import zipfile
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from app.busca import buscar
+from panel.models import EstatisticasPainel
+from pets.models import Animal, Raca, TipoAnimal
+from users.models import User
+
+
+class ClienteListViewTest(TestCase):
+    """Pets dos clientes da página em um único prefetch (sem N+1)"""
+
+    def setUp(self):
+        self.funcionario = User.objects.create(username='func', email='func@teste.com', user_type=User.FUNCIONARIO)
+        self.client.force_login(self.funcionario)
+        tipo = TipoAnimal.objects.create(nome='Cão')
+        self.raca = Raca.objects.create(nome='SRD', tipo_animal=tipo)
+        self.tipo = tipo
+
+    def _clientes(self, quantidade, pets=7):
+        inicio = User.objects.filter(user_type=User.CLIENTE).count()
+        for indice in range(inicio, inicio + quantidade):
+            cliente = User.objects.create(username=f'cliente{indice}', email=f'cliente{indice}@teste.com')
+            Animal.objects.bulk_create([
+                Animal(proprietario=cliente, nome=f'Pet {pet}', tipo_animal=self.tipo, raca=self.raca)
+                for pet in range(pets)
+            ])
+
+    def _consultas_da_pagina(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(reverse('panel:clientes_list'))
+        self.assertEqual(resposta.status_code, 200)
+        return resposta, len(consultas)
+
+    def test_numero_de_consultas_nao_depende_dos_clientes(self):
+        self._clientes(2)
+        _, poucos = self._consultas_da_pagina()
+        self._clientes(18)
+        # sessão + usuário + paginação + total + clientes + pets (um prefetch)
+        # + gravação da sessão (savepoint, UPDATE e release)
+        with self.assertNumQueries(9):
+            resposta, muitos = self._consultas_da_pagina()
+
+        self.assertEqual(poucos, muitos)
+        for cliente in resposta.context['clientes']:
+            self.assertEqual(len(cliente.pets), 5)
+            self.assertEqual(cliente.total_pets, 7)
+
+    def test_pets_inativos_ficam_de_fora(self):
+        self._clientes(1, pets=2)
+        Animal.objects.filter(nome='Pet 0').update(ativo=False)
+        resposta, _ = self._consultas_da_pagina()
+        self.assertEqual([pet.nome for pet in resposta.context['clientes'][0].pets], ['Pet 1'])
+
+
+class BuscaPainelTest(TestCase):
+    """Busca das listas: um OR por tabela, unidos por pk, com índices de trigramas"""
+
+    def setUp(self):
+        # contagens das listas filtradas ficam no cache (app.paginacao)
+        cache.clear()
+        self.admin = User.objects.create(username='admin', email='admin@teste.com', is_staff=True)
+        self.client.force_login(self.admin)
+        tipo = TipoAnimal.objects.create(nome='Cão')
+        raca = Raca.objects.create(nome='Labrador', tipo_animal=tipo)
+        self.maria = User.objects.create(username='maria', email='maria.rex@teste.com')
+        self.joao = User.objects.create(username='joao', email='joao@teste.com', first_name='João')
+        Animal.objects.create(proprietario=self.maria, nome='Rex', tipo_animal=tipo, raca=raca)
+        Animal.objects.create(proprietario=self.joao, nome='Bidu', tipo_animal=tipo, raca=raca)
+
+    def test_busca_no_pet_e_no_tutor_sem_repetir(self):
+        resposta = self.client.get(reverse('panel:pets_list'), {'search': 'REX'})
+        # o nome do pet e o e-mail da tutora batem: aparece uma vez só
+        self.assertEqual([pet.nome for pet in resposta.context['pets']], ['Rex'])
+        resposta = self.client.get(reverse('panel:pets_list'), {'search': 'joao@'})
+        self.assertEqual([pet.nome for pet in resposta.context['pets']], ['Bidu'])
+        resposta = self.client.get(reverse('panel:usuarios_list'), {'search': 'joão'})
+        self.assertEqual(list(resposta.context['usuarios']), [self.joao])
+
+    def test_busca_usa_indices_trigram(self):
+        with connection.cursor() as cursor:
+            # tabelas pequenas: sem isso o planejador prefere ler tudo (ou a pk inteira)
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_indexscan = off')
+        plano = buscar(Animal.objects.all(), 'maria', ['nome', 'proprietario__username', 'proprietario__email']).explain()
+        for indice in ('animal_nome_trgm', 'user_username_trgm', 'user_email_trgm'):
+            self.assertIn(indice, plano)
+
+
+class PaginacaoEstimadaTest(TestCase):
+    """Listas grandes sem filtro usam a estimativa do Postgres; filtradas, a contagem em cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin', email='admin@teste.com', is_staff=True)
+        self.client.force_login(self.admin)
+        User.objects.bulk_create([User(username=f'user{indice}', email=f'user{indice}@teste.com') for indice in range(30)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users_user')
+
+    @override_settings(PAGINACAO_ESTIMATIVA_A_PARTIR=10)
+    def test_lista_sem_filtro_usa_a_estimativa(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(reverse('panel:usuarios_list'))
+        paginator = resposta.context['paginator']
+        self.assertTrue(paginator.estimado)
+        self.assertEqual(paginator.count, 31)
+        self.assertContains(resposta, 'de ~2')
+        self.assertFalse(any('COUNT(' in consulta['sql'] for consulta in consultas))
+
+    @override_settings(PAGINACAO_ESTIMATIVA_A_PARTIR=10)
+    def test_estimativa_abaixo_do_real_nao_esconde_paginas(self):
+        # cadastros depois do último ANALYZE: estimativa de 31 (2 páginas), real 61 (4 páginas)
+        User.objects.bulk_create([User(username=f'novo{indice}', email=f'novo{indice}@teste.com') for indice in range(30)])
+        vistos = set()
+        for pagina in range(1, 5):
+            resposta = self.client.get(reverse('panel:usuarios_list'), {'page': pagina})
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(resposta.context['page_obj'].has_next(), pagina < 4)
+            vistos.update(usuario.pk for usuario in resposta.context['usuarios'])
+            if pagina == 1:
+                # a última página não é conhecida
+                self.assertNotContains(resposta, 'Última')
+        self.assertEqual(len(vistos), 61)
+        self.assertEqual(self.client.get(reverse('panel:usuarios_list'), {'page': 5}).status_code, 404)
+
+    def test_lista_pequena_conta_de_verdade(self):
+        User.objects.create(username='novo', email='novo@teste.com')
+        resposta = self.client.get(reverse('panel:usuarios_list'))
+        self.assertFalse(resposta.context['paginator'].estimado)
+        self.assertEqual(resposta.context['paginator'].count, 32)
+
+    def test_contagem_filtrada_fica_no_cache_por_filtro(self):
+        resposta = self.client.get(reverse('panel:usuarios_list'), {'search': 'user1'})
+        self.assertEqual(resposta.context['paginator'].count, 11)
+        User.objects.create(username='user1000', email='user1000@teste.com')
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(reverse('panel:usuarios_list'), {'search': 'user1', 'page': 1})
+        # a página muda, a contagem é a do cache
+        self.assertEqual(resposta.context['paginator'].count, 11)
+        self.assertFalse(any('COUNT(' in consulta['sql'] for consulta in consultas))
+        resposta = self.client.get(reverse('panel:usuarios_list'), {'search': 'user29'})
+        self.assertEqual(resposta.context['paginator'].count, 1)
+
+
+class EstatisticasPainelTest(TestCase):
+    """Dashboards leem o retrato gravado; sinais e refresh_stats o mantêm em dia"""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@teste.com', is_staff=True)
+        self.funcionario = User.objects.create(username='func', email='func@teste.com', user_type=User.FUNCIONARIO)
+        tipo = TipoAnimal.objects.create(nome='Cão')
+        self.raca = Raca.objects.create(nome='SRD', tipo_animal=tipo)
+        self.cliente = User.objects.create(username='cliente', email='cliente@teste.com', first_name='Ana')
+        Animal.objects.create(proprietario=self.cliente, nome='Rex', tipo_animal=tipo, raca=self.raca)
+        call_command('refresh_stats', stdout=StringIO())
+
+    def test_dashboards_com_retrato_em_dia_leem_uma_linha(self):
+        self.client.force_login(self.admin)
+        # sessão + usuário + retrato + gravação da sessão (savepoint, UPDATE e release)
+        with self.assertNumQueries(6):
+            resposta = self.client.get(reverse('panel:dashboard'))
+        self.assertEqual(resposta.context['total_pets'], 1)
+        self.assertEqual(resposta.context['ultimos_pets'][0]['proprietario']['nome'], 'Ana')
+
+        self.client.force_login(self.funcionario)
+        with self.assertNumQueries(6):
+            resposta = self.client.get(reverse('painel_funcionario'))
+        self.assertContains(resposta, 'Ana')
+        # o admin também é do tipo cliente (padrão)
+        self.assertEqual(resposta.context['total_clientes'], 2)
+
+    def test_sinal_marca_desatualizado_e_o_dashboard_refaz(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Animal.objects.create(proprietario=self.cliente, nome='Bidu', tipo_animal=self.raca.tipo_animal, raca=self.raca)
+        self.assertTrue(EstatisticasPainel.objects.get().desatualizado)
+
+        self.client.force_login(self.admin)
+        resposta = self.client.get(reverse('panel:dashboard'))
+        self.assertEqual(resposta.context['total_pets'], 2)
+        self.assertFalse(EstatisticasPainel.objects.get().desatualizado)
+
+    def test_login_nao_desatualiza(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.save(update_fields=['last_login'])
+        self.assertFalse(EstatisticasPainel.objects.get().desatualizado)
+
+
+class ExportacaoListasTest(TestCase):
+    """Exportação das listas em CSV/XLSX com os mesmos filtros da tela"""
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@teste.com', is_staff=True)
+        self.client.force_login(self.admin)
+        tipo = TipoAnimal.objects.create(nome='Cão')
+        raca = Raca.objects.create(nome='Labrador', tipo_animal=tipo)
+        maria = User.objects.create(username='maria', email='maria@teste.com', first_name='=Maria')
+        Animal.objects.create(proprietario=maria, nome='Rex', tipo_animal=tipo, raca=raca, sexo='M')
+        Animal.objects.create(proprietario=maria, nome='Mel & Cia', tipo_animal=tipo, raca=raca, sexo='F', ativo=False)
+
+    def _conteudo(self, resposta):
+        self.assertEqual(resposta.status_code, 200)
+        return b''.join(resposta.streaming_content)
+
+    def test_csv_usa_os_filtros_da_lista(self):
+        resposta = self.client.get(reverse('panel:pets_exportar', args=['csv']), {'status': 'ativo'})
+        self.assertIn('attachment; filename="pets-', resposta['Content-Disposition'])
+        linhas = list(csv.reader(StringIO(self._conteudo(resposta).decode('utf-8-sig'))))
+        self.assertEqual(linhas[0][:4], ['Nome', 'Tipo', 'Raça', 'Sexo'])
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(linhas[1][:4], ['Rex', 'Cão', 'Labrador', 'Macho'])
+        self.assertEqual(linhas[1][7], 'Sim')
+
+        resposta = self.client.get(reverse('panel:usuarios_exportar', args=['csv']), {'search': 'maria'})
+        linhas = list(csv.reader(StringIO(self._conteudo(resposta).decode('utf-8-sig'))))
+        # texto que viraria fórmula na planilha sai como texto
+        self.assertEqual(linhas[1][:2], ['maria', "'=Maria"])
+
+    def test_xlsx_abre_como_planilha(self):
+        resposta = self.client.get(reverse('panel:pets_exportar', args=['xlsx']))
+        with zipfile.ZipFile(BytesIO(self._conteudo(resposta))) as arquivo:
+            planilha = ElementTree.fromstring(arquivo.read('xl/worksheets/sheet1.xml'))
+            self.assertIn('xl/workbook.xml', arquivo.namelist())
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        linhas = [[''.join(celula.itertext()) for celula in linha] for linha in planilha.iterfind('.//s:row', ns)]
+        self.assertEqual(linhas[0][0], 'Nome')
+        self.assertEqual(sorted(linha[0] for linha in linhas[1:]), ['Mel & Cia', 'Rex'])
+
+    def test_formato_invalido_e_permissao(self):
+        self.assertEqual(self.client.get(reverse('panel:pets_exportar', args=['pdf'])).status_code, 404)
+        self.client.force_login(User.objects.get(username='maria'))
+        resposta = self.client.get(reverse('panel:usuarios_exportar', args=['csv']))
+        self.assertEqual(resposta.status_code, 403)
@@ -6,11 +6,11 @@ Rotas organizadas por funcionalidade
 from django.urls import path
 from .views import (
     DashboardView,
-    UsuarioListView, UsuarioCreateView, UsuarioUpdateView, UsuarioToggleStatusView,
+    UsuarioListView, UsuarioExportView, UsuarioCreateView, UsuarioUpdateView, UsuarioToggleStatusView,
     TipoAnimalAdminListView, TipoAnimalAdminCreateView, TipoAnimalAdminUpdateView, TipoAnimalAdminDeleteView,
     RacaAdminListView, RacaAdminCreateView, RacaAdminUpdateView, RacaAdminDeleteView,
-    PetAdminListView,
-    ClienteListView,
+    PetAdminListView, PetAdminExportView,
+    ClienteListView, ClienteExportView,
     ClienteCadastroFuncView,
     ClienteEditarView,
     ClienteAdicionarPetView,
@@ -24,12 +24,14 @@ urlpatterns = [
     
     # Gerenciamento de usuários
     path('usuarios/', UsuarioListView.as_view(), name='usuarios_list'),
+    path('usuarios/exportar.<str:formato>', UsuarioExportView.as_view(), name='usuarios_exportar'),
     path('usuarios/novo/', UsuarioCreateView.as_view(), name='usuarios_create'),
     path('usuarios/<int:pk>/editar/', UsuarioUpdateView.as_view(), name='usuarios_update'),
     path('usuarios/<int:pk>/toggle-status/', UsuarioToggleStatusView.as_view(), name='usuarios_toggle_status'),
     
     # Gerenciamento de clientes (funcionários)
     path('clientes/', ClienteListView.as_view(), name='clientes_list'),
+    path('clientes/exportar.<str:formato>', ClienteExportView.as_view(), name='clientes_exportar'),
     path('clientes/cadastrar/', ClienteCadastroFuncView.as_view(), name='clientes_cadastrar'),
     path('clientes/<int:pk>/editar/', ClienteEditarView.as_view(), name='clientes_editar'),
     path('clientes/<int:cliente_id>/adicionar-pet/', ClienteAdicionarPetView.as_view(), name='clientes_adicionar_pet'),
@@ -48,5 +50,6 @@ urlpatterns = [
     
     # Visualização de pets
     path('pets/', PetAdminListView.as_view(), name='pets_list'),
+    path('pets/exportar.<str:formato>', PetAdminExportView.as_view(), name='pets_exportar'),
 ]
 
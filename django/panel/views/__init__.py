@@ -4,11 +4,11 @@ Organizadas em módulos separados por funcionalidade
 """
 
 from .dashboard import DashboardView, DashboardFuncView
-from .usuarios import UsuarioListView, UsuarioCreateView, UsuarioUpdateView, UsuarioToggleStatusView
+from .usuarios import UsuarioListView, UsuarioExportView, UsuarioCreateView, UsuarioUpdateView, UsuarioToggleStatusView
 from .tipos_animais import TipoAnimalAdminListView, TipoAnimalAdminCreateView, TipoAnimalAdminUpdateView, TipoAnimalAdminDeleteView
 from .racas import RacaAdminListView, RacaAdminCreateView, RacaAdminUpdateView, RacaAdminDeleteView
-from .pets import PetAdminListView
-from .clientes import ClienteListView
+from .pets import PetAdminListView, PetAdminExportView
+from .clientes import ClienteListView, ClienteExportView
 from .cliente_cadastro import ClienteCadastroFuncView
 from .cliente_edicao import ClienteEditarView, ClienteAdicionarPetView
 
@@ -16,6 +16,7 @@ __all__ = [
     'DashboardView',
     'DashboardFuncView',
     'UsuarioListView',
+    'UsuarioExportView',
     'UsuarioCreateView', 
     'UsuarioUpdateView',
     'UsuarioToggleStatusView',
@@ -28,7 +29,9 @@ __all__ = [
     'RacaAdminUpdateView',
     'RacaAdminDeleteView',
     'PetAdminListView',
+    'PetAdminExportView',
     'ClienteListView',
+    'ClienteExportView',
     'ClienteCadastroFuncView',
     'ClienteEditarView',
     'ClienteAdicionarPetView',
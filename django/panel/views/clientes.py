@@ -4,12 +4,17 @@ Views para gerenciamento de clientes no painel do funcionário
 
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from app.busca import buscar
+from app.exportacao import ExportacaoMixin
+from app.paginacao import PaginacaoEstimadaMixin, contar
+from app.prefetch import prefetch_primeiros
 from users.models import User
 from pets.models import Animal
 
 
-class ClienteListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ClienteListView(PaginacaoEstimadaMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """Lista todos os clientes com seus pets"""
     model = User
     template_name = 'clientes/list.html'
@@ -30,33 +35,49 @@ class ClienteListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         queryset = User.objects.filter(
             user_type=User.CLIENTE
         ).annotate(
-            total_pets=Count('animais')
+            # subconsulta em vez de Count('animais'): sem GROUP BY, o COUNT da
+            # paginação a descarta e ela só roda para os clientes da página
+            total_pets=Coalesce(Subquery(
+                Animal.objects.filter(proprietario=OuterRef('pk'))
+                .order_by().values('proprietario').annotate(total=Count('pk')).values('total')
+            ), 0)
+        ).prefetch_related(
+            # até 5 pets ativos por cliente, todos em uma consulta só
+            prefetch_primeiros(
+                'animais', 5,
+                Animal.objects.filter(ativo=True).select_related('tipo_animal', 'raca'),
+                to_attr='pets',
+            )
         ).order_by('-date_joined')
         
         # Filtro de busca
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(username__icontains=search)
-            )
+        queryset = buscar(queryset, self.request.GET.get('search'), ['first_name', 'last_name', 'email', 'username'])
         
         return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Adiciona os pets de cada cliente
-        for cliente in context['clientes']:
-            cliente.pets = Animal.objects.filter(
-                proprietario=cliente,
-                ativo=True
-            ).select_related('tipo_animal', 'raca')[:5]  # Limita a 5 pets por cliente
-        
-        context['total_clientes'] = User.objects.filter(
-            user_type=User.CLIENTE
-        ).count()
+        paginator = context['paginator']
+        if paginator.filtrada:
+            context['total_clientes'], context['total_estimado'] = contar(User.objects.filter(user_type=User.CLIENTE))
+        else:
+            # sem busca a paginação já contou os clientes
+            context['total_clientes'], context['total_estimado'] = paginator.count, paginator.estimado
         
         return context
+
+
+class ClienteExportView(ExportacaoMixin, ClienteListView):
+    """Exporta a lista de clientes, com a busca da tela, em CSV ou XLSX"""
+    nome_exportacao = 'clientes'
+    colunas_exportacao = [
+        ('first_name', 'Nome'),
+        ('last_name', 'Sobrenome'),
+        ('username', 'Usuário'),
+        ('email', 'E-mail'),
+        ('telefone', 'Telefone'),
+        ('total_pets', 'Pets'),
+        ('is_active', 'Ativo'),
+        ('date_joined', 'Cadastrado em'),
+    ]
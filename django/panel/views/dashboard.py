@@ -5,10 +5,7 @@ Exibe estatísticas gerais e links para os demais painéis
 
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q
-from django.utils import timezone
-from users.models import User
-from pets.models import Animal, TipoAnimal, Raca
+from panel.estatisticas import estatisticas_painel
 
 
 class DashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
@@ -34,32 +31,8 @@ class DashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Estatísticas de usuários
-        context['total_usuarios'] = User.objects.count()
-        context['usuarios_ativos'] = User.objects.filter(is_active=True).count()
-        context['usuarios_staff'] = User.objects.filter(is_staff=True).count()
-        
-        # Estatísticas de pets
-        context['total_pets'] = Animal.objects.filter(ativo=True).count()
-        context['total_tipos_animais'] = TipoAnimal.objects.filter(ativo=True).count()
-        context['total_racas'] = Raca.objects.filter(ativo=True).count()
-        
-        # Distribuição de pets por tipo
-        context['pets_por_tipo'] = Animal.objects.filter(ativo=True).values(
-            'tipo_animal__nome'
-        ).annotate(
-            total=Count('id')
-        ).order_by('-total')
-        
-        # Últimos usuários cadastrados
-        context['ultimos_usuarios'] = User.objects.order_by('-date_joined')[:5]
-        
-        # Últimos pets cadastrados
-        context['ultimos_pets'] = Animal.objects.filter(ativo=True).select_related(
-            'proprietario', 'tipo_animal', 'raca'
-        ).order_by('-criado_em')[:5]
-        
+        # contadores, pets por tipo e últimos cadastros vêm do retrato gravado
+        context.update(estatisticas_painel())
         return context
 
 
@@ -87,32 +60,6 @@ class DashboardFuncView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Estatísticas de clientes e pets
-        context['total_clientes'] = User.objects.filter(user_type=User.CLIENTE, is_active=True).count()
-        context['total_pets'] = Animal.objects.filter(ativo=True).count()
-        context['total_tipos_animais'] = TipoAnimal.objects.filter(ativo=True).count()
-        context['total_racas'] = Raca.objects.filter(ativo=True).count()
-        
-        # Produtos disponíveis (importar modelo somente se existir)
-        try:
-            from produtos.models import Produto
-            context['total_produtos'] = Produto.objects.filter(estoque__gt=0).count()
-            context['produtos_destaque'] = Produto.objects.filter(
-                estoque__gt=0
-            ).order_by('-produto_id')[:5]
-        except ImportError:
-            context['total_produtos'] = 0
-            context['produtos_destaque'] = []
-        
-        # Últimos clientes cadastrados
-        context['ultimos_clientes'] = User.objects.filter(
-            user_type=User.CLIENTE
-        ).order_by('-date_joined')[:5]
-        
-        # Últimos pets cadastrados
-        context['ultimos_pets'] = Animal.objects.filter(ativo=True).select_related(
-            'proprietario', 'tipo_animal', 'raca'
-        ).order_by('-criado_em')[:5]
-        
+        # clientes, pets, produtos e últimos cadastros vêm do retrato gravado
+        context.update(estatisticas_painel())
         return context
@@ -5,11 +5,16 @@ Painel administrativo para ver todos os pets do sistema
 
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Q
+from app.busca import buscar
+from app.exportacao import ExportacaoMixin
+from app.paginacao import PaginacaoEstimadaMixin
 from pets.models import Animal, TipoAnimal
 
 
-class PetAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+CAMPOS_BUSCA = ['nome', 'proprietario__username', 'proprietario__email']
+
+
+class PetAdminListView(PaginacaoEstimadaMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """Lista todos os pets cadastrados no sistema"""
     model = Animal
     template_name = 'pets/list.html'
@@ -42,13 +47,7 @@ class PetAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
             queryset = queryset.filter(tipo_animal_id=tipo_id)
         
         # Busca por nome do pet ou proprietário
-        search = self.request.GET.get('search', '').strip()
-        if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(proprietario__username__icontains=search) |
-                Q(proprietario__email__icontains=search)
-            )
+        queryset = buscar(queryset, self.request.GET.get('search'), CAMPOS_BUSCA)
         
         return queryset
     
@@ -59,3 +58,19 @@ class PetAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         context['tipo_filter'] = self.request.GET.get('tipo', '')
         context['search'] = self.request.GET.get('search', '')
         return context
+
+
+class PetAdminExportView(ExportacaoMixin, PetAdminListView):
+    """Exporta a lista de pets, com a busca e os filtros da tela, em CSV ou XLSX"""
+    nome_exportacao = 'pets'
+    colunas_exportacao = [
+        ('nome', 'Nome'),
+        ('tipo_animal__nome', 'Tipo'),
+        ('raca__nome', 'Raça'),
+        ('sexo', 'Sexo'),
+        ('data_nascimento', 'Nascimento'),
+        ('proprietario__username', 'Tutor'),
+        ('proprietario__email', 'E-mail do tutor'),
+        ('ativo', 'Ativo'),
+        ('criado_em', 'Cadastrado em'),
+    ]
@@ -8,11 +8,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db.models import Q
+from app.busca import buscar
+from app.paginacao import PaginacaoEstimadaMixin
 from pets.models import Raca, TipoAnimal, Animal
 
 
-class RacaAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class RacaAdminListView(PaginacaoEstimadaMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """Lista todas as raças com filtro por tipo"""
     model = Raca
     template_name = 'racas/list.html'
@@ -31,11 +32,7 @@ class RacaAdminListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
             queryset = queryset.filter(tipo_animal_id=tipo_id)
         
         # Busca por nome
-        search = self.request.GET.get('search', '').strip()
-        if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) | Q(tipo_animal__nome__icontains=search)
-            )
+        queryset = buscar(queryset, self.request.GET.get('search'), ['nome', 'tipo_animal__nome'])
         
         return queryset
     
@@ -8,12 +8,17 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib import messages
-from django.db.models import Q
+from app.busca import buscar
+from app.exportacao import ExportacaoMixin
+from app.paginacao import PaginacaoEstimadaMixin
 from users.models import User
 from users.forms import FuncionarioCreateForm
 
 
-class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+CAMPOS_BUSCA = ['username', 'email', 'first_name', 'last_name', 'crmv']
+
+
+class UsuarioListView(PaginacaoEstimadaMixin, LoginRequiredMixin, UserPassesTestMixin, ListView):
     """Lista todos os usuários do sistema com busca"""
     model = User
     template_name = 'usuarios/list.html'
@@ -27,15 +32,7 @@ class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         queryset = User.objects.all().order_by('-date_joined')
         
         # Busca por nome, email ou username
-        search = self.request.GET.get('search', '').strip()
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(crmv__icontains=search)
-            )
+        queryset = buscar(queryset, self.request.GET.get('search'), CAMPOS_BUSCA)
         
         # Filtro por status
         status = self.request.GET.get('status', '')
@@ -60,6 +57,23 @@ class UsuarioListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return context
 
 
+class UsuarioExportView(ExportacaoMixin, UsuarioListView):
+    """Exporta a lista de usuários, com a busca e os filtros da tela, em CSV ou XLSX"""
+    nome_exportacao = 'usuarios'
+    colunas_exportacao = [
+        ('username', 'Usuário'),
+        ('first_name', 'Nome'),
+        ('last_name', 'Sobrenome'),
+        ('email', 'E-mail'),
+        ('user_type', 'Tipo'),
+        ('matricula', 'Matrícula'),
+        ('crmv', 'CRMV'),
+        ('telefone', 'Telefone'),
+        ('is_active', 'Ativo'),
+        ('date_joined', 'Cadastrado em'),
+    ]
+
+
 class UsuarioCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     """Criação de novo funcionário pelo admin com sistema de matrícula"""
     model = User
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:19
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # cria a extensão pg_trgm
+        ('users', '0005_busca_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='animal',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('nome'), name='gin_trgm_ops'), name='animal_nome_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='raca',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('nome'), name='gin_trgm_ops'), name='raca_nome_trgm'),
+        ),
+    ]
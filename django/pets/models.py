@@ -15,6 +15,7 @@ Relacionamentos:
 
 from django.db import models
 from django.conf import settings
+from app.busca import indice_trigram
 
 
 class TipoAnimal(models.Model):
@@ -77,6 +78,7 @@ class Raca(models.Model):
         verbose_name_plural = "Raças"
         ordering = ['tipo_animal', 'nome']
         unique_together = ['tipo_animal', 'nome']  # Evita raça duplicada para mesmo tipo
+        indexes = [indice_trigram('nome', 'raca_nome_trgm')]  # busca do painel (app.busca)
 
     def __str__(self):
         return f"{self.nome} ({self.tipo_animal.nome})"
@@ -157,6 +159,7 @@ class Animal(models.Model):
         ordering = ['-criado_em']  # Mais recentes primeiro
         # Um usuário não pode ter dois animais com o mesmo nome
         unique_together = ['proprietario', 'nome']
+        indexes = [indice_trigram('nome', 'animal_nome_trgm')]  # busca do painel (app.busca)
 
     def __str__(self):
         return f"{self.nome} ({self.raca.nome}) - {self.proprietario.username}"
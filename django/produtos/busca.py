@@ -0,0 +1,101 @@
+"""
+Busca textual de produtos
+
+Usa o vetor Produto.busca (tsvector mantido por trigger, ver migration 0011)
+com a configuração portugues_sem_acento: stemmer do português e sem acentos.
+Cada palavra digitada vira um prefixo (racao:*), então a busca já funciona
+enquanto o usuário digita; o índice GIN produto_busca_gin resolve o @@.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from .models import Produto
+
+CONFIGURACAO = 'portugues_sem_acento'
+
+# limite de palavras consideradas (evita tsquery gigante vindo da URL)
+MAX_TERMOS = 8
+
+# Prefixos curtos ("ra", "co") casam com boa parte do catálogo e calcular o
+# ts_rank de dezenas de milhares de linhas passa da meta de latência (30 a
+# 90 ms com 100 mil produtos). Quando mais de MAX_CANDIDATOS casam, só
+# MAX_CANDIDATOS são ordenados por relevância: primeiro os que têm todas as
+# palavras no nome (o vetor busca_nome, com índice próprio), depois os
+# demais. A cada letra digitada o conjunto diminui e a ordenação volta a
+# ser completa.
+MAX_CANDIDATOS = 1000
+
+_PALAVRA = re.compile(r'\w+')
+
+# O planner não tem estatística para prefixos e, com LIMIT, prefere varrer a
+# tabela inteira. As CTEs MATERIALIZED são planejadas para ler tudo (usam os
+# índices GIN), mas são consumidas sob demanda: `demais` só é lida se os que
+# casam pelo nome não bastam para os MAX_CANDIDATOS. Se ao todo casam menos
+# que isso, todos entram e a ordenação é completa.
+_SQL_BUSCA = f"""
+WITH pelo_nome AS MATERIALIZED (
+    SELECT produto_id, busca
+    FROM produtos_produto
+    WHERE busca_nome @@ to_tsquery('{CONFIGURACAO}', %(consulta)s)
+), demais AS MATERIALIZED (
+    SELECT produto_id, busca
+    FROM produtos_produto
+    WHERE busca @@ to_tsquery('{CONFIGURACAO}', %(consulta)s)
+      AND NOT busca_nome @@ to_tsquery('{CONFIGURACAO}', %(consulta)s)
+)
+SELECT produto_id, ts_rank(busca, to_tsquery('{CONFIGURACAO}', %(consulta)s)) AS relevancia
+FROM (
+    SELECT * FROM pelo_nome
+    UNION ALL
+    SELECT * FROM demais
+    LIMIT %(candidatos)s
+) AS candidatos
+ORDER BY relevancia DESC, produto_id DESC
+LIMIT %(limite)s
+"""
+
+
+def _prefixos(termo):
+    # "ração cã" → "ração:* & cã:*"; só letras e números entram na consulta,
+    # então operadores da sintaxe do to_tsquery nunca chegam ao banco
+    palavras = [palavra.replace('_', '') for palavra in _PALAVRA.findall(termo or '')[:MAX_TERMOS]]
+    palavras = [palavra for palavra in palavras if palavra]
+    if not palavras:
+        return None
+    return ' & '.join(f'{palavra}:*' for palavra in palavras)
+
+
+def montar_consulta(termo):
+    """SearchQuery de prefixos para filtrar querysets (busca=consulta), ou None"""
+    prefixos = _prefixos(termo)
+    if prefixos is None:
+        return None
+    return SearchQuery(prefixos, search_type='raw', config=CONFIGURACAO)
+
+
+def buscar_produtos(termo, limite=20):
+    """
+    Lista dos produtos que casam com o termo, do mais relevante para o menos
+    relevante (nome pesa mais que categoria, que pesa mais que descrição).
+    Quando mais de MAX_CANDIDATOS produtos casam, a ordenação é feita entre
+    os MAX_CANDIDATOS escolhidos (primeiro os que têm todas as palavras no
+    nome), não entre todos. Cada produto vem com o atributo relevancia.
+    """
+    prefixos = _prefixos(termo)
+    if prefixos is None:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(_SQL_BUSCA, {'consulta': prefixos, 'candidatos': MAX_CANDIDATOS, 'limite': limite})
+        ranking = cursor.fetchall()
+
+    produtos = Produto.objects.select_related('categoria').in_bulk([produto_id for produto_id, _ in ranking])
+    resultado = []
+    for produto_id, relevancia in ranking:
+        produto = produtos.get(produto_id)
+        if produto is not None:  # removido entre as duas consultas
+            produto.relevancia = relevancia
+            resultado.append(produto)
+    return resultado
@@ -0,0 +1,372 @@
+"""
+Serviço do carrinho de compras
+
+Concentra as operações que alteram o carrinho para que cada uma seja feita
+em um único comando SQL ou em uma única transação (poucas idas ao banco pelo
+pooler do Supabase), sem o padrão ler-modificar-salvar que perdia
+atualizações em cliques simultâneos.
+
+Ao entrar no carrinho o estoque fica reservado até `reservado_ate`
+(RESERVA_CARRINHO_MINUTOS); reservas vencidas são devolvidas por
+`liberar_reservas_expiradas` (comando expirar_reservas).
+
+Ordem de travamento usada por todas as operações, para evitar deadlock:
+produtos (por produto_id) → carrinho → itens. A liberação de reservas só
+usa SKIP LOCKED, então nunca espera por outra transação.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Produto, CarrinhoDeCompras, ItemDoCarrinho
+
+
+class EstoqueInsuficiente(Exception):
+    """Não há estoque disponível para reservar a quantidade pedida"""
+
+
+def prazo_reserva():
+    """Momento até o qual o estoque de um item recém-alterado fica reservado"""
+    return timezone.now() + timedelta(minutes=settings.RESERVA_CARRINHO_MINUTOS)
+
+
+# Um único comando com CTEs que modificam dados:
+#  1. reserva: baixa o estoque somente se houver quantidade suficiente
+#     (o UPDATE trava a linha do produto apenas durante este comando);
+#  2. carrinho: cria o carrinho do usuário na primeira adição e soma a
+#     quantidade e o valor aos totais desnormalizados;
+#  3. upsert do item somando a quantidade já existente (F('quantidade') + n)
+#     e renovando o prazo da reserva.
+# Se a reserva não retornar linha, nada é alterado.
+_SQL_ADICIONAR_ITEM = """
+WITH reserva AS (
+    UPDATE {produto} SET estoque = estoque - %(quantidade)s
+    WHERE produto_id = %(produto_id)s AND estoque >= %(quantidade)s
+    RETURNING produto_id, preco
+), carrinho AS (
+    INSERT INTO {carrinho} AS c (usuario_id, quantidade_itens, total)
+    SELECT %(usuario_id)s, %(quantidade)s, %(quantidade)s * reserva.preco FROM reserva
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        quantidade_itens = c.quantidade_itens + EXCLUDED.quantidade_itens,
+        total = c.total + EXCLUDED.total
+    RETURNING id
+)
+INSERT INTO {item} AS item (carrinho_id, produto_id, quantidade, reservado_ate)
+SELECT carrinho.id, reserva.produto_id, %(quantidade)s, %(reservado_ate)s FROM reserva, carrinho
+ON CONFLICT (carrinho_id, produto_id)
+DO UPDATE SET quantidade = item.quantidade + EXCLUDED.quantidade, reservado_ate = EXCLUDED.reservado_ate
+RETURNING quantidade
+"""
+
+
+def adicionar_item(usuario, produto_id, quantidade=1):
+    """
+    Adiciona um produto ao carrinho do usuário reservando o estoque.
+
+    Tudo acontece em um único comando (uma transação implícita), então
+    adições concorrentes do mesmo produto nunca perdem incrementos nem
+    vendem além do estoque. Retorna a nova quantidade do item no carrinho.
+    """
+    if quantidade < 1:
+        raise ValueError('A quantidade deve ser maior que zero.')
+
+    sql = _SQL_ADICIONAR_ITEM.format(
+        produto=Produto._meta.db_table,
+        carrinho=CarrinhoDeCompras._meta.db_table,
+        item=ItemDoCarrinho._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'produto_id': produto_id,
+            'usuario_id': usuario.pk,
+            'quantidade': quantidade,
+            'reservado_ate': prazo_reserva(),
+        })
+        linha = cursor.fetchone()
+
+    if linha is None:
+        # Caminho de erro: só aqui fazemos uma segunda consulta para
+        # distinguir produto inexistente de falta de estoque
+        if not Produto.objects.filter(produto_id=produto_id).exists():
+            raise Produto.DoesNotExist(f'Produto {produto_id} não encontrado.')
+        raise EstoqueInsuficiente('Estoque insuficiente para a quantidade solicitada.')
+
+    return linha[0]
+
+
+# Versão em lote de _SQL_ADICIONAR_ITEM, usada ao juntar o carrinho anônimo
+# ao do usuário no login: reserva todos os produtos com estoque suficiente,
+# soma tudo aos totais do carrinho (criado aqui se não existir) e faz o
+# upsert de todos os itens. Produtos sem estoque ficam de fora.
+_SQL_MESCLAR_ITENS = """
+WITH pedido AS (
+    SELECT * FROM unnest(%(produtos)s::integer[], %(quantidades)s::integer[]) AS p(produto_id, quantidade)
+), reserva AS (
+    UPDATE {produto} AS produto SET estoque = produto.estoque - pedido.quantidade
+    FROM pedido
+    WHERE produto.produto_id = pedido.produto_id AND produto.estoque >= pedido.quantidade
+    RETURNING produto.produto_id, produto.preco, pedido.quantidade
+), carrinho AS (
+    INSERT INTO {carrinho} AS c (usuario_id, quantidade_itens, total)
+    SELECT %(usuario_id)s, sum(quantidade), sum(quantidade * preco) FROM reserva
+    HAVING count(*) > 0
+    ON CONFLICT (usuario_id) DO UPDATE SET
+        quantidade_itens = c.quantidade_itens + EXCLUDED.quantidade_itens,
+        total = c.total + EXCLUDED.total
+    RETURNING id
+)
+INSERT INTO {item} AS item (carrinho_id, produto_id, quantidade, reservado_ate)
+SELECT carrinho.id, reserva.produto_id, reserva.quantidade, %(reservado_ate)s FROM reserva, carrinho
+ON CONFLICT (carrinho_id, produto_id)
+DO UPDATE SET quantidade = item.quantidade + EXCLUDED.quantidade, reservado_ate = EXCLUDED.reservado_ate
+RETURNING produto_id
+"""
+
+
+def mesclar_itens(usuario, itens):
+    """
+    Soma ao carrinho do usuário as quantidades de {produto_id: quantidade},
+    reservando o estoque. Trava os produtos em ordem e grava tudo em um único
+    comando. Retorna os produto_id que ficaram de fora (inexistentes ou sem
+    estoque suficiente).
+    """
+    itens = {produto_id: quantidade for produto_id, quantidade in itens.items() if quantidade > 0}
+    if not itens:
+        return []
+
+    produtos = sorted(itens)
+    sql = _SQL_MESCLAR_ITENS.format(
+        produto=Produto._meta.db_table,
+        carrinho=CarrinhoDeCompras._meta.db_table,
+        item=ItemDoCarrinho._meta.db_table,
+    )
+    with transaction.atomic():
+        # o UPDATE ... FROM não garante a ordem dos travamentos
+        list(Produto.objects.select_for_update().filter(produto_id__in=produtos).order_by('produto_id').values_list('pk'))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'produtos': produtos,
+                'quantidades': [itens[produto_id] for produto_id in produtos],
+                'usuario_id': usuario.pk,
+                'reservado_ate': prazo_reserva(),
+            })
+            mesclados = {linha[0] for linha in cursor.fetchall()}
+
+    return [produto_id for produto_id in produtos if produto_id not in mesclados]
+
+
+def sincronizar_itens(usuario, operacoes):
+    """
+    Aplica várias alterações no carrinho de uma só vez.
+
+    `operacoes` é uma lista de dicts {produto_id, quantidade}, onde
+    quantidade é o valor final desejado do item (0 remove). Tudo roda em
+    uma transação: os produtos são travados em ordem de produto_id, depois
+    o carrinho e os itens (a ordem do módulo, que evita deadlock), o estoque
+    é reservado/devolvido pela diferença e os itens são gravados com
+    bulk_create/bulk_update.
+    Se faltar estoque para qualquer item, nada é alterado. Sem operações,
+    devolve o carrinho atual (ou None) sem criar um carrinho vazio.
+    """
+    desejado = {}
+    for operacao in operacoes:
+        try:
+            produto_id = int(operacao['produto_id'])
+            quantidade = int(operacao['quantidade'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Cada operação deve ter produto_id e quantidade inteiros.')
+        if quantidade < 0:
+            raise ValueError('A quantidade não pode ser negativa.')
+        # se o mesmo produto vier repetido, vale a última operação
+        desejado[produto_id] = quantidade
+
+    if not desejado:
+        return CarrinhoDeCompras.objects.filter(usuario=usuario).first()
+
+    with transaction.atomic():
+        produtos = {
+            produto.produto_id: produto
+            for produto in Produto.objects.select_for_update().filter(
+                produto_id__in=desejado
+            ).order_by('produto_id')
+        }
+        faltando = set(desejado) - set(produtos)
+        if faltando:
+            raise Produto.DoesNotExist(
+                f'Produto(s) não encontrado(s): {", ".join(map(str, sorted(faltando)))}.'
+            )
+
+        carrinho, _ = CarrinhoDeCompras.objects.get_or_create(usuario=usuario)
+        carrinho = CarrinhoDeCompras.objects.select_for_update().get(pk=carrinho.pk)
+
+        existentes = {
+            item.produto_id: item
+            for item in ItemDoCarrinho.objects.select_for_update().filter(
+                carrinho=carrinho, produto_id__in=desejado
+            )
+        }
+
+        novos, alterados, removidos, estoque_alterado = [], [], [], []
+        reservado_ate = prazo_reserva()
+        diferenca_itens, diferenca_total = 0, Decimal('0.00')
+        for produto_id, quantidade in desejado.items():
+            produto = produtos[produto_id]
+            item = existentes.get(produto_id)
+            atual = item.quantidade if item else 0
+            diferenca = quantidade - atual
+            if diferenca == 0:
+                continue
+            if diferenca > produto.estoque:
+                raise EstoqueInsuficiente(
+                    f'Estoque insuficiente para "{produto.nome}" (disponível: {produto.estoque}).'
+                )
+            produto.estoque -= diferenca
+            estoque_alterado.append(produto)
+            diferenca_itens += diferenca
+            diferenca_total += diferenca * produto.preco
+
+            if quantidade == 0:
+                removidos.append(item.pk)
+            elif item is None:
+                novos.append(ItemDoCarrinho(
+                    carrinho=carrinho, produto=produto, quantidade=quantidade, reservado_ate=reservado_ate
+                ))
+            else:
+                item.quantidade = quantidade
+                item.reservado_ate = reservado_ate
+                alterados.append(item)
+
+        if estoque_alterado:
+            Produto.objects.bulk_update(estoque_alterado, ['estoque'])
+        if novos:
+            ItemDoCarrinho.objects.bulk_create(novos)
+        if alterados:
+            ItemDoCarrinho.objects.bulk_update(alterados, ['quantidade', 'reservado_ate'])
+        if removidos:
+            ItemDoCarrinho.objects.filter(pk__in=removidos).delete()
+        if diferenca_itens or diferenca_total:
+            CarrinhoDeCompras.objects.filter(pk=carrinho.pk).update(
+                quantidade_itens=F('quantidade_itens') + diferenca_itens,
+                total=F('total') + diferenca_total,
+            )
+
+    return carrinho
+
+
+_SQL_REPASSAR_PRECO = """
+UPDATE {carrinho} AS c SET total = c.total + %(diferenca)s * item.quantidade
+FROM {item} AS item
+WHERE item.carrinho_id = c.id AND item.produto_id = %(produto_id)s
+"""
+
+_SQL_RETIRAR_PRODUTO = """
+UPDATE {carrinho} AS c SET
+    quantidade_itens = c.quantidade_itens - item.quantidade,
+    total = c.total - item.quantidade * %(preco)s
+FROM {item} AS item
+WHERE item.carrinho_id = c.id AND item.produto_id = %(produto_id)s
+"""
+
+
+def _executar_nos_carrinhos(sql, parametros):
+    sql = sql.format(carrinho=CarrinhoDeCompras._meta.db_table, item=ItemDoCarrinho._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+
+
+def repassar_preco(produto_id, diferenca):
+    """Ajusta o total de todos os carrinhos que têm o produto após mudança de preço"""
+    _executar_nos_carrinhos(_SQL_REPASSAR_PRECO, {'produto_id': produto_id, 'diferenca': diferenca})
+
+
+def retirar_produto_dos_carrinhos(produto_id, preco):
+    """Desconta dos totais dos carrinhos um produto que será excluído"""
+    _executar_nos_carrinhos(_SQL_RETIRAR_PRODUTO, {'produto_id': produto_id, 'preco': preco})
+
+
+def liberar_reservas_expiradas(lote=500):
+    """
+    Devolve ao estoque um lote de itens com reserva vencida e os remove dos
+    carrinhos. Todas as travas usam SELECT ... FOR UPDATE SKIP LOCKED: linhas
+    ocupadas por adições ou checkouts em andamento ficam para a próxima
+    rodada, e vários processos podem rodar ao mesmo tempo sem se bloquear.
+    Retorna quantos itens foram liberados.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        candidatos = list(
+            ItemDoCarrinho.objects.filter(reservado_ate__lt=agora)
+            .order_by('reservado_ate')
+            .values_list('pk', 'produto_id', 'carrinho_id')[:lote]
+        )
+        if not candidatos:
+            return 0
+
+        produtos = {
+            produto.produto_id: produto
+            for produto in Produto.objects.select_for_update(skip_locked=True).filter(
+                produto_id__in={produto_id for _, produto_id, _ in candidatos}
+            ).order_by('produto_id')
+        }
+        carrinhos = {
+            carrinho.pk: carrinho
+            for carrinho in CarrinhoDeCompras.objects.select_for_update(skip_locked=True).filter(
+                pk__in={carrinho_id for _, _, carrinho_id in candidatos}
+            ).order_by('pk')
+        }
+        # o prazo é conferido de novo: o item pode ter sido renovado
+        itens = list(
+            ItemDoCarrinho.objects.select_for_update(skip_locked=True).filter(
+                pk__in=[pk for pk, _, _ in candidatos],
+                produto_id__in=produtos,
+                carrinho_id__in=carrinhos,
+                reservado_ate__lt=agora,
+            )
+        )
+        if not itens:
+            return 0
+
+        devolver = defaultdict(int)
+        for item in itens:
+            produto = produtos[item.produto_id]
+            carrinho = carrinhos[item.carrinho_id]
+            devolver[item.produto_id] += item.quantidade
+            carrinho.quantidade_itens -= item.quantidade
+            carrinho.total -= item.quantidade * produto.preco
+
+        for produto_id, quantidade in devolver.items():
+            produtos[produto_id].estoque += quantidade
+        Produto.objects.bulk_update([produtos[produto_id] for produto_id in devolver], ['estoque'])
+        CarrinhoDeCompras.objects.bulk_update(
+            {carrinhos[item.carrinho_id] for item in itens}, ['quantidade_itens', 'total']
+        )
+        ItemDoCarrinho.objects.filter(pk__in=[item.pk for item in itens]).delete()
+
+    return len(itens)
+
+
+def resumo_carrinho(carrinho):
+    """Monta a representação do carrinho devolvida pela API (uma consulta para os itens)"""
+    if carrinho is None:
+        return {'itens': [], 'quantidade_itens': 0, 'total': '0.00'}
+    itens = [
+        {
+            'produto_id': item.produto_id,
+            'nome': item.produto.nome,
+            'preco': f'{item.produto.preco:.2f}',
+            'quantidade': item.quantidade,
+            'subtotal': f'{item.produto.preco * item.quantidade:.2f}',
+        }
+        for item in ItemDoCarrinho.objects.filter(carrinho=carrinho).select_related('produto').order_by('produto_id')
+    ]
+    # os totais vêm dos campos desnormalizados do carrinho
+    carrinho.refresh_from_db(fields=['quantidade_itens', 'total'])
+    return {
+        'itens': itens,
+        'quantidade_itens': carrinho.quantidade_itens,
+        'total': f'{carrinho.total:.2f}',
+    }
@@ -0,0 +1,108 @@
+"""
+Carrinho de visitantes não autenticados
+
+Os itens ({produto_id: quantidade}) ficam no cache do Django, identificados
+por um token aleatório no cookie carrinho_anonimo — nada é gravado no
+Postgres (nem a sessão) enquanto o visitante só navega e adiciona produtos.
+O estoque não é reservado: a reserva acontece quando o carrinho é juntado ao
+do usuário no login (mesclar_carrinho_anonimo), em um único comando.
+
+Com vários workers o cache precisa ser compartilhado (REDIS_URL).
+"""
+
+import re
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from .carrinho import EstoqueInsuficiente, mesclar_itens
+from .models import Produto
+
+COOKIE = 'carrinho_anonimo'
+
+# limites para o cache não crescer com requisições abusivas
+MAX_PRODUTOS = 50
+MAX_QUANTIDADE = 99
+
+_TOKEN_VALIDO = re.compile(r'^[\w-]{32}$')
+
+
+def _validade():
+    return settings.CARRINHO_ANONIMO_DIAS * 24 * 60 * 60
+
+
+def _chave(token):
+    return f'produtos:carrinho_anonimo:{token}'
+
+
+def _token(request):
+    token = request.COOKIES.get(COOKIE, '')
+    return token if _TOKEN_VALIDO.match(token) else None
+
+
+def itens_anonimos(request):
+    """Itens do carrinho anônimo do visitante: {produto_id: quantidade}"""
+    token = _token(request)
+    if token is None:
+        return {}
+    return cache.get(_chave(token)) or {}
+
+
+def quantidade_anonima(request):
+    return sum(itens_anonimos(request).values())
+
+
+def adicionar_item_anonimo(request, produto_id, quantidade=1):
+    """
+    Soma a quantidade ao item do carrinho anônimo. Só consulta o produto
+    (existe? tem estoque?), sem reservar. Retorna a nova quantidade do item.
+    Quem chama deve passar a resposta por gravar_cookie().
+    """
+    if quantidade < 1:
+        raise ValueError('A quantidade deve ser maior que zero.')
+
+    estoque = Produto.objects.filter(produto_id=produto_id).values_list('estoque', flat=True).first()
+    if estoque is None:
+        raise Produto.DoesNotExist(f'Produto {produto_id} não encontrado.')
+
+    token = _token(request) or secrets.token_urlsafe(24)
+    itens = cache.get(_chave(token)) or {}
+    if produto_id not in itens and len(itens) >= MAX_PRODUTOS:
+        raise ValueError('Seu carrinho atingiu o limite de produtos. Entre na sua conta para continuar.')
+
+    nova_quantidade = itens.get(produto_id, 0) + quantidade
+    if nova_quantidade > min(estoque, MAX_QUANTIDADE):
+        raise EstoqueInsuficiente('Estoque insuficiente para a quantidade solicitada.')
+
+    itens[produto_id] = nova_quantidade
+    cache.set(_chave(token), itens, _validade())
+    request.carrinho_anonimo_token = token
+    return nova_quantidade
+
+
+def gravar_cookie(request, response):
+    """Envia (ou renova) o cookie do carrinho anônimo após uma alteração"""
+    token = getattr(request, 'carrinho_anonimo_token', None)
+    if token:
+        response.set_cookie(COOKIE, token, max_age=_validade(), httponly=True, samesite='Lax')
+    return response
+
+
+def mesclar_carrinho_anonimo(request, usuario):
+    """
+    Chamada logo após o login: junta o carrinho anônimo ao carrinho do
+    usuário (produtos.carrinho.mesclar_itens) e descarta a cópia do cache.
+    Retorna os produtos que ficaram de fora por falta de estoque.
+    """
+    token = _token(request)
+    if token is None:
+        return []
+    itens = cache.get(_chave(token))
+    if not itens:
+        return []
+
+    sem_estoque = mesclar_itens(usuario, itens)
+    cache.delete(_chave(token))
+    if not sem_estoque:
+        return []
+    return list(Produto.objects.filter(produto_id__in=sem_estoque).order_by('nome'))
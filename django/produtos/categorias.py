@@ -0,0 +1,49 @@
+"""
+Índice de categorias em cache
+
+Nomes, ids e quantidade de produtos em estoque por categoria, montados com
+uma única consulta agregada e guardados no cache do Django. O catálogo, o
+cadastro de produtos e o dashboard do funcionário leem daqui em vez de
+consultar Categoria/Produto a cada request.
+
+Os sinais em produtos.signals apagam o índice quando um produto ou uma
+categoria é salvo ou excluído. O estoque também muda por SQL direto (reservas
+do carrinho), que não dispara sinais: por isso o índice também expira sozinho
+depois de CATEGORIAS_CACHE_SEGUNDOS.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from .models import Categoria, Produto
+
+CHAVE_CACHE = 'produtos:indice_categorias'
+
+
+def _montar_indice():
+    categorias = list(
+        Categoria.objects.annotate(em_estoque=Count('produto', filter=Q(produto__estoque__gt=0)))
+        .order_by('nome_categoria')
+        .values('id_categoria', 'nome_categoria', 'em_estoque')
+    )
+    sem_categoria = Produto.objects.filter(categoria__isnull=True, estoque__gt=0).count()
+    return {
+        'categorias': categorias,
+        'total_em_estoque': sum(categoria['em_estoque'] for categoria in categorias) + sem_categoria,
+    }
+
+
+def indice_categorias():
+    """
+    {'categorias': [{'id_categoria', 'nome_categoria', 'em_estoque'}, ...],
+    'total_em_estoque': int}, com as categorias em ordem alfabética
+    """
+    indice = cache.get(CHAVE_CACHE)
+    if indice is None:
+        indice = _montar_indice()
+        cache.set(CHAVE_CACHE, indice, getattr(settings, 'CATEGORIAS_CACHE_SEGUNDOS', 300))
+    return indice
+
+
+def invalidar_indice_categorias():
+    cache.delete(CHAVE_CACHE)
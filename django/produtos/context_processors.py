@@ -0,0 +1,24 @@
+"""
+Context processors do app de produtos
+"""
+
+from .carrinho_anonimo import quantidade_anonima
+from .models import CarrinhoDeCompras
+
+
+def carrinho(request):
+    """
+    Disponibiliza a quantidade de itens do carrinho para o badge da loja.
+    É passada como função: o template só consulta o banco quando a usa,
+    e lê apenas o total desnormalizado, sem carregar os itens.
+    Para visitantes, soma os itens do carrinho anônimo no cache.
+    """
+    def quantidade_itens():
+        if not request.user.is_authenticated:
+            # visitante: lê o carrinho anônimo do cache, sem tocar no banco
+            return quantidade_anonima(request)
+        return CarrinhoDeCompras.objects.filter(
+            usuario=request.user
+        ).values_list('quantidade_itens', flat=True).first() or 0
+
+    return {'carrinho_quantidade': quantidade_itens}
@@ -0,0 +1,121 @@
+"""
+Derivados (miniaturas) das imagens de produto
+
+Gera versões de tamanho fixo em WebP e JPEG para o catálogo e o carrinho,
+em vez de servir a foto original. Os arquivos levam o hash do conteúdo no
+nome (imutáveis), então podem ser servidos com cache de longo prazo.
+
+A geração roda fora do request: Produto.save() agenda o trabalho em um pool
+de threads após o commit, e o comando gerar_miniaturas preenche os produtos
+antigos (ou os que falharam). Ao gerar um novo conjunto, as miniaturas
+anteriores do produto são apagadas.
+
+Em produção os arquivos são servidos pelo servidor web/storage (MEDIA_ROOT),
+não pelo Django.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# nome: (largura, altura) — 'card' para o catálogo, 'mini' para o carrinho
+TAMANHOS = {
+    'card': (400, 300),
+    'mini': (120, 90),
+}
+
+FORMATOS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='miniaturas')
+
+
+def _sem_transparencia(imagem):
+    # JPEG não tem canal alfa: aplica a imagem sobre fundo branco
+    if imagem.mode != 'RGBA':
+        return imagem.convert('RGB')
+    fundo = Image.new('RGB', imagem.size, 'white')
+    fundo.paste(imagem, mask=imagem.getchannel('A'))
+    return fundo
+
+
+def gerar_derivados(produto):
+    """
+    Gera todas as miniaturas de um produto e grava os caminhos em
+    Produto.miniaturas ({tamanho: {formato: url}}). Retorna o dict gerado.
+    """
+    from .models import Produto
+
+    if not produto.imagem:
+        Produto.objects.filter(produto_id=produto.produto_id).update(miniaturas={})
+        _apagar_antigas(produto.produto_id, {})
+        return {}
+
+    with produto.imagem.open('rb') as arquivo:
+        original = Image.open(arquivo)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+    miniaturas = {}
+    for tamanho, dimensoes in TAMANHOS.items():
+        recorte = ImageOps.fit(original, dimensoes, Image.LANCZOS)
+        miniaturas[tamanho] = {}
+        for formato, opcoes in FORMATOS.items():
+            imagem = _sem_transparencia(recorte) if formato == 'jpeg' else recorte
+            buffer = BytesIO()
+            imagem.save(buffer, **opcoes)
+            conteudo = buffer.getvalue()
+
+            digest = hashlib.sha256(conteudo).hexdigest()[:16]
+            nome = f'imagens/{produto.produto_id}/derivados/{tamanho}-{digest}.{formato}'
+            # mesmo conteúdo gera o mesmo nome: não regrava arquivos idênticos
+            if not default_storage.exists(nome):
+                nome = default_storage.save(nome, ContentFile(conteudo))
+            miniaturas[tamanho][formato] = default_storage.url(nome)
+
+    Produto.objects.filter(produto_id=produto.produto_id).update(miniaturas=miniaturas)
+    _apagar_antigas(produto.produto_id, miniaturas)
+    return miniaturas
+
+
+def _apagar_antigas(produto_id, miniaturas):
+    """Remove as miniaturas do produto que não fazem parte do conjunto atual"""
+    pasta = f'imagens/{produto_id}/derivados'
+    atuais = {url.rsplit('/', 1)[-1] for formatos in miniaturas.values() for url in formatos.values()}
+    try:
+        _, arquivos = default_storage.listdir(pasta)
+    except FileNotFoundError:
+        return
+    for arquivo in arquivos:
+        if arquivo not in atuais:
+            default_storage.delete(f'{pasta}/{arquivo}')
+
+
+def _gerar_em_segundo_plano(produto_id):
+    from .models import Produto
+
+    try:
+        produto = Produto.objects.filter(produto_id=produto_id).first()
+        if produto is not None:
+            gerar_derivados(produto)
+    except Exception:
+        logger.exception('Falha ao gerar miniaturas do produto %s', produto_id)
+    finally:
+        connection.close()
+
+
+def agendar_derivados(produto_id):
+    """Agenda a geração das miniaturas para depois do commit, fora do request"""
+    transaction.on_commit(lambda: _executor.submit(_gerar_em_segundo_plano, produto_id))
@@ -0,0 +1,109 @@
+"""
+Management command para medir a latência da busca textual de produtos
+Cria um catálogo sintético (padrão: 100 mil produtos), simula um usuário
+digitando no autocomplete e mostra p50/p95/p99 de buscar_produtos().
+Os produtos e categorias criados são removidos no final (pelo id, já que
+os nomes das categorias são os de um catálogo real)
+Só roda com --confirmar (app.benchmark): use um banco de desenvolvimento.
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from app.benchmark import adicionar_confirmacao, exigir_confirmacao
+from produtos.busca import buscar_produtos
+from produtos.models import Categoria, Produto
+
+CATEGORIAS = ['Rações', 'Petiscos', 'Brinquedos', 'Higiene', 'Acessórios', 'Farmácia', 'Aquarismo', 'Pássaros']
+TIPOS = [
+    'Ração', 'Petisco', 'Coleira', 'Guia', 'Peitoral', 'Brinquedo', 'Bolinha', 'Osso', 'Areia', 'Shampoo',
+    'Condicionador', 'Cama', 'Casinha', 'Comedouro', 'Bebedouro', 'Arranhador', 'Gaiola', 'Aquário',
+    'Antipulgas', 'Vermífugo', 'Escova', 'Tapete higiênico', 'Caixa de transporte', 'Sachê', 'Biscoito',
+]
+PUBLICOS = ['para cães', 'para gatos', 'para filhotes', 'para cães adultos', 'para gatos castrados', 'para pássaros', 'para peixes']
+DETALHES = [
+    'premium', 'super premium', 'sabor frango', 'sabor carne', 'sabor salmão', 'de couro', 'de nylon',
+    'pequeno', 'médio', 'grande', 'hipoalergênico', 'natural', 'light', 'sem corantes', 'antialérgico',
+]
+MARCAS = ['Amigão', 'PetVida', 'Focinho', 'Bicho Feliz', 'Patinhas', 'Miau', 'AuAu', 'Nutripet']
+
+# termos digitados no autocomplete, letra a letra
+TERMOS = [
+    'ração', 'racao premium', 'coleira couro', 'brinquedo gato', 'areia', 'shampoo cães',
+    'petisco frango', 'arranhador', 'vermifugo', 'cama grande', 'aquario', 'sache salmao',
+    'antipulgas filhotes', 'bebedouro', 'caixa transporte', 'biscoito natural',
+]
+
+
+class Command(BaseCommand):
+    help = 'Mede p50/p95/p99 da busca textual de produtos em um catálogo sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=100_000, help='Tamanho do catálogo sintético')
+        parser.add_argument('--rodadas', type=int, default=5, help='Vezes que cada termo é digitado')
+        parser.add_argument('--limite', type=int, default=10, help='Resultados por busca (como o autocomplete)')
+        parser.add_argument('--alvo-ms', type=float, default=20.0, help='Meta de p95 em milissegundos')
+        parser.add_argument('--lote', type=int, default=5000, help='Tamanho do lote do bulk_create')
+        adicionar_confirmacao(parser)
+
+    def handle(self, *args, **options):
+        exigir_confirmacao(options)
+        aleatorio = random.Random(42)
+        self.categorias = [Categoria.objects.create(nome_categoria=nome) for nome in CATEGORIAS]
+
+        try:
+            self.stdout.write(self.style.WARNING(f'🔎 Criando {options["produtos"]} produtos sintéticos...'))
+            inicio = time.perf_counter()
+            self.popular(aleatorio, options['produtos'], options['lote'])
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE produtos_produto')
+            self.stdout.write(f'  ⏱️  Catálogo pronto em {time.perf_counter() - inicio:.1f}s')
+
+            # cada prefixo que o usuário veria enquanto digita ("r", "ra", "rac"...)
+            digitados = [termo[:fim] for termo in TERMOS for fim in range(2, len(termo) + 1) if termo[fim - 1] != ' ']
+
+            for termo in digitados[:10]:  # aquece cache e conexão
+                list(buscar_produtos(termo, limite=options['limite']))
+
+            tempos = []
+            for _ in range(options['rodadas']):
+                aleatorio.shuffle(digitados)
+                for termo in digitados:
+                    inicio = time.perf_counter()
+                    list(buscar_produtos(termo, limite=options['limite']))
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+
+            tempos.sort()
+            quantis = statistics.quantiles(tempos, n=100)
+            p50, p95, p99 = quantis[49], quantis[94], quantis[98]
+            self.stdout.write(f'  📊 {len(tempos)} buscas | p50 {p50:.2f} ms | p95 {p95:.2f} ms | p99 {p99:.2f} ms | máx {tempos[-1]:.2f} ms')
+
+            if p95 <= options['alvo_ms']:
+                self.stdout.write(self.style.SUCCESS(f'✅ p95 dentro da meta de {options["alvo_ms"]:.0f} ms!'))
+            else:
+                self.stdout.write(self.style.ERROR(f'❌ p95 acima da meta de {options["alvo_ms"]:.0f} ms'))
+        finally:
+            Produto.objects.filter(categoria__in=self.categorias).delete()
+            Categoria.objects.filter(pk__in=[categoria.pk for categoria in self.categorias]).delete()
+
+    def popular(self, aleatorio, quantidade, lote):
+        produtos = []
+        for _ in range(quantidade):
+            nome = f'{aleatorio.choice(TIPOS)} {aleatorio.choice(MARCAS)} {aleatorio.choice(DETALHES)}'
+            descricao = f'{nome} {aleatorio.choice(PUBLICOS)}, {aleatorio.choice(DETALHES)} e {aleatorio.choice(DETALHES)}.'
+            produtos.append(Produto(
+                nome=nome,
+                descricao=descricao,
+                preco=Decimal(aleatorio.randint(500, 50000)) / 100,
+                estoque=aleatorio.randint(0, 200),
+                categoria=aleatorio.choice(self.categorias),
+            ))
+            if len(produtos) >= lote:
+                Produto.objects.bulk_create(produtos)
+                produtos = []
+        if produtos:
+            Produto.objects.bulk_create(produtos)
@@ -0,0 +1,97 @@
+"""
+Management command para medir a vazão de adições ao carrinho
+Dispara várias threads adicionando o mesmo produto ao mesmo tempo e
+confere se nenhuma adição foi perdida nem o estoque ficou negativo.
+Grava no banco configurado: só roda com --confirmar (app.benchmark)
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from app.benchmark import adicionar_confirmacao, exigir_confirmacao
+from produtos.models import Produto, CarrinhoDeCompras, ItemDoCarrinho
+from produtos.carrinho import adicionar_item, EstoqueInsuficiente
+
+
+User = get_user_model()
+
+PREFIXO = 'bench_carrinho_'
+
+
+class Command(BaseCommand):
+    help = 'Mede adições por segundo ao carrinho sob carga concorrente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Número de threads simultâneas')
+        parser.add_argument('--adicoes', type=int, default=200, help='Adições feitas por thread')
+        parser.add_argument('--usuarios', type=int, default=4, help='Usuários (carrinhos) disputando o mesmo item')
+        parser.add_argument('--estoque', type=int, default=None, help='Estoque inicial (padrão: suficiente para todas as adições)')
+        adicionar_confirmacao(parser)
+
+    def handle(self, *args, **options):
+        exigir_confirmacao(options)
+        threads = options['threads']
+        adicoes = options['adicoes']
+        total_pedido = threads * adicoes
+        estoque_inicial = options['estoque'] if options['estoque'] is not None else total_pedido
+
+        self.stdout.write(self.style.WARNING('🛒 Preparando benchmark do carrinho...'))
+        usuarios = [
+            User.objects.create(username=f'{PREFIXO}{i}', email=f'{PREFIXO}{i}@bench.local')
+            for i in range(options['usuarios'])
+        ]
+        produto = Produto.objects.create(
+            nome=f'{PREFIXO}produto', descricao='Produto de benchmark', preco=1, estoque=estoque_inicial
+        )
+
+        contadores = {'ok': 0, 'sem_estoque': 0}
+        trava = threading.Lock()
+
+        def trabalhador(indice):
+            usuario = usuarios[indice % len(usuarios)]
+            ok = sem_estoque = 0
+            try:
+                for _ in range(adicoes):
+                    try:
+                        adicionar_item(usuario, produto.produto_id, 1)
+                        ok += 1
+                    except EstoqueInsuficiente:
+                        sem_estoque += 1
+            finally:
+                connection.close()
+            with trava:
+                contadores['ok'] += ok
+                contadores['sem_estoque'] += sem_estoque
+
+        try:
+            self.stdout.write(f'  ⏱️  {threads} threads x {adicoes} adições (estoque inicial: {estoque_inicial})')
+            inicio = time.perf_counter()
+            workers = [threading.Thread(target=trabalhador, args=(i,)) for i in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            duracao = time.perf_counter() - inicio
+
+            produto.refresh_from_db()
+            no_carrinho = ItemDoCarrinho.objects.filter(
+                carrinho__usuario__in=usuarios
+            ).aggregate(total=Sum('quantidade'))['total'] or 0
+
+            self.stdout.write(f'  ✅ Adições aceitas: {contadores["ok"]}')
+            self.stdout.write(f'  ⚠️  Recusadas por falta de estoque: {contadores["sem_estoque"]}')
+            self.stdout.write(f'  📦 Estoque final: {produto.estoque} | Unidades nos carrinhos: {no_carrinho}')
+            self.stdout.write(self.style.SUCCESS(f'  🚀 {total_pedido / duracao:.0f} adições/s em {duracao:.2f}s'))
+
+            if no_carrinho != contadores['ok'] or produto.estoque + no_carrinho != estoque_inicial or produto.estoque < 0:
+                self.stdout.write(self.style.ERROR('❌ Inconsistência: atualizações perdidas ou estoque vendido além do disponível!'))
+            else:
+                self.stdout.write(self.style.SUCCESS('✅ Nenhuma atualização perdida e estoque consistente!'))
+        finally:
+            CarrinhoDeCompras.objects.filter(usuario__in=usuarios).delete()
+            produto.delete()
+            User.objects.filter(username__startswith=PREFIXO).delete()
@@ -0,0 +1,41 @@
+"""
+Management command para liberar reservas de estoque vencidas
+Devolve ao estoque os itens de carrinho cujo prazo de reserva passou.
+Pode rodar uma vez (cron) ou em loop; várias instâncias podem rodar ao
+mesmo tempo, pois a liberação usa SELECT ... FOR UPDATE SKIP LOCKED
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from produtos.carrinho import liberar_reservas_expiradas
+
+
+class Command(BaseCommand):
+    help = 'Libera o estoque reservado por itens de carrinho com reserva vencida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Itens liberados por transação')
+        parser.add_argument('--loop', action='store_true', help='Continua rodando, verificando a cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=60, help='Segundos entre verificações no modo --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            liberados = self.liberar(options['lote'])
+            if liberados:
+                self.stdout.write(self.style.SUCCESS(f'✅ {liberados} reserva(s) liberada(s)'))
+            else:
+                self.stdout.write('  Nenhuma reserva vencida.')
+
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
+
+    def liberar(self, lote):
+        """Processa lotes até não sobrar reserva vencida que não esteja travada"""
+        total = 0
+        while True:
+            liberados = liberar_reservas_expiradas(lote)
+            total += liberados
+            if liberados < lote:
+                return total
@@ -0,0 +1,72 @@
+"""
+Management command para exportar os produtos em CSV ou JSONL
+Percorre a tabela com .iterator(chunk_size) (cursor no servidor), então a
+memória não cresce com o tamanho do catálogo. O arquivo gerado tem as
+mesmas colunas aceitas por import_produtos
+"""
+
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from produtos.models import Produto
+
+COLUNAS = ['produto_id', 'nome', 'descricao', 'preco', 'estoque', 'categoria']
+
+
+class Command(BaseCommand):
+    help = 'Exporta os produtos para um arquivo CSV ou JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo de saída (ou - para a saída padrão)')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Padrão: deduzido pela extensão do arquivo')
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas buscadas do banco por vez')
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo']
+        formato = options['formato']
+        if formato is None:
+            if caminho.endswith('.csv'):
+                formato = 'csv'
+            elif caminho.endswith(('.jsonl', '.ndjson')):
+                formato = 'jsonl'
+            else:
+                raise CommandError('Não foi possível deduzir o formato pela extensão; use --formato csv|jsonl')
+
+        linhas = (
+            Produto.objects.order_by('produto_id')
+            .values_list('produto_id', 'nome', 'descricao', 'preco', 'estoque', 'categoria__nome_categoria')
+            .iterator(chunk_size=options['lote'])
+        )
+
+        # na saída padrão as mensagens vão para o stderr para não misturar com os dados
+        saida_mensagens = self.stderr if caminho == '-' else self.stdout
+        saida_mensagens.write(self.style.WARNING(f'📤 Exportando produtos ({formato})...'))
+        inicio = time.perf_counter()
+
+        arquivo = sys.stdout if caminho == '-' else open(caminho, 'w', encoding='utf-8', newline='')
+        try:
+            if formato == 'csv':
+                escritor = csv.writer(arquivo)
+                escritor.writerow(COLUNAS)
+                escrever = escritor.writerow
+            else:
+                def escrever(linha):
+                    registro = dict(zip(COLUNAS, linha))
+                    registro['preco'] = str(registro['preco'])
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+            total = 0
+            for linha in linhas:
+                escrever(linha)
+                total += 1
+        finally:
+            if arquivo is not sys.stdout:
+                arquivo.close()
+
+        duracao = time.perf_counter() - inicio
+        saida_mensagens.write(self.style.SUCCESS(
+            f'✅ {total} produtos exportados em {duracao:.2f}s ({total / duracao if duracao else 0:.0f} linhas/s)'
+        ))
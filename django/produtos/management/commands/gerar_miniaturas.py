@@ -0,0 +1,35 @@
+"""
+Management command para gerar as miniaturas das imagens de produto
+Preenche os produtos que ainda não têm miniaturas (ou todos, com --todos)
+"""
+
+from django.core.management.base import BaseCommand
+from produtos.models import Produto
+from produtos.imagens import gerar_derivados
+
+
+class Command(BaseCommand):
+    help = 'Gera as miniaturas WebP/JPEG das imagens de produto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Regera também os produtos que já têm miniaturas')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🖼️  Gerando miniaturas...'))
+
+        produtos = Produto.objects.exclude(imagem='').exclude(imagem__isnull=True).order_by('produto_id')
+        if not options['todos']:
+            produtos = produtos.filter(miniaturas={})
+
+        geradas = falhas = 0
+        for produto in produtos.iterator(chunk_size=200):
+            try:
+                gerar_derivados(produto)
+            except Exception as erro:
+                falhas += 1
+                self.stdout.write(self.style.ERROR(f'  ❌ {produto.nome} (#{produto.produto_id}): {erro}'))
+                continue
+            geradas += 1
+            self.stdout.write(f'  ✅ {produto.nome} (#{produto.produto_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {geradas} produto(s) processado(s), {falhas} falha(s)'))
@@ -0,0 +1,187 @@
+"""
+Management command para importar produtos em massa a partir de CSV ou JSONL
+Lê o arquivo linha a linha (memória limitada ao tamanho do lote) e grava em
+lotes com INSERT ... ON CONFLICT: linhas com produto_id atualizam o produto
+existente, linhas sem produto_id criam produtos novos.
+Colunas: produto_id (opcional), nome, descricao, preco, estoque, categoria
+(nome da categoria; categorias que não existem são criadas)
+"""
+
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from produtos.carrinho import repassar_preco
+from produtos.categorias import invalidar_indice_categorias
+from produtos.models import Categoria, Produto
+
+CAMPOS_ATUALIZADOS = ['nome', 'descricao', 'preco', 'estoque', 'categoria']
+
+
+class LinhaInvalida(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Importa (cria ou atualiza) produtos de um arquivo CSV ou JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo (ou - para ler da entrada padrão)')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Padrão: deduzido pela extensão do arquivo')
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas gravadas por INSERT')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or self.deduzir_formato(options['arquivo'])
+        self.categorias = {
+            self.chave_categoria(nome): id_categoria
+            for id_categoria, nome in Categoria.objects.values_list('id_categoria', 'nome_categoria')
+        }
+        self.categorias_criadas = 0
+
+        self.stdout.write(self.style.WARNING(f'📥 Importando produtos ({formato})...'))
+        inicio = time.perf_counter()
+        gravados = invalidos = 0
+        lote = {}
+        novos = []
+
+        arquivo = sys.stdin if options['arquivo'] == '-' else open(options['arquivo'], encoding='utf-8-sig', newline='')
+        try:
+            for numero, linha in self.ler(arquivo, formato):
+                try:
+                    produto = self.montar_produto(linha)
+                except LinhaInvalida as erro:
+                    invalidos += 1
+                    self.stdout.write(self.style.ERROR(f'  ❌ Linha {numero}: {erro}'))
+                    continue
+
+                # o mesmo produto_id repetido no lote fica só com a última linha
+                # (o ON CONFLICT não pode atualizar a mesma linha duas vezes)
+                if produto.produto_id is None:
+                    novos.append(produto)
+                else:
+                    lote[produto.produto_id] = produto
+
+                if len(lote) + len(novos) >= options['lote']:
+                    gravados += self.gravar(list(lote.values()), novos)
+                    lote, novos = {}, []
+                    self.stdout.write(f'  ⏱️  {gravados} produtos ({gravados / (time.perf_counter() - inicio):.0f} linhas/s)')
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+
+        if lote or novos:
+            gravados += self.gravar(list(lote.values()), novos)
+
+        # produto_id explícito não avança a sequence: evita conflito nos próximos cadastros
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Produto]):
+                cursor.execute(sql)
+
+        # bulk_create não dispara os sinais que mantêm o índice de categorias
+        invalidar_indice_categorias()
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'  🏷️  Categorias criadas: {self.categorias_criadas}')
+        if invalidos:
+            self.stdout.write(self.style.ERROR(f'  ⚠️  Linhas ignoradas por erro: {invalidos}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {gravados} produtos importados em {duracao:.2f}s ({gravados / duracao if duracao else 0:.0f} linhas/s)'
+        ))
+
+    def deduzir_formato(self, caminho):
+        if caminho.endswith('.csv'):
+            return 'csv'
+        if caminho.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        raise CommandError('Não foi possível deduzir o formato pela extensão; use --formato csv|jsonl')
+
+    def ler(self, arquivo, formato):
+        """Gera (número da linha, dict) sem carregar o arquivo inteiro"""
+        if formato == 'csv':
+            leitor = csv.DictReader(arquivo)
+            for linha in leitor:
+                yield leitor.line_num, linha
+            return
+
+        for numero, texto in enumerate(arquivo, start=1):
+            if not texto.strip():
+                continue
+            try:
+                linha = json.loads(texto)
+            except ValueError:
+                linha = None
+            yield numero, linha if isinstance(linha, dict) else {'_invalida': True}
+
+    @staticmethod
+    def chave_categoria(nome):
+        return ' '.join(nome.split()).casefold()
+
+    def categoria_id(self, nome):
+        """Resolve a categoria pelo nome no mapa em memória, criando se preciso"""
+        nome = ' '.join((nome or '').split())
+        if not nome:
+            return None
+        chave = self.chave_categoria(nome)
+        if chave not in self.categorias:
+            self.categorias[chave] = Categoria.objects.create(nome_categoria=nome).id_categoria
+            self.categorias_criadas += 1
+        return self.categorias[chave]
+
+    def montar_produto(self, linha):
+        if linha.get('_invalida'):
+            raise LinhaInvalida('JSON inválido')
+
+        nome = str(linha.get('nome') or '').strip()
+        if not nome:
+            raise LinhaInvalida('nome é obrigatório')
+        if len(nome) > Produto._meta.get_field('nome').max_length:
+            raise LinhaInvalida('nome muito longo')
+
+        try:
+            preco = Decimal(str(linha.get('preco'))).quantize(Decimal('0.01'))
+            estoque = int(linha.get('estoque') or 0)
+            produto_id = int(linha['produto_id']) if str(linha.get('produto_id') or '').strip() else None
+        except (InvalidOperation, TypeError, ValueError):
+            raise LinhaInvalida('produto_id, preco ou estoque inválido')
+        if preco < 0 or estoque < 0:
+            raise LinhaInvalida('preco e estoque não podem ser negativos')
+
+        return Produto(
+            produto_id=produto_id,
+            nome=nome,
+            descricao=str(linha.get('descricao') or ''),
+            preco=preco,
+            estoque=estoque,
+            categoria_id=self.categoria_id(linha.get('categoria')),
+        )
+
+    def gravar(self, existentes, novos):
+        """
+        Grava um lote em uma transação. Produtos atualizados que mudaram de
+        preço têm a diferença repassada aos carrinhos (o bulk_create não passa
+        pelo Produto.save())
+        """
+        with transaction.atomic():
+            if existentes:
+                precos = dict(
+                    Produto.objects.filter(produto_id__in=[produto.produto_id for produto in existentes])
+                    .values_list('produto_id', 'preco')
+                )
+                Produto.objects.bulk_create(
+                    existentes,
+                    update_conflicts=True,
+                    unique_fields=['produto_id'],
+                    update_fields=CAMPOS_ATUALIZADOS,
+                )
+                for produto in existentes:
+                    anterior = precos.get(produto.produto_id)
+                    if anterior is not None and anterior != produto.preco:
+                        repassar_preco(produto.produto_id, produto.preco - anterior)
+            if novos:
+                Produto.objects.bulk_create(novos)
+        return len(existentes) + len(novos)
@@ -0,0 +1,61 @@
+"""
+Management command para conferir os totais desnormalizados dos carrinhos
+Recalcula quantidade de itens e valor total a partir dos itens e, com
+--corrigir, grava os valores corretos nos carrinhos divergentes
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from produtos.models import CarrinhoDeCompras
+
+
+class Command(BaseCommand):
+    help = 'Confere (e opcionalmente corrige) os totais mantidos em CarrinhoDeCompras'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corrigir', action='store_true', help='Grava os totais recalculados nos carrinhos divergentes')
+        parser.add_argument('--lote', type=int, default=500, help='Tamanho do lote de atualização')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('🧮 Conferindo totais dos carrinhos...'))
+
+        # Um único GROUP BY que devolve apenas os carrinhos divergentes (HAVING)
+        divergentes = CarrinhoDeCompras.objects.annotate(
+            itens_real=Coalesce(Sum('itemdocarrinho__quantidade'), Value(0), output_field=IntegerField()),
+            total_real=Coalesce(
+                Sum(F('itemdocarrinho__quantidade') * F('itemdocarrinho__produto__preco')),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        ).filter(
+            ~Q(quantidade_itens=F('itens_real')) | ~Q(total=F('total_real'))
+        ).order_by('pk')
+
+        corrigidos = []
+        encontrados = 0
+        for carrinho in divergentes.iterator(chunk_size=options['lote']):
+            encontrados += 1
+            self.stdout.write(
+                f'  ⚠️  Carrinho {carrinho.pk}: itens {carrinho.quantidade_itens} → {carrinho.itens_real}, '
+                f'total {carrinho.total} → {carrinho.total_real}'
+            )
+            if options['corrigir']:
+                carrinho.quantidade_itens = carrinho.itens_real
+                carrinho.total = carrinho.total_real
+                corrigidos.append(carrinho)
+                if len(corrigidos) >= options['lote']:
+                    CarrinhoDeCompras.objects.bulk_update(corrigidos, ['quantidade_itens', 'total'])
+                    corrigidos = []
+
+        if corrigidos:
+            CarrinhoDeCompras.objects.bulk_update(corrigidos, ['quantidade_itens', 'total'])
+
+        if not encontrados:
+            self.stdout.write(self.style.SUCCESS('✅ Todos os carrinhos estão consistentes!'))
+        elif options['corrigir']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {encontrados} carrinho(s) corrigido(s)!'))
+        else:
+            self.stdout.write(self.style.ERROR(f'❌ {encontrados} carrinho(s) divergente(s). Use --corrigir para ajustar.'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0005_merge_20251119_0758'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', '-produto_id'], name='produto_categoria_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('estoque__gt', 0)), fields=['-produto_id'], name='produto_em_estoque_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def juntar_repetidos(apps, schema_editor):
+    """
+    O get_or_create antigo permitia carrinhos repetidos do mesmo usuário e
+    itens repetidos do mesmo produto: junta tudo no mais antigo (somando as
+    quantidades) antes de criar as constraints únicas
+    """
+    CarrinhoDeCompras = apps.get_model('produtos', 'CarrinhoDeCompras')
+    ItemDoCarrinho = apps.get_model('produtos', 'ItemDoCarrinho')
+
+    carrinhos = (
+        CarrinhoDeCompras.objects.order_by().values('usuario')
+        .annotate(repetidos=Count('id'), manter=Min('id')).filter(repetidos__gt=1)
+    )
+    for carrinho in carrinhos:
+        outros = CarrinhoDeCompras.objects.filter(usuario=carrinho['usuario']).exclude(pk=carrinho['manter'])
+        ItemDoCarrinho.objects.filter(carrinho__in=outros).update(carrinho=carrinho['manter'])
+        outros.delete()
+
+    itens = (
+        ItemDoCarrinho.objects.order_by().values('carrinho', 'produto')
+        .annotate(repetidos=Count('id'), manter=Min('id'), soma=Sum('quantidade')).filter(repetidos__gt=1)
+    )
+    for item in itens:
+        ItemDoCarrinho.objects.filter(pk=item['manter']).update(quantidade=item['soma'])
+        ItemDoCarrinho.objects.filter(carrinho=item['carrinho'], produto=item['produto']).exclude(pk=item['manter']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0006_produto_indices_catalogo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(juntar_repetidos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='carrinhodecompras',
+            constraint=models.UniqueConstraint(fields=('usuario',), name='carrinho_usuario_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemdocarrinho',
+            constraint=models.UniqueConstraint(fields=('carrinho', 'produto'), name='item_carrinho_produto_unico'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0007_carrinho_constraints_unicas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='quantidade_itens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='carrinhodecompras',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        # preenche os totais dos carrinhos já existentes
+        migrations.RunSQL(
+            sql="""
+                UPDATE produtos_carrinhodecompras AS c
+                SET quantidade_itens = agregado.quantidade_itens, total = agregado.total
+                FROM (
+                    SELECT item.carrinho_id,
+                           SUM(item.quantidade) AS quantidade_itens,
+                           SUM(item.quantidade * produto.preco) AS total
+                    FROM produtos_itemdocarrinho AS item
+                    JOIN produtos_produto AS produto ON produto.produto_id = item.produto_id
+                    GROUP BY item.carrinho_id
+                ) AS agregado
+                WHERE agregado.carrinho_id = c.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
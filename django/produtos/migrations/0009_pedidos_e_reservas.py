@@ -0,0 +1,74 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0008_carrinho_totais'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome_produto', models.CharField(max_length=100)),
+                ('preco_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantidade', models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Pedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('CONFIRMADO', 'Confirmado'), ('CANCELADO', 'Cancelado')], default='CONFIRMADO', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.AddField(
+            model_name='itemdocarrinho',
+            name='reservado_ate',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='itemdocarrinho',
+            index=models.Index(fields=['reservado_ate'], name='item_carrinho_reserva_idx'),
+        ),
+        # o ler-modificar-salvar antigo podia deixar estoque negativo
+        migrations.RunSQL(
+            'UPDATE produtos_produto SET estoque = 0 WHERE estoque < 0',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='produto',
+            constraint=models.CheckConstraint(condition=models.Q(('estoque__gte', 0)), name='produto_estoque_nao_negativo'),
+        ),
+        migrations.AddField(
+            model_name='itempedido',
+            name='produto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='produtos.produto'),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pedidos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='itempedido',
+            name='pedido',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='produtos.pedido'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', '-criado_em'], name='produtos_pe_usuario_8080dd_idx'),
+        ),
+    ]
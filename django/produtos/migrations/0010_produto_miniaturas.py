@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0009_pedidos_e_reservas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='miniaturas',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import UnaccentExtension
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+
+# Configuração de busca em português que ignora acentos ("racao" encontra
+# "Ração"): o unaccent roda antes do stemmer do português
+CONFIGURACAO_SQL = """
+CREATE TEXT SEARCH CONFIGURATION portugues_sem_acento (COPY = pg_catalog.portuguese);
+ALTER TEXT SEARCH CONFIGURATION portugues_sem_acento
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+"""
+
+REMOVER_CONFIGURACAO_SQL = "DROP TEXT SEARCH CONFIGURATION IF EXISTS portugues_sem_acento;"
+
+# O vetor é calculado no banco, então vale também para bulk_create, update()
+# e SQL direto. Pesos: nome (A) > categoria (B) > descrição (C).
+TRIGGERS_SQL = """
+CREATE FUNCTION produtos_produto_busca_atualizar() RETURNS trigger AS $$
+BEGIN
+    NEW.busca :=
+        setweight(to_tsvector('portugues_sem_acento', coalesce(NEW.nome, '')), 'A') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(
+            (SELECT nome_categoria FROM produtos_categoria WHERE id_categoria = NEW.categoria_id), ''
+        )), 'B') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(NEW.descricao, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER produtos_produto_busca
+    BEFORE INSERT OR UPDATE OF nome, descricao, categoria_id ON produtos_produto
+    FOR EACH ROW EXECUTE FUNCTION produtos_produto_busca_atualizar();
+
+-- renomear uma categoria recalcula o vetor dos seus produtos
+CREATE FUNCTION produtos_categoria_busca_atualizar() RETURNS trigger AS $$
+BEGIN
+    UPDATE produtos_produto SET nome = nome WHERE categoria_id = NEW.id_categoria;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER produtos_categoria_busca
+    AFTER UPDATE OF nome_categoria ON produtos_categoria
+    FOR EACH ROW WHEN (OLD.nome_categoria IS DISTINCT FROM NEW.nome_categoria)
+    EXECUTE FUNCTION produtos_categoria_busca_atualizar();
+
+-- preenche os produtos existentes
+UPDATE produtos_produto SET nome = nome;
+"""
+
+REMOVER_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS produtos_categoria_busca ON produtos_categoria;
+DROP FUNCTION IF EXISTS produtos_categoria_busca_atualizar();
+DROP TRIGGER IF EXISTS produtos_produto_busca ON produtos_produto;
+DROP FUNCTION IF EXISTS produtos_produto_busca_atualizar();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0010_produto_miniaturas'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunSQL(CONFIGURACAO_SQL, REMOVER_CONFIGURACAO_SQL),
+        migrations.AddField(
+            model_name='produto',
+            name='busca',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(TRIGGERS_SQL, REMOVER_TRIGGERS_SQL),
+        migrations.AddIndex(
+            model_name='produto',
+            index=GinIndex(fields=['busca'], name='produto_busca_gin'),
+        ),
+    ]
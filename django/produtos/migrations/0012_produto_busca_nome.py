@@ -0,0 +1,59 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+
+# O trigger da migration 0011 passa a guardar também o vetor só do nome:
+# produtos.busca escolhe os candidatos que casam pelo nome pelo índice dele,
+# sem recalcular to_tsvector(nome) linha a linha
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION produtos_produto_busca_atualizar() RETURNS trigger AS $$
+BEGIN
+    NEW.busca_nome := to_tsvector('portugues_sem_acento', coalesce(NEW.nome, ''));
+    NEW.busca :=
+        setweight(NEW.busca_nome, 'A') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(
+            (SELECT nome_categoria FROM produtos_categoria WHERE id_categoria = NEW.categoria_id), ''
+        )), 'B') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(NEW.descricao, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- preenche os produtos existentes
+UPDATE produtos_produto SET nome = nome;
+"""
+
+TRIGGER_ANTERIOR_SQL = """
+CREATE OR REPLACE FUNCTION produtos_produto_busca_atualizar() RETURNS trigger AS $$
+BEGIN
+    NEW.busca :=
+        setweight(to_tsvector('portugues_sem_acento', coalesce(NEW.nome, '')), 'A') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(
+            (SELECT nome_categoria FROM produtos_categoria WHERE id_categoria = NEW.categoria_id), ''
+        )), 'B') ||
+        setweight(to_tsvector('portugues_sem_acento', coalesce(NEW.descricao, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0011_produto_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='busca_nome',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, TRIGGER_ANTERIOR_SQL),
+        migrations.AddIndex(
+            model_name='produto',
+            index=GinIndex(fields=['busca_nome'], name='produto_busca_nome_gin'),
+        ),
+    ]
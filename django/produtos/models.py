@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from users.models import User
 
 
@@ -20,10 +22,68 @@ class Produto(models.Model):
     imagem = models.ImageField(upload_to=caminho_imagem, null=True, blank=True)
     # o blank=True permite que o campo seja opcional no formulário
     categoria = models.ForeignKey('Categoria', on_delete=models.CASCADE, null=True, blank=True)
+    # urls das miniaturas geradas por produtos.imagens: {tamanho: {formato: url}}
+    miniaturas = models.JSONField(default=dict, blank=True, editable=False)
+    # vetor de busca textual (nome, categoria e descrição), mantido por trigger
+    # no banco (migration 0011) — também cobre bulk_create/update
+    busca = SearchVectorField(null=True, editable=False)
+    # só o nome, para a busca preferir quem casa pelo nome (migration 0012)
+    busca_nome = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # paginação por cursor do catálogo filtrado por categoria
+            models.Index(fields=['categoria', '-produto_id'], name='produto_categoria_cursor_idx'),
+            # paginação por cursor apenas dos produtos em estoque
+            models.Index(fields=['-produto_id'], condition=models.Q(estoque__gt=0), name='produto_em_estoque_idx'),
+            GinIndex(fields=['busca'], name='produto_busca_gin'),
+            GinIndex(fields=['busca_nome'], name='produto_busca_nome_gin'),
+        ]
+        constraints = [
+            # última barreira contra vender além do estoque
+            models.CheckConstraint(condition=models.Q(estoque__gte=0), name='produto_estoque_nao_negativo'),
+        ]
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # guarda a imagem lida do banco para detectar mudanças no save()
+        instance._imagem_carregada = instance.__dict__.get('imagem')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Repassa mudanças de preço para os totais dos carrinhos que têm o produto
+        e agenda a geração das miniaturas quando a imagem muda
+        """
+        from .carrinho import repassar_preco
+        from .imagens import agendar_derivados
+
+        update_fields = kwargs.get('update_fields')
+        altera_preco = not self._state.adding and (update_fields is None or 'preco' in update_fields)
+        with transaction.atomic():
+            preco_anterior = None
+            if altera_preco:
+                # trava o produto antes dos carrinhos (mesma ordem de produtos.carrinho)
+                # e compara com o preço gravado, não com o da instância (pode estar velha)
+                preco_anterior = (
+                    Produto.objects.select_for_update().filter(produto_id=self.produto_id)
+                    .values_list('preco', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            if preco_anterior is not None:
+                self.refresh_from_db(fields=['preco'])
+                if self.preco != preco_anterior:
+                    repassar_preco(self.produto_id, self.preco - preco_anterior)
+
+        imagem_atual = self.imagem.name if self.imagem else ''
+        if imagem_atual != (getattr(self, '_imagem_carregada', None) or ''):
+            agendar_derivados(self.produto_id)
+            self._imagem_carregada = imagem_atual
+
 
 class Categoria(models.Model):
     id_categoria = models.AutoField(primary_key=True)
@@ -35,6 +95,16 @@ class Categoria(models.Model):
 class CarrinhoDeCompras(models.Model):
 
     usuario = models.ForeignKey(User, on_delete= models.CASCADE)
+    # totais mantidos incrementalmente por produtos.carrinho
+    # (conferidos pelo comando reconciliar_carrinhos)
+    quantidade_itens = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # um carrinho por usuário (alvo do ON CONFLICT em produtos.carrinho)
+            models.UniqueConstraint(fields=['usuario'], name='carrinho_usuario_unico'),
+        ]
 
     def __str__(self):
         return f'Carrinho de {self.usuario.username}'
@@ -43,6 +113,56 @@ class ItemDoCarrinho(models.Model):
     carrinho = models.ForeignKey(CarrinhoDeCompras, on_delete=models.CASCADE)
     produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
     quantidade = models.IntegerField(default=1)
+    # estoque reservado até este momento; depois disso o comando
+    # expirar_reservas devolve a quantidade ao produto
+    # (itens anteriores à reserva de estoque ficam sem prazo)
+    reservado_ate = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # um item por produto no carrinho (alvo do ON CONFLICT em produtos.carrinho)
+            models.UniqueConstraint(fields=['carrinho', 'produto'], name='item_carrinho_produto_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['reservado_ate'], name='item_carrinho_reserva_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.quantidade} x {self.produto.nome} no carrinho de {self.carrinho.usuario.username}'
+
+
+class Pedido(models.Model):
+    STATUS_CHOICES = [
+        ('CONFIRMADO', 'Confirmado'),
+        ('CANCELADO', 'Cancelado'),
+    ]
+
+    usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name='pedidos')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='CONFIRMADO')
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['usuario', '-criado_em']),
+        ]
 
     def __str__(self):
-        return f'{self.quantidade} x {self.produto.nome} no carrinho de {self.carrinho.usuario.username}'
\ No newline at end of file
+        return f'Pedido #{self.pk} de {self.usuario.username}'
+
+
+class ItemPedido(models.Model):
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='itens')
+    # o produto pode ser excluído depois; nome e preço ficam registrados no item
+    produto = models.ForeignKey(Produto, on_delete=models.SET_NULL, null=True, blank=True)
+    nome_produto = models.CharField(max_length=100)
+    preco_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    quantidade = models.IntegerField()
+
+    def __str__(self):
+        return f'{self.quantidade} x {self.nome_produto} (pedido #{self.pedido_id})'
+
+    @property
+    def subtotal(self):
+        return self.preco_unitario * self.quantidade
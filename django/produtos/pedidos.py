@@ -0,0 +1,60 @@
+"""
+Serviço de checkout
+
+Transforma o carrinho em um Pedido. O estoque já foi reservado quando os
+itens entraram no carrinho (produtos.carrinho), então o checkout não
+trava nem altera as linhas de Produto: produtos muito procurados não
+viram gargalo na hora de finalizar a compra.
+"""
+
+from decimal import Decimal
+from django.db import transaction
+from .models import CarrinhoDeCompras, ItemDoCarrinho, Pedido, ItemPedido
+
+
+class CarrinhoVazio(Exception):
+    """O carrinho não tem itens (ou as reservas expiraram)"""
+
+
+def finalizar_compra(usuario):
+    """
+    Cria o pedido com os itens reservados no carrinho do usuário e esvazia
+    o carrinho, tudo em uma transação. Trava o carrinho e depois os itens
+    (ordem de produtos.carrinho); itens cuja reserva já foi liberada pelo
+    comando expirar_reservas não existem mais e ficam fora do pedido.
+    """
+    with transaction.atomic():
+        carrinho = CarrinhoDeCompras.objects.select_for_update().filter(usuario=usuario).first()
+        if carrinho is None:
+            raise CarrinhoVazio('Seu carrinho está vazio.')
+
+        itens = list(
+            ItemDoCarrinho.objects.select_for_update(of=('self',))
+            .filter(carrinho=carrinho)
+            .select_related('produto')
+            .order_by('produto_id')
+        )
+        if not itens:
+            raise CarrinhoVazio('Seu carrinho está vazio.')
+
+        pedido = Pedido.objects.create(
+            usuario=usuario,
+            total=sum((item.produto.preco * item.quantidade for item in itens), Decimal('0.00')),
+        )
+        ItemPedido.objects.bulk_create([
+            ItemPedido(
+                pedido=pedido,
+                produto=item.produto,
+                nome_produto=item.produto.nome,
+                preco_unitario=item.produto.preco,
+                quantidade=item.quantidade,
+            )
+            for item in itens
+        ])
+
+        ItemDoCarrinho.objects.filter(pk__in=[item.pk for item in itens]).delete()
+        carrinho.quantidade_itens = 0
+        carrinho.total = Decimal('0.00')
+        carrinho.save(update_fields=['quantidade_itens', 'total'])
+
+    return pedido
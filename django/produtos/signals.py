@@ -0,0 +1,36 @@
+"""
+Sinais do app produtos
+Mantêm o índice de categorias em cache (produtos.categorias) e os totais
+desnormalizados dos carrinhos em dia
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .carrinho import retirar_produto_dos_carrinhos
+from .categorias import invalidar_indice_categorias
+from .models import Categoria, Produto
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_categorias(sender, **kwargs):
+    # só depois do commit: antes disso outro request poderia remontar o
+    # índice com os dados antigos
+    transaction.on_commit(invalidar_indice_categorias)
+
+
+@receiver(pre_delete, sender=Produto)
+def retirar_dos_carrinhos(sender, instance, **kwargs):
+    # roda para toda exclusão de produto — instância, queryset, admin em lote
+    # e cascata da categoria —, antes de os itens do carrinho serem apagados
+    # em cascata, dentro da transação da exclusão
+    preco = (
+        # trava o produto antes dos carrinhos (mesma ordem de produtos.carrinho)
+        Produto.objects.select_for_update().filter(produto_id=instance.produto_id)
+        .values_list('preco', flat=True).first()
+    )
+    if preco is not None:
+        retirar_produto_dos_carrinhos(instance.produto_id, preco)
@@ -1,3 +1,618 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from users.models import User
+from .carrinho import adicionar_item, liberar_reservas_expiradas, EstoqueInsuficiente
+from .carrinho_anonimo import COOKIE as COOKIE_CARRINHO_ANONIMO
+from .busca import MAX_CANDIDATOS, buscar_produtos
+from .categorias import indice_categorias, invalidar_indice_categorias
+from .imagens import gerar_derivados
+from .models import Categoria, CarrinhoDeCompras, Produto, ItemDoCarrinho, ItemPedido
+from .pedidos import finalizar_compra, CarrinhoVazio
+
+
+class CheckoutConcorrenteTest(TransactionTestCase):
+    """
+    Várias threads disputando o mesmo produto (cada uma com sua conexão)
+    para provar que o estoque nunca é vendido além do disponível
+    """
+
+    THREADS = 12
+    CICLOS = 10
+    ESTOQUE = 60
+
+    def setUp(self):
+        self.produto = Produto.objects.create(nome='Ração', descricao='Ração 10kg', preco='50.00', estoque=self.ESTOQUE)
+        self.usuarios = [
+            User.objects.create(username=f'cliente{i}', email=f'cliente{i}@teste.com')
+            for i in range(self.THREADS)
+        ]
+
+    def _rodar(self, alvo, quantidade):
+        erros = []
+
+        def executar(indice):
+            try:
+                alvo(indice)
+            except Exception as erro:  # deadlocks e violações de constraint aparecem aqui
+                erros.append(erro)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=executar, args=(i,)) for i in range(quantidade)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return erros
+
+    def _vendidos(self):
+        return ItemPedido.objects.filter(produto=self.produto).aggregate(total=Sum('quantidade'))['total'] or 0
+
+    def _reservados(self):
+        return ItemDoCarrinho.objects.filter(produto=self.produto).aggregate(total=Sum('quantidade'))['total'] or 0
+
+    def test_sem_venda_alem_do_estoque(self):
+        def comprar(indice):
+            usuario = self.usuarios[indice]
+            for _ in range(self.CICLOS):
+                try:
+                    adicionar_item(usuario, self.produto.produto_id, 1)
+                except EstoqueInsuficiente:
+                    continue
+                finalizar_compra(usuario)
+
+        erros = self._rodar(comprar, self.THREADS)
+
+        self.assertEqual(erros, [])
+        self.produto.refresh_from_db()
+        # a procura (THREADS x CICLOS) é maior que o estoque: tudo é vendido, nada além
+        self.assertEqual(self._vendidos(), self.ESTOQUE)
+        self.assertEqual(self.produto.estoque, 0)
+        self.assertEqual(self._reservados(), 0)
+
+    def test_adicoes_simultaneas_no_mesmo_carrinho_novo(self):
+        # todas as threads criam o carrinho e o item na primeira adição ao mesmo tempo
+        usuario = self.usuarios[0]
+        largada = threading.Barrier(self.THREADS)
+
+        def adicionar(indice):
+            largada.wait()
+            adicionar_item(usuario, self.produto.produto_id, 2)
+
+        erros = self._rodar(adicionar, self.THREADS)
+
+        self.assertEqual(erros, [])
+        carrinho = CarrinhoDeCompras.objects.get(usuario=usuario)
+        item = ItemDoCarrinho.objects.get(carrinho=carrinho, produto=self.produto)
+        self.assertEqual(item.quantidade, 2 * self.THREADS)
+        self.assertEqual(carrinho.quantidade_itens, 2 * self.THREADS)
+        self.assertEqual(carrinho.total, Decimal('50.00') * 2 * self.THREADS)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, self.ESTOQUE - 2 * self.THREADS)
+
+    @override_settings(RESERVA_CARRINHO_MINUTOS=0)
+    def test_liberacao_de_reservas_concorrente(self):
+        # reservas vencem na hora: liberação, adições e checkouts disputam as mesmas linhas
+        def trabalhar(indice):
+            if indice % 3 == 0:
+                for _ in range(self.CICLOS):
+                    liberar_reservas_expiradas(lote=50)
+                return
+            usuario = self.usuarios[indice]
+            for _ in range(self.CICLOS):
+                try:
+                    adicionar_item(usuario, self.produto.produto_id, 2)
+                except EstoqueInsuficiente:
+                    pass
+                try:
+                    finalizar_compra(usuario)
+                except CarrinhoVazio:
+                    pass
+
+        erros = self._rodar(trabalhar, self.THREADS)
+
+        self.assertEqual(erros, [])
+        self.produto.refresh_from_db()
+        self.assertGreaterEqual(self.produto.estoque, 0)
+        # nenhuma unidade some nem aparece: estoque + vendido + reservado = inicial
+        self.assertEqual(self.produto.estoque + self._vendidos() + self._reservados(), self.ESTOQUE)
+
+        liberar_reservas_expiradas()
+        self.produto.refresh_from_db()
+        self.assertEqual(self._reservados(), 0)
+        self.assertEqual(self.produto.estoque + self._vendidos(), self.ESTOQUE)
+
+
+class AdicionarItemTest(TestCase):
+    """Upsert do carrinho e do item em um único comando"""
+
+    def setUp(self):
+        self.produto = Produto.objects.create(nome='Ração', descricao='10kg', preco='10.00', estoque=5)
+        self.usuario = User.objects.create(username='ana', email='ana@teste.com')
+
+    def test_primeira_adicao_cria_carrinho_e_item(self):
+        self.assertEqual(adicionar_item(self.usuario, self.produto.produto_id, 2), 2)
+
+        carrinho = CarrinhoDeCompras.objects.get(usuario=self.usuario)
+        self.assertEqual((carrinho.quantidade_itens, carrinho.total), (2, Decimal('20.00')))
+        item = ItemDoCarrinho.objects.get(carrinho=carrinho)
+        self.assertEqual(item.quantidade, 2)
+        self.assertIsNotNone(item.reservado_ate)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 3)
+
+    def test_nova_adicao_soma_ao_item(self):
+        adicionar_item(self.usuario, self.produto.produto_id, 2)
+        self.assertEqual(adicionar_item(self.usuario, self.produto.produto_id, 3), 5)
+
+        carrinho = CarrinhoDeCompras.objects.get(usuario=self.usuario)
+        self.assertEqual(ItemDoCarrinho.objects.filter(carrinho=carrinho).count(), 1)
+        self.assertEqual((carrinho.quantidade_itens, carrinho.total), (5, Decimal('50.00')))
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 0)
+
+    def test_sem_estoque_nao_altera_nada(self):
+        with self.assertRaises(EstoqueInsuficiente):
+            adicionar_item(self.usuario, self.produto.produto_id, 6)
+
+        self.assertFalse(CarrinhoDeCompras.objects.filter(usuario=self.usuario).exists())
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 5)
+
+    def test_produto_inexistente(self):
+        with self.assertRaises(Produto.DoesNotExist):
+            adicionar_item(self.usuario, self.produto.produto_id + 1000)
+        self.assertFalse(CarrinhoDeCompras.objects.filter(usuario=self.usuario).exists())
+
+
+class CarrinhoApiTest(TestCase):
+    """POST da API do carrinho: várias alterações aplicadas juntas ou nenhuma"""
+
+    def setUp(self):
+        self.racao = Produto.objects.create(nome='Ração', descricao='', preco='10.00', estoque=10)
+        self.coleira = Produto.objects.create(nome='Coleira', descricao='', preco='5.00', estoque=10)
+        self.petisco = Produto.objects.create(nome='Petisco', descricao='', preco='2.00', estoque=3)
+        self.usuario = User.objects.create(username='ana', email='ana@teste.com')
+        self.client.force_login(self.usuario)
+
+    def _enviar(self, corpo):
+        if not isinstance(corpo, str):
+            corpo = json.dumps(corpo)
+        return self.client.post(reverse('carrinho_api'), corpo, content_type='application/json')
+
+    def _estado(self):
+        itens = dict(ItemDoCarrinho.objects.filter(carrinho__usuario=self.usuario).values_list('produto_id', 'quantidade'))
+        estoques = dict(Produto.objects.values_list('produto_id', 'estoque'))
+        return itens, estoques
+
+    def test_adiciona_altera_e_remove_no_mesmo_lote(self):
+        adicionar_item(self.usuario, self.racao.pk, 2)
+        adicionar_item(self.usuario, self.coleira.pk, 1)
+
+        resposta = self._enviar({'itens': [
+            {'produto_id': self.racao.pk, 'quantidade': 4},
+            {'produto_id': self.coleira.pk, 'quantidade': 0},
+            {'produto_id': self.petisco.pk, 'quantidade': 3},
+        ]})
+
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        self.assertEqual(
+            [(item['produto_id'], item['quantidade']) for item in dados['itens']],
+            [(self.racao.pk, 4), (self.petisco.pk, 3)],
+        )
+        self.assertEqual((dados['quantidade_itens'], dados['total']), (7, '46.00'))
+        self.assertEqual(self._estado(), (
+            {self.racao.pk: 4, self.petisco.pk: 3},
+            {self.racao.pk: 6, self.coleira.pk: 10, self.petisco.pk: 0},
+        ))
+
+    def test_sem_estoque_para_um_item_nada_muda(self):
+        adicionar_item(self.usuario, self.racao.pk, 2)
+        antes = self._estado()
+
+        resposta = self._enviar({'itens': [
+            {'produto_id': self.racao.pk, 'quantidade': 5},
+            {'produto_id': self.petisco.pk, 'quantidade': 4},
+        ]})
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(self._estado(), antes)
+        carrinho = CarrinhoDeCompras.objects.get(usuario=self.usuario)
+        self.assertEqual((carrinho.quantidade_itens, carrinho.total), (2, Decimal('20.00')))
+
+    def test_produto_inexistente(self):
+        antes = self._estado()
+        resposta = self._enviar({'itens': [
+            {'produto_id': self.racao.pk, 'quantidade': 1},
+            {'produto_id': self.petisco.pk + 1000, 'quantidade': 1},
+        ]})
+        self.assertEqual(resposta.status_code, 404)
+        self.assertEqual(self._estado(), antes)
+        self.assertFalse(CarrinhoDeCompras.objects.exists())
+
+    def test_corpo_invalido(self):
+        for corpo in [
+            'não é json',
+            '[]',
+            {'produtos': []},
+            {'itens': {'produto_id': 1}},
+            {'itens': [1]},
+            {'itens': [{'produto_id': self.racao.pk}]},
+            {'itens': [{'produto_id': 'ração', 'quantidade': 1}]},
+            {'itens': [{'produto_id': self.racao.pk, 'quantidade': -1}]},
+        ]:
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self._enviar(corpo).status_code, 400)
+        self.assertFalse(CarrinhoDeCompras.objects.exists())
+
+    def test_lista_vazia_nao_cria_carrinho(self):
+        resposta = self._enviar({'itens': []})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json(), {'itens': [], 'quantidade_itens': 0, 'total': '0.00'})
+        self.assertFalse(CarrinhoDeCompras.objects.exists())
+
+
+class TotaisCarrinhoTest(TestCase):
+    """Totais desnormalizados dos carrinhos acompanham preço e exclusão de produtos"""
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nome_categoria='Rações')
+        self.racao = Produto.objects.create(nome='Ração', descricao='10kg', preco='10.00', estoque=100, categoria=self.categoria)
+        self.coleira = Produto.objects.create(nome='Coleira', descricao='Couro', preco='5.00', estoque=100)
+        self.ana = User.objects.create(username='ana', email='ana@teste.com')
+        self.bia = User.objects.create(username='bia', email='bia@teste.com')
+        adicionar_item(self.ana, self.racao.produto_id, 2)
+        adicionar_item(self.ana, self.coleira.produto_id, 1)
+        adicionar_item(self.bia, self.racao.produto_id, 3)
+
+    def _totais(self, usuario):
+        carrinho = CarrinhoDeCompras.objects.get(usuario=usuario)
+        return carrinho.quantidade_itens, carrinho.total
+
+    def _reconciliar(self, *args):
+        saida = StringIO()
+        call_command('reconciliar_carrinhos', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_preco_repassado_a_partir_do_preco_gravado(self):
+        # duas edições a partir de instâncias lidas antes de qualquer alteração
+        primeira, segunda = Produto.objects.get(pk=self.racao.pk), Produto.objects.get(pk=self.racao.pk)
+        primeira.preco = Decimal('12.00')
+        primeira.save()
+        segunda.preco = Decimal('15.00')
+        segunda.save()
+
+        self.assertEqual(self._totais(self.ana), (3, Decimal('35.00')))
+        self.assertEqual(self._totais(self.bia), (3, Decimal('45.00')))
+        self.assertIn('consistentes', self._reconciliar())
+
+    def test_exclusao_por_cascata_e_em_lote(self):
+        self.categoria.delete()
+        self.assertEqual(self._totais(self.ana), (1, Decimal('5.00')))
+        self.assertEqual(self._totais(self.bia), (0, Decimal('0.00')))
+
+        Produto.objects.filter(pk=self.coleira.pk).delete()
+        self.assertEqual(self._totais(self.ana), (0, Decimal('0.00')))
+        self.assertIn('consistentes', self._reconciliar())
+
+    def test_reconciliar_carrinhos(self):
+        CarrinhoDeCompras.objects.filter(usuario=self.ana).update(quantidade_itens=7, total=Decimal('1.00'))
+
+        saida = self._reconciliar()
+        self.assertIn('1 carrinho(s) divergente(s)', saida)
+        self.assertEqual(self._totais(self.ana), (7, Decimal('1.00')))
+
+        saida = self._reconciliar('--corrigir')
+        self.assertIn('1 carrinho(s) corrigido(s)', saida)
+        self.assertEqual(self._totais(self.ana), (3, Decimal('25.00')))
+        self.assertEqual(self._totais(self.bia), (3, Decimal('30.00')))
+        self.assertIn('consistentes', self._reconciliar())
+
+
+class CatalogoPaginacaoTest(TestCase):
+    """Paginação por cursor do catálogo: sem repetir nem pular produtos, com qualquer filtro"""
+
+    def setUp(self):
+        self.racoes = Categoria.objects.create(nome_categoria='Rações')
+        self.brinquedos = Categoria.objects.create(nome_categoria='Brinquedos')
+        # nomes e preços repetidos: só o produto_id desempata a ordem
+        Produto.objects.bulk_create([
+            Produto(
+                nome='Ração' if i % 2 else 'Bolinha', descricao='', preco='10.00' if i % 3 else '25.00',
+                estoque=i % 4, categoria=self.racoes if i % 2 else self.brinquedos,
+            )
+            for i in range(60)
+        ])
+
+    def _pagina(self, query=''):
+        resposta = self.client.get(f'{reverse("produto_list")}?{query}')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.context
+
+    def _percorrer(self, query=''):
+        ids, paginas = [], 0
+        contexto = self._pagina(query)
+        while True:
+            paginas += 1
+            ids += [produto.pk for produto in contexto['produtos']]
+            if not contexto['proxima_query']:
+                return ids, paginas
+            proxima = contexto['proxima_query']
+            self.assertIn('cursor=', proxima)
+            contexto = self._pagina(proxima)
+            self.assertFalse(contexto['eh_primeira_pagina'])
+            self.assertNotIn('cursor', contexto['primeira_query'])
+
+    def test_percorre_todas_as_paginas(self):
+        ids, paginas = self._percorrer()
+        self.assertEqual(ids, list(Produto.objects.order_by('-produto_id').values_list('pk', flat=True)))
+        self.assertEqual(paginas, 3)
+
+    def test_filtros_combinados(self):
+        query = f'categoria={self.racoes.pk}&preco_min=5&preco_max=10&em_estoque=1&q=racao'
+        esperado = list(
+            Produto.objects.filter(categoria=self.racoes, preco__gte=5, preco__lte=10, estoque__gt=0)
+            .order_by('-produto_id').values_list('pk', flat=True)
+        )
+        self.assertTrue(esperado)
+
+        ids, _ = self._percorrer(query)
+        self.assertEqual(ids, esperado)
+
+        # a próxima página mantém os filtros
+        primeira = self._pagina(f'categoria={self.racoes.pk}&preco_max=25')
+        self.assertIn(f'categoria={self.racoes.pk}', primeira['proxima_query'])
+        self.assertIn('preco_max=25', primeira['proxima_query'])
+
+    def test_preco_em_centavos(self):
+        produtos = self._pagina('preco_min=1e-999999&preco_max=10.004')['produtos']
+        self.assertEqual({produto.preco for produto in produtos}, {Decimal('10.00')})
+
+    def test_cursor_adulterado_volta_para_o_inicio(self):
+        primeira = [produto.pk for produto in self._pagina()['produtos']]
+        for cursor in ['abc', '-5', '0', '²', '1 OR 1=1', '']:
+            with self.subTest(cursor=cursor):
+                contexto = self._pagina(f'cursor={cursor}')
+                self.assertTrue(contexto['eh_primeira_pagina'])
+                self.assertEqual([produto.pk for produto in contexto['produtos']], primeira)
+
+        # cursor além do maior id: tudo fica antes dele
+        contexto = self._pagina('cursor=' + '9' * 30)
+        self.assertEqual([produto.pk for produto in contexto['produtos']], primeira)
+
+    def test_filtros_invalidos_sao_ignorados(self):
+        primeira = [produto.pk for produto in self._pagina()['produtos']]
+        for query in ['preco_min=NaN', 'preco_max=Infinity', 'preco_min=-Infinity', 'preco_max=sNaN',
+                      'preco_min=1e999999', 'preco_max=-1e999999', 'preco_min=abc', 'categoria=²', 'categoria=-1']:
+            with self.subTest(query=query):
+                self.assertEqual([produto.pk for produto in self._pagina(query)['produtos']], primeira)
+
+
+class BuscaProdutosTest(TestCase):
+    """Busca textual: prefixos, acentos, peso do nome e vetor mantido pelo banco"""
+
+    def setUp(self):
+        self.racoes = Categoria.objects.create(nome_categoria='Rações')
+        self.racao = Produto.objects.create(
+            nome='Ração Premium para Cães', descricao='Sabor frango', preco='120.00', estoque=5, categoria=self.racoes
+        )
+        self.petisco = Produto.objects.create(
+            nome='Petisco de Frango', descricao='Ótimo acompanhamento da ração', preco='15.00', estoque=5, categoria=self.racoes
+        )
+
+    def test_prefixo_sem_acento(self):
+        self.assertEqual([p.pk for p in buscar_produtos('racao prem')], [self.racao.pk])
+        self.assertEqual([p.pk for p in buscar_produtos('CÃES')], [self.racao.pk])
+
+    def test_nome_pesa_mais_que_descricao(self):
+        self.assertEqual([p.pk for p in buscar_produtos('frango')], [self.petisco.pk, self.racao.pk])
+
+    def test_vetor_acompanha_categoria_e_bulk(self):
+        Produto.objects.bulk_create([Produto(nome='Coleira', descricao='Couro', preco='30.00', estoque=1, categoria=self.racoes)])
+        self.assertEqual(len(buscar_produtos('coleira')), 1)
+
+        self.racoes.nome_categoria = 'Alimentos'
+        self.racoes.save()
+        self.assertEqual(len(buscar_produtos('alimento')), 3)
+
+    def test_nome_vence_alem_dos_candidatos(self):
+        # mais de MAX_CANDIDATOS casam só pela descrição e vêm antes na tabela;
+        # o que casa pelo nome, criado por último, ainda precisa aparecer
+        outros = Categoria.objects.create(nome_categoria='Acessórios')
+        Produto.objects.bulk_create([
+            Produto(nome=f'Coleira {n}', descricao='Combina com ração', preco='30.00', estoque=1, categoria=outros)
+            for n in range(MAX_CANDIDATOS + 100)
+        ])
+        umida = Produto.objects.create(nome='Ração Úmida', preco='9.00', estoque=1, categoria=outros)
+
+        self.assertEqual({p.pk for p in buscar_produtos('ra', limite=2)}, {self.racao.pk, umida.pk})
+
+    def test_endpoint_ignora_operadores(self):
+        resposta = self.client.get(reverse('busca_produtos'), {'q': "ra!:*|&( ' "})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['resultados'][0]['produto_id'], self.racao.pk)
+        self.assertEqual(self.client.get(reverse('busca_produtos'), {'q': '!!'}).json(), {'resultados': []})
+
+
+class MiniaturasTest(TestCase):
+    """gerar_derivados: tamanhos e formatos, e as miniaturas antigas apagadas"""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.produto = Produto.objects.create(nome='Ração', descricao='10kg', preco='10.00', estoque=5)
+
+    def _trocar_imagem(self, cor):
+        buffer = BytesIO()
+        Image.new('RGBA', (800, 800), cor).save(buffer, format='PNG')
+        self.produto.imagem.save('foto.png', ContentFile(buffer.getvalue()))
+
+    def _derivados(self):
+        return sorted(default_storage.listdir(f'imagens/{self.produto.produto_id}/derivados')[1])
+
+    def test_gera_tamanhos_e_apaga_os_antigos(self):
+        self._trocar_imagem((255, 0, 0, 128))
+        miniaturas = gerar_derivados(self.produto)
+        self.assertEqual(set(miniaturas), {'card', 'mini'})
+        self.assertEqual(set(miniaturas['card']), {'webp', 'jpeg'})
+        primeiros = self._derivados()
+        self.assertEqual(len(primeiros), 4)
+        with default_storage.open(f'imagens/{self.produto.produto_id}/derivados/{miniaturas["mini"]["jpeg"].rsplit("/", 1)[-1]}') as arquivo:
+            self.assertEqual(Image.open(arquivo).size, (120, 90))
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.miniaturas, miniaturas)
+
+        self._trocar_imagem((0, 0, 255, 255))
+        gerar_derivados(self.produto)
+        segundos = self._derivados()
+        self.assertEqual(len(segundos), 4)
+        self.assertFalse(set(primeiros) & set(segundos))
+
+        self.produto.imagem = None
+        self.produto.save()
+        self.assertEqual(gerar_derivados(self.produto), {})
+        self.assertEqual(self._derivados(), [])
+
+
+class ImportExportProdutosTest(TestCase):
+    """import_produtos / export_produtos: ida e volta, upsert e preço repassado aos carrinhos"""
+
+    def _arquivo(self, sufixo, conteudo=''):
+        descritor, caminho = tempfile.mkstemp(suffix=sufixo)
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(conteudo)
+        self.addCleanup(os.remove, caminho)
+        return caminho
+
+    def test_ida_e_volta(self):
+        csv_entrada = self._arquivo('.csv', (
+            'nome,descricao,preco,estoque,categoria\n'
+            'Ração,Ração 10kg,50.00,10,Rações\n'
+            'Coleira,Couro,30,5, rações \n'
+            ',sem nome,1,1,\n'
+        ))
+        call_command('import_produtos', csv_entrada, stdout=StringIO())
+        self.assertEqual(Produto.objects.count(), 2)
+        self.assertEqual(Categoria.objects.count(), 1)
+
+        racao = Produto.objects.get(nome='Ração')
+        usuario = User.objects.create(username='cliente', email='cliente@teste.com')
+        adicionar_item(usuario, racao.produto_id, 2)
+
+        jsonl = self._arquivo('.jsonl')
+        call_command('export_produtos', jsonl, stdout=StringIO())
+        with open(jsonl, encoding='utf-8') as arquivo:
+            linhas = [json.loads(linha) for linha in arquivo]
+        self.assertEqual([linha['nome'] for linha in linhas], ['Ração', 'Coleira'])
+
+        linhas[0]['preco'] = '45.00'
+        with open(jsonl, 'w', encoding='utf-8') as arquivo:
+            arquivo.writelines(json.dumps(linha) + '\n' for linha in linhas)
+        call_command('import_produtos', jsonl, stdout=StringIO())
+
+        self.assertEqual(Produto.objects.count(), 2)
+        racao.refresh_from_db()
+        self.assertEqual(str(racao.preco), '45.00')
+        self.assertEqual(str(CarrinhoDeCompras.objects.get(usuario=usuario).total), '90.00')
+        # a sequence continua depois dos ids importados
+        self.assertGreater(Produto.objects.create(nome='Novo', descricao='', preco=1, estoque=1).produto_id, racao.produto_id)
+
+
+class IndiceCategoriasTest(TestCase):
+    """Índice de categorias: lido do cache e apagado pelos sinais após o commit"""
+
+    def setUp(self):
+        invalidar_indice_categorias()
+        self.addCleanup(invalidar_indice_categorias)
+        self.racoes = Categoria.objects.create(nome_categoria='Rações')
+        Produto.objects.create(nome='Ração', descricao='', preco='50.00', estoque=3, categoria=self.racoes)
+        Produto.objects.create(nome='Ração esgotada', descricao='', preco='50.00', estoque=0, categoria=self.racoes)
+
+    def test_cache_e_invalidacao(self):
+        indice = indice_categorias()
+        self.assertEqual(indice['categorias'], [{'id_categoria': self.racoes.pk, 'nome_categoria': 'Rações', 'em_estoque': 1}])
+        self.assertEqual(indice['total_em_estoque'], 1)
+
+        with self.assertNumQueries(0):
+            indice_categorias()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Produto.objects.create(nome='Petisco', descricao='', preco='10.00', estoque=1)
+        self.assertEqual(indice_categorias()['total_em_estoque'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.racoes.delete()
+        self.assertEqual(indice_categorias(), {'categorias': [], 'total_em_estoque': 1})
+
+
+class CarrinhoAnonimoTest(TestCase):
+    """Carrinho de visitante no cache, sem escrita no banco, juntado ao carrinho no login"""
+
+    def setUp(self):
+        self.racao = Produto.objects.create(nome='Ração', descricao='', preco='50.00', estoque=5)
+        self.coleira = Produto.objects.create(nome='Coleira', descricao='', preco='30.00', estoque=1)
+        self.usuario = User.objects.create(username='cliente', email='cliente@teste.com')
+        self.usuario.set_password('senha-forte-123')
+        self.usuario.save()
+
+    def _adicionar(self, produto, quantidade):
+        return self.client.post(reverse('adicionar_ao_carrinho', args=[produto.pk]), {'quantidade': quantidade})
+
+    def test_visitante_nao_grava_no_banco(self):
+        # só a leitura do estoque do produto
+        with self.assertNumQueries(1):
+            self._adicionar(self.racao, 2)
+        self.assertIn(COOKIE_CARRINHO_ANONIMO, self.client.cookies)
+        self._adicionar(self.coleira, 1)
+
+        resposta = self.client.get(reverse('ver_carrinho'))
+        self.assertEqual(resposta.context['quantidade_itens'], 3)
+        self.assertEqual(resposta.context['produto_total'], '130.00')
+        self.assertFalse(CarrinhoDeCompras.objects.exists())
+        self.racao.refresh_from_db()
+        self.assertEqual(self.racao.estoque, 5)
+
+    def test_ver_carrinho_nao_cria_carrinho(self):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('ver_carrinho'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(CarrinhoDeCompras.objects.exists())
+
+    def test_login_junta_carrinho(self):
+        adicionar_item(self.usuario, self.racao.pk, 1)
+        self._adicionar(self.racao, 2)
+        self._adicionar(self.coleira, 1)
+        # a coleira esgota antes do login: fica de fora
+        Produto.objects.filter(pk=self.coleira.pk).update(estoque=0)
+
+        self.client.post(reverse('local_login'), {'login': 'cliente', 'password': 'senha-forte-123'})
+
+        carrinho = CarrinhoDeCompras.objects.get(usuario=self.usuario)
+        self.assertEqual(carrinho.quantidade_itens, 3)
+        self.assertEqual(str(carrinho.total), '150.00')
+        self.assertEqual(list(carrinho.itemdocarrinho_set.values_list('produto_id', 'quantidade')), [(self.racao.pk, 3)])
+        self.racao.refresh_from_db()
+        self.assertEqual(self.racao.estoque, 2)
+
+        # o carrinho anônimo foi descartado: outro login não soma de novo
+        self.client.logout()
+        self.client.post(reverse('local_login'), {'login': 'cliente', 'password': 'senha-forte-123'})
+        carrinho.refresh_from_db()
+        self.assertEqual(carrinho.quantidade_itens, 3)
@@ -3,9 +3,13 @@ from . import views
 
 urlpatterns = [
     path("", views.produto_list, name="produto_list"),
+    path("busca/", views.busca_produtos, name="busca_produtos"),
     path("add/", views.add_produto, name="add_produto"),
     path("update/<int:produto_id>/", views.update_produto, name="update_produto"),
     path("delete/<int:produto_id>/", views.delete_produto, name="delete_produto"),
     path("adicionar_carrinho/<int:produto_id>/", views.adicionar_ao_carrinho, name = "adicionar_ao_carrinho"),
     path("carrinho/", views.ver_carrinho, name = "ver_carrinho"),
+    path("carrinho/api/", views.carrinho_api, name = "carrinho_api"),
+    path("carrinho/finalizar/", views.finalizar_pedido, name = "finalizar_pedido"),
+    path("pedidos/<int:pedido_id>/", views.pedido_detail, name = "pedido_detail"),
 ]
\ No newline at end of file
@@ -1,20 +1,116 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from decimal import Decimal
-from .models import Produto, Categoria, CarrinhoDeCompras, ItemDoCarrinho
+from decimal import Decimal, InvalidOperation
+from .models import Produto, Categoria, CarrinhoDeCompras, ItemDoCarrinho, Pedido
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
+from django.conf import settings
+import json
+from .carrinho import adicionar_item, sincronizar_itens, resumo_carrinho, EstoqueInsuficiente
+from .pedidos import finalizar_compra, CarrinhoVazio
+from .busca import buscar_produtos, montar_consulta
+from .categorias import indice_categorias
+from .carrinho_anonimo import adicionar_item_anonimo, gravar_cookie, itens_anonimos
 
 # Create your views here.
 
+PRODUTOS_POR_PAGINA = 24
+
+
+def _decimal_ou_none(valor):
+    # Converte o parâmetro da query string, ignorando valores inválidos
+    if not valor:
+        return None
+    try:
+        valor = Decimal(valor)
+    except InvalidOperation:
+        return None
+    # NaN e Infinity são Decimals válidos, mas não servem de filtro de preço
+    if not valor.is_finite():
+        return None
+    # em centavos, como o preço; expoentes absurdos (1e999999) não cabem no numeric do banco
+    try:
+        return valor.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+
+def _inteiro_ou_none(valor):
+    # Id positivo da query string (categoria, cursor); valores adulterados são ignorados
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor > 0 else None
+
+
+def _filtrar_catalogo(params):
+    # Aplica os filtros do catálogo (busca, categoria, faixa de preço e estoque)
+    produtos = Produto.objects.select_related('categoria')
+
+    consulta = montar_consulta(params.get('q', ''))
+    if consulta is not None:
+        produtos = produtos.filter(busca=consulta)
+
+    categoria = _inteiro_ou_none(params.get('categoria'))
+    if categoria is not None:
+        produtos = produtos.filter(categoria_id=categoria)
+
+    preco_min = _decimal_ou_none(params.get('preco_min'))
+    if preco_min is not None:
+        produtos = produtos.filter(preco__gte=preco_min)
+
+    preco_max = _decimal_ou_none(params.get('preco_max'))
+    if preco_max is not None:
+        produtos = produtos.filter(preco__lte=preco_max)
+
+    if params.get('em_estoque'):
+        produtos = produtos.filter(estoque__gt=0)
+
+    return produtos
+
+
 def produto_list(request):
+    produtos = _filtrar_catalogo(request.GET)
 
-    produtos = Produto.objects.all()
-    return render(request, 'produto_list.html', {'produtos': produtos})
+    # Paginação por cursor (keyset): em vez de OFFSET, busca os produtos com
+    # produto_id menor que o último da página anterior. Assim as páginas
+    # profundas custam o mesmo que a primeira, usando o índice de produto_id.
+    cursor = _inteiro_ou_none(request.GET.get('cursor'))
+    if cursor is not None:
+        produtos = produtos.filter(produto_id__lt=cursor)
+
+    # Busca um item a mais só para saber se existe próxima página
+    pagina = list(produtos.order_by('-produto_id')[:PRODUTOS_POR_PAGINA + 1])
+    tem_proxima = len(pagina) > PRODUTOS_POR_PAGINA
+    pagina = pagina[:PRODUTOS_POR_PAGINA]
+
+    proxima_query = None
+    if tem_proxima:
+        params = request.GET.copy()
+        params['cursor'] = pagina[-1].produto_id
+        proxima_query = params.urlencode()
+
+    filtros = request.GET.copy()
+    filtros.pop('cursor', None)
+
+    return render(request, 'produto_list.html', {
+        'produtos': pagina,
+        'categorias': indice_categorias()['categorias'],
+        'filtros': request.GET,
+        'proxima_query': proxima_query,
+        'primeira_query': filtros.urlencode(),
+        'eh_primeira_pagina': cursor is None,
+    })
 
 
 def add_produto(request):
 # Olhar como add imagens depois
     
-    categorias = Categoria.objects.all()
+    categorias = indice_categorias()['categorias']
     produtos = Produto.objects.all()
 
     if request.method == 'POST':
@@ -61,7 +157,31 @@ def delete_produto(request, produto_id):
         return redirect('add_produto')
 
 
-@login_required
+def busca_produtos(request):
+    """
+    Busca para o autocomplete: GET ?q=texto devolve os produtos mais
+    relevantes em JSON. Cada palavra é tratada como prefixo.
+    """
+    try:
+        limite = min(max(int(request.GET.get('limite', 10)), 1), 50)
+    except ValueError:
+        limite = 10
+
+    produtos = buscar_produtos(request.GET.get('q', ''), limite=limite)
+    return JsonResponse({
+        'resultados': [
+            {
+                'produto_id': produto.produto_id,
+                'nome': produto.nome,
+                'preco': f"{produto.preco:.2f}",
+                'categoria': produto.categoria.nome_categoria if produto.categoria else None,
+                'miniatura': produto.miniaturas.get('mini', {}).get('webp'),
+            }
+            for produto in produtos
+        ]
+    })
+
+
 def adicionar_ao_carrinho(request, produto_id):
 
     if request.method == 'POST':
@@ -71,54 +191,133 @@ def adicionar_ao_carrinho(request, produto_id):
         except (TypeError, ValueError):
             quantidade = 1
 
-        # garante que o produto existe
-        produto = get_object_or_404(Produto, produto_id=produto_id)
+        # usuário logado: reserva o estoque e faz o upsert do item em um único
+        # comando (o carrinho é criado aqui, na primeira adição);
+        # visitante: o item vai para o carrinho anônimo no cache
+        try:
+            if request.user.is_authenticated:
+                adicionar_item(request.user, produto_id, quantidade)
+            else:
+                adicionar_item_anonimo(request, produto_id, quantidade)
+        except Produto.DoesNotExist:
+            raise Http404('Produto não encontrado.')
+        except (EstoqueInsuficiente, ValueError) as erro:
+            messages.error(request, str(erro))
+
+        return gravar_cookie(request, redirect('produto_list'))
 
-        # Verifica se o carrinho existe para o usuário autenticado, se não, cria um novo
-        carrinho, criado_carrinho = CarrinhoDeCompras.objects.get_or_create(usuario=request.user)
+    return redirect('produto_list')
 
-        # verifica se o item já está no carrinho, se não, cria um novo com a quantidade
-        item, criado_item = ItemDoCarrinho.objects.get_or_create(
-            carrinho=carrinho,
-            produto=produto,
-            defaults={'quantidade': quantidade}
-        )
 
-        if not criado_item:
-            # atualiza a quantidade existente
-            item.quantidade = (item.quantidade or 0) + quantidade
-            item.save()
+def _ver_carrinho_anonimo(request):
+    # carrinho do visitante: itens do cache, produtos lidos do banco
+    itens = itens_anonimos(request)
+    produtos_por_id = Produto.objects.select_related('categoria').in_bulk(list(itens))
 
-        return redirect('produto_list')
+    produtos = []
+    total = Decimal('0.00')
+    for produto_id, quantidade in itens.items():
+        produto = produtos_por_id.get(produto_id)
+        if produto is None:  # produto excluído depois de adicionado
+            continue
+        subtotal = produto.preco * quantidade
+        total += subtotal
+        produtos.append({'produto': produto, 'quantidade': quantidade, 'subtotal': f"{subtotal:.2f}"})
+
+    return render(request, 'carrinho_de_compras.html', {
+        'produtos': produtos,
+        'produto_total': f"{total:.2f}",
+        'quantidade_itens': sum(item['quantidade'] for item in produtos),
+    })
 
-    return redirect('produto_list')
 
-@login_required
 def ver_carrinho(request):
-    # Obtém ou cria o carrinho do usuário autenticado
-    carrinho, carrinho_criado = CarrinhoDeCompras.objects.get_or_create(usuario=request.user)
+    if not request.user.is_authenticated:
+        return _ver_carrinho_anonimo(request)
+
+    # Só lê: o carrinho é criado na primeira adição, não ao ser visualizado
+    carrinho = CarrinhoDeCompras.objects.filter(usuario=request.user).first()
+    if carrinho is None:
+        return render(request, 'carrinho_de_compras.html', {
+            'produtos': [],
+            'produto_total': '0.00',
+            'quantidade_itens': 0,
+        })
 
     # Busca itens relacionados ao carrinho, e o select_related para otimizar consultas
-    itens = ItemDoCarrinho.objects.filter(carrinho=carrinho).select_related('produto')
+    itens = ItemDoCarrinho.objects.filter(carrinho=carrinho).select_related('produto', 'produto__categoria')
 
-    # Monta estrutura esperada pelo template
-    produtos = []
-    total = Decimal('0.00')
-    for item in itens:
-        preco = item.produto.preco or Decimal('0.00')
-        subtotal = preco * item.quantidade
-        produtos.append({
+    # Monta estrutura esperada pelo template; os totais já vêm prontos no carrinho
+    produtos = [
+        {
             'produto': item.produto,
             'quantidade': item.quantidade,
-            'subtotal': f"{subtotal:.2f}"
-        })
-        total += subtotal
+            'subtotal': f"{item.produto.preco * item.quantidade:.2f}"
+        }
+        for item in itens
+    ]
 
-    return render(request, 'carrinho_de_compras.html', {'produtos': produtos, 'produto_total': f"{total:.2f}"})
+    return render(request, 'carrinho_de_compras.html', {
+        'produtos': produtos,
+        'produto_total': f"{carrinho.total:.2f}",
+        'quantidade_itens': carrinho.quantidade_itens,
+    })
 
 
+@login_required
+@require_http_methods(['GET', 'POST'])
+def carrinho_api(request):
+    """
+    API JSON do carrinho.
+    GET devolve o carrinho; POST recebe {"itens": [{"produto_id": 1, "quantidade": 2}, ...]}
+    com a quantidade final de cada produto (0 remove) e aplica tudo em uma transação.
+    """
+    if request.method == 'GET':
+        return JsonResponse(resumo_carrinho(CarrinhoDeCompras.objects.filter(usuario=request.user).first()))
 
+    try:
+        dados = json.loads(request.body or b'{}')
+        operacoes = dados['itens']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Corpo deve ser um JSON com a lista "itens".'}, status=400)
+    if not isinstance(operacoes, list):
+        return JsonResponse({'error': '"itens" deve ser uma lista.'}, status=400)
 
+    try:
+        carrinho = sincronizar_itens(request.user, operacoes)
+    except Produto.DoesNotExist as erro:
+        return JsonResponse({'error': str(erro)}, status=404)
+    except EstoqueInsuficiente as erro:
+        return JsonResponse({'error': str(erro)}, status=409)
+    except ValueError as erro:
+        return JsonResponse({'error': str(erro)}, status=400)
+
+    return JsonResponse(resumo_carrinho(carrinho))
+
+
+@login_required
+@require_http_methods(['POST'])
+def finalizar_pedido(request):
+    # transforma os itens reservados no carrinho em um pedido
+    try:
+        pedido = finalizar_compra(request.user)
+    except CarrinhoVazio as erro:
+        messages.error(request, str(erro))
+        return redirect('ver_carrinho')
+
+    messages.success(request, f'Pedido #{pedido.pk} realizado com sucesso!')
+    return redirect('pedido_detail', pedido_id=pedido.pk)
+
+
+@login_required
+def pedido_detail(request, pedido_id):
+    pedido = get_object_or_404(Pedido, pk=pedido_id, usuario=request.user)
+    return render(request, 'pedido_detail.html', {'pedido': pedido, 'itens': pedido.itens.all()})
 
-    
 
+@cache_control(public=True, max_age=31536000, immutable=True)
+def miniatura(request, path):
+    # só em DEBUG (app/urls.py): em produção o servidor web serve o MEDIA_ROOT.
+    # as miniaturas têm o hash do conteúdo no nome, então nunca mudam:
+    # podem ficar em cache (navegador/CDN) por um ano
+    return serve(request, path, document_root=settings.MEDIA_ROOT)
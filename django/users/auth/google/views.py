@@ -32,6 +32,8 @@ Configuração no Google Cloud Console:
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, get_user_model
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.contrib import messages
+from produtos.carrinho_anonimo import mesclar_carrinho_anonimo
 from .utils import (
     get_google_auth_url,
     exchange_code_for_token,
@@ -157,6 +159,11 @@ def google_callback(request):
     # Autentica o usuário
     user.backend = 'django.contrib.auth.backends.ModelBackend'
     login(request, user)
+
+    # Junta ao carrinho do usuário o que foi adicionado antes do login
+    sem_estoque = mesclar_carrinho_anonimo(request, user)
+    if sem_estoque:
+        messages.warning(request, "⚠️ Sem estoque, não foram para o carrinho: " + ", ".join(p.nome for p in sem_estoque))
     
     # Se for um novo usuário OU usuário sem senha, redireciona para criar senha
     if created or not user.has_usable_password():
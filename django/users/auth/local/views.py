@@ -28,6 +28,7 @@ from django.contrib import messages
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.middleware.csrf import rotate_token
 from users.forms import ClientePublicCreateForm
+from produtos.carrinho_anonimo import mesclar_carrinho_anonimo
 
 User = get_user_model()
 
@@ -106,6 +107,11 @@ def user_login(request):
             
             if user:
                 login(request, user)
+
+                # Junta ao carrinho do usuário o que foi adicionado antes do login
+                sem_estoque = mesclar_carrinho_anonimo(request, user)
+                if sem_estoque:
+                    messages.warning(request, "⚠️ Sem estoque, não foram para o carrinho: " + ", ".join(p.nome for p in sem_estoque))
                 
                 # Redireciona baseado no tipo de usuário
                 if user.is_staff:
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from app.busca import indice_trigram
 
 # Create your models here.
 
@@ -137,4 +138,12 @@ class User(AbstractUser):
     
     class Meta:
         verbose_name = 'Usuário'
-        verbose_name_plural = 'Usuários'
\ No newline at end of file
+        verbose_name_plural = 'Usuários'
+        # busca das listas do painel (app.busca); extensão pg_trgm na migração 0005
+        indexes = [
+            indice_trigram('username', 'user_username_trgm'),
+            indice_trigram('email', 'user_email_trgm'),
+            indice_trigram('first_name', 'user_first_name_trgm'),
+            indice_trigram('last_name', 'user_last_name_trgm'),
+            indice_trigram('crmv', 'user_crmv_trgm'),
+        ]
\ No newline at end of file